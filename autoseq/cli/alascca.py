@@ -3,13 +3,14 @@ import logging
 import os
 
 import click
-import time
 
 import sys
 
 from autoseq.util.path import mkdir
 from autoseq.pipeline.alascca import AlasccaPipeline
 
+from .run import get_events_filename, get_telemetry_dir, run_pipeline
+
 
 @click.command()
 @click.argument('sample', type=click.File('r'))
@@ -33,16 +34,13 @@ def alascca(ctx, sample):
                                           runner=ctx.obj['runner'],
                                           jobdb=ctx.obj['jobdb'],
                                           dot_file=ctx.obj['dot_file'],
-                                          scratch=ctx.obj['scratch']
+                                          scratch=ctx.obj['scratch'],
+                                          cache_dir=ctx.obj['cache_dir'],
+                                          max_memory=ctx.obj['memory'],
+                                          events_filename=get_events_filename(ctx),
+                                          telemetry_dir=get_telemetry_dir(ctx),
+                                          libdir_scanner=ctx.obj['libdir_scanner']
                                           )
 
-    # start main analysis
-    ctx.obj['pipeline'].start()
-
-    logging.info("Waiting for AlasccaPipeline to finish.")
-    while ctx.obj['pipeline'].is_alive():
-        logging.debug("Waiting for AutoseqPipeline")
-        time.sleep(5)
-
     # return_code from run_pipeline() will be != 0 if the pipeline fails
-    sys.exit(ctx.obj['pipeline'].exitcode)
+    sys.exit(run_pipeline(ctx, ctx.obj['pipeline']))
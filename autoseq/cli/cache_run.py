@@ -0,0 +1,22 @@
+import logging
+import sys
+
+import click
+
+from autoseq.util.cache import run_cached
+
+
+@click.command()
+@click.option('--cache-dir', required=True, type=click.Path(), help='cache folder')
+@click.option('--scratch', default='', help='scratch folder used by the command')
+@click.option('--salt', default='', help='additional string to include in the cache key')
+@click.option('-i', '--input', 'inputs', multiple=True, help='input file of the command')
+@click.option('-o', '--output', 'outputs', multiple=True, help='output file of the command')
+@click.argument('command')
+def cli(cache_dir, scratch, salt, inputs, outputs, command):
+    """
+    Run a job command line through the content-addressed output cache, restoring the
+    outputs from the cache instead if the command has already been run on identical inputs.
+    """
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(run_cached(command, list(inputs), list(outputs), cache_dir, scratch, salt))
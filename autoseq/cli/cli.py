@@ -6,8 +6,13 @@ import signal
 import click
 from pypedream import runners
 
+from autoseq.util.library import open_libdir_scanner
+from autoseq.util.refdata import Refdata, RefdataDict, convert_to_absolute_path, make_paths_absolute
+
 from .alascca import alascca as alascca_cmd
+from .estimate import estimate as estimate_cmd
 from .liqbio import liqbio as liqbio_cmd
+from .liqbio import liqbio_batch as liqbio_batch_cmd
 from .liqbio import liqbio_prepare as liqbio_prepare_cmd
 
 __author__ = 'dankle'
@@ -17,32 +22,52 @@ __author__ = 'dankle'
 @click.option('--ref', default='/nfs/ALASCCA/autoseq-genome/autoseq-genome.json',
               help='json with reference files to use',
               type=str)
+@click.option('--ref-cache-dir', default=os.path.join(os.path.expanduser('~'), '.cache', 'autoseq'),
+              help='dir to cache the reference data with absolute paths in; empty to disable caching',
+              type=str)
 @click.option('--job-params', default=None, help='JSON file specifying various pipeline job ' + \
                                                  'parameters.',
               type=str)
 @click.option('--outdir', default='/tmp/autoseq-test', help='output directory', type=click.Path())
 @click.option('--libdir', default="/tmp", help="directory to search for libraries")
+@click.option('--libdir-catalogue', default=None,
+              help="sqlite3 database to catalogue the fastq files of libdir in, updated incrementally")
 @click.option('--runner_name', default='shellrunner', help='Runner to use.')
 @click.option('--loglevel', default='INFO', help='level of logging')
 @click.option('--jobdb', default=None, help="sqlite3 database to write job info and stats")
+@click.option('--runtime-history', multiple=True, type=click.Path(exists=True),
+              help="jobdb of a previous run, to predict job runtimes from; can be given multiple times")
 @click.option('--dot_file', default=None, help="write graph to dot file with this name")
 @click.option('--cores', default=1, help="max number of cores to allow jobs to use")
+@click.option('--memory', default=None, type=int, help="max memory in GB to allow jobs to use")
 @click.option('--scratch', default="/tmp", help="scratch dir to use")
+@click.option('--cache-dir', default=None, help="job output cache dir, shared between analyses")
+@click.option('--incremental', default=False, is_flag=True,
+              help="rerun jobs whose parameters or inputs changed since the last run in outdir")
+@click.option('--progress', default=False, is_flag=True, help="log the number of running, queued and done jobs")
 @click.pass_context
-def cli(ctx, ref, job_params, outdir, libdir, runner_name, loglevel, jobdb, dot_file, cores, scratch):
+def cli(ctx, ref, ref_cache_dir, job_params, outdir, libdir, libdir_catalogue, runner_name, loglevel, jobdb, runtime_history, dot_file, cores, memory,
+        scratch, cache_dir, incremental, progress):
     setup_logging(loglevel)
-    logging.debug("Reading reference data from {}".format(ref))
     ctx.obj = {}
-    ctx.obj['refdata'] = load_ref(ref)
+    # The reference data is only read when a pipeline uses it:
+    ctx.obj['refdata'] = Refdata(ref, ref_cache_dir)
     ctx.obj['job_params'] = load_job_params(job_params)
     ctx.obj['outdir'] = outdir
     ctx.obj['libdir'] = libdir
+    ctx.obj['libdir_scanner'] = open_libdir_scanner(libdir, libdir_catalogue)
+    ctx.obj['libdir_catalogue'] = libdir_catalogue
     ctx.obj['pipeline'] = None
     ctx.obj['runner'] = get_runner(runner_name, cores)
     ctx.obj['jobdb'] = jobdb
+    ctx.obj['runtime_history'] = runtime_history
     ctx.obj['dot_file'] = dot_file
     ctx.obj['cores'] = cores
+    ctx.obj['memory'] = memory
     ctx.obj['scratch'] = scratch
+    ctx.obj['cache_dir'] = cache_dir
+    ctx.obj['incremental'] = incremental
+    ctx.obj['progress'] = progress
 
     def capture_sigint(sig, frame):
         """
@@ -72,69 +97,19 @@ def load_job_params(job_params_filename):
         return {}
 
 
-def convert_to_absolute_path(possible_relative_path, base_path):
-    """
-    Convert the input potential relative file path to an absolute path by
-    prepending the specified base_path, but only if the resulting absolute path points
-    to a pre-existing file or directory.
-
-    If the base_path cannot be prepended, then simply return the original input value.
-
-    :param possible_relative_path: A string potentially indicating a relative file/directory path. 
-    :param base_path: The base path to prepend.
-    :return: Modified path string.
-    """
-
-    converted_value = possible_relative_path
-    try:
-        if not os.path.isabs(possible_relative_path):
-            joined_path = os.path.join(base_path, possible_relative_path)
-            if os.path.isfile(joined_path) or os.path.isdir(joined_path):
-                converted_value = joined_path
-
-    except Exception, e:
-        pass
-
-    return converted_value
-
-
-def make_paths_absolute(input_dict, base_path):
-    """Processes the input dictionary, converting relative file paths to absolute
-    file paths throughout the dictionary structure.
-
-    Specifically, for each value in the dictionary:
-    - If it is also a dictionary, then recursively apply this function,
-    replacing the initial dictionary.
-    - Otherwise:
-    -- If the value is a non-null string that is not already an absolute path,
-    then try prepending the specified base_path and see if the resulting file name
-    exists, and in that case then replace the string with the resulting absolute path.
-    """
-
-    for curr_key, curr_value in input_dict.items():
-        if isinstance(curr_value, dict):
-            input_dict[curr_key] = make_paths_absolute(curr_value, base_path)
-        else:
-            converted_value = convert_to_absolute_path(curr_value, base_path)
-            input_dict[curr_key] = converted_value
-
-    return input_dict
-
-
 def load_ref(ref):
     """
     Processes the input genomic reference data JSON file, converting relative file paths
-    to absolute paths where required.
+    to absolute paths where required, when each value is first read.
 
     :param ref: Input reference file configuration JSON file.
-    :return: Modified reference file dictionary with relative->absolute file path conversions performed.
+    :return: RefdataDict of the reference data with relative->absolute file path conversions performed.
     """
 
     basepath = os.path.dirname(ref)
     with open(ref, 'r') as fh:
         refjson = json.load(fh)
-        refjson_abs = make_paths_absolute(refjson, basepath)
-        return refjson_abs
+        return RefdataDict(refjson, basepath)
 
 
 def get_runner(runner_name, maxcores):
@@ -171,5 +146,7 @@ def setup_logging(loglevel="INFO"):
 
 
 cli.add_command(alascca_cmd)
+cli.add_command(estimate_cmd)
 cli.add_command(liqbio_cmd)
+cli.add_command(liqbio_batch_cmd)
 cli.add_command(liqbio_prepare_cmd)
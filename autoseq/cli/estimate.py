@@ -0,0 +1,59 @@
+import json
+import logging
+
+import click
+
+from autoseq.pipeline.alascca import AlasccaPipeline
+from autoseq.pipeline.liqbio import LiqBioPipeline
+from autoseq.util.priority import critical_path
+from autoseq.util.runtime_model import DEFAULT_RUNTIME, RuntimeModel
+
+PIPELINES = {"alascca": AlasccaPipeline, "liqbio": LiqBioPipeline}
+
+
+@click.command()
+@click.argument('sample', type=click.File('r'))
+@click.option('--pipeline', 'pipeline_name', default='liqbio', type=click.Choice(sorted(PIPELINES.keys())),
+              help="pipeline to estimate the runtime of")
+@click.pass_context
+def estimate(ctx, sample, pipeline_name):
+    """
+    Predict the runtime of the analysis of SAMPLE from the job databases given with
+    --runtime-history, without running it.
+    """
+    logging.debug("Reading sample config from {}".format(sample))
+    sampledata = json.load(sample)
+
+    pipeline = PIPELINES[pipeline_name](sampledata=sampledata,
+                                        refdata=ctx.obj['refdata'],
+                                        job_params=ctx.obj['job_params'],
+                                        outdir=ctx.obj['outdir'],
+                                        libdir=ctx.obj['libdir'],
+                                        maxcores=ctx.obj['cores'],
+                                        runner=ctx.obj['runner'],
+                                        scratch=ctx.obj['scratch'],
+                                        max_memory=ctx.obj['memory'],
+                                        libdir_scanner=ctx.obj['libdir_scanner'])
+
+    model = RuntimeModel.from_jobdbs(ctx.obj['runtime_history'])
+    jobs = list(pipeline.graph.nodes())
+    runtimes = dict([(job, model.predict_job(job)) for job in jobs])
+    core_seconds = sum([runtimes[job] * (getattr(job, "threads", None) or 1) for job in jobs])
+    path = critical_path(jobs, model)
+    path_seconds = sum([runtimes[job] for job in path])
+
+    # The analysis takes at least as long as its critical path, and at least as long as
+    # its total work spread over the available cores:
+    eta_seconds = max(path_seconds, core_seconds / ctx.obj['cores'])
+
+    missing_history = [job.jobname for job in jobs if not model.has_history(job.jobname)]
+    if missing_history:
+        logging.warning("No runtime history for {} of {} jobs, assuming {} seconds each".format(
+            len(missing_history), len(jobs), DEFAULT_RUNTIME))
+
+    click.echo("Jobs: {}".format(len(jobs)))
+    click.echo("Core hours: {:.2f}".format(core_seconds / 3600.0))
+    click.echo("Critical path: {:.2f} hours".format(path_seconds / 3600.0))
+    for job in path:
+        click.echo("  {}\t{:.0f} s".format(job.jobname, runtimes[job]))
+    click.echo("Estimated wall time with {} cores: {:.2f} hours".format(ctx.obj['cores'], eta_seconds / 3600.0))
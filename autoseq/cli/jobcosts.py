@@ -0,0 +1,23 @@
+import click
+
+from autoseq.cli.cli import setup_logging
+from autoseq.util.jobdb import load_jobs
+from autoseq.util.telemetry import COST_COLUMNS, job_costs
+
+
+@click.command()
+@click.option('--jobdb', 'jobdbs', required=True, multiple=True, type=click.Path(exists=True),
+              help='jobdb json with job telemetry; can be given multiple times')
+@click.option('--loglevel', default='INFO', help='level of logging')
+def cli(jobdbs, loglevel):
+    """
+    Rank job types by their total CPU time across one or more runs, with their peak memory
+    usage compared to the declared memory, disk I/O and scratch usage.
+    """
+    setup_logging(loglevel)
+
+    jobs = [job for jobdb in jobdbs for job in load_jobs(jobdb)]
+    click.echo("\t".join(["job_type"] + COST_COLUMNS))
+    for curr_job_type, cost in job_costs(jobs):
+        click.echo("\t".join([curr_job_type, str(cost["jobs"])] +
+                             ["{:.2f}".format(cost[column]) for column in COST_COLUMNS[1:]]))
@@ -0,0 +1,61 @@
+import os
+
+import click
+
+from autoseq.cli.cli import setup_logging
+from autoseq.util.jobdb import load_jobs
+from autoseq.util.jobstats import occupancy, run_stats, type_stats, critical_path
+from autoseq.util.timeline import Timeline
+
+RUN_COLUMNS = ["jobs", "makespan_hours", "core_hours", "cores", "utilisation", "saturated_fraction",
+               "mean_cores_in_use", "peak_cores_in_use", "mean_running_jobs", "peak_running_jobs",
+               "critical_path_hours", "critical_path_jobs", "idle_gaps", "idle_hours", "mean_queue_wait"]
+
+TYPE_COLUMNS = ["jobs", "total_seconds", "critical_path_seconds", "mean_queue_wait"]
+
+
+def format_value(value):
+    if value is None:
+        return "NA"
+    if isinstance(value, float):
+        return "{:.2f}".format(value)
+    return str(value)
+
+
+@click.command()
+@click.option('--jobdb', 'jobdbs', required=True, multiple=True, type=click.Path(exists=True),
+              help='jobdb json of a run; can be given multiple times')
+@click.option('--cores', default=None, type=int, help="number of cores the runs were given with --cores")
+@click.option('--occupancy-dir', default=None, type=click.Path(file_okay=False),
+              help="write a tsv of cores in use and running jobs over time for each run to this folder")
+@click.option('--loglevel', default='INFO', help='level of logging')
+def cli(jobdbs, cores, occupancy_dir, loglevel):
+    """
+    Report the core utilisation, job concurrency, critical path, idle gaps and queue wait of
+    one or more runs, and the total and critical path time of each job type.
+    """
+    setup_logging(loglevel)
+
+    for jobdb in jobdbs:
+        timeline = Timeline(load_jobs(jobdb))
+        stats = run_stats(timeline, cores)
+        click.echo("# {}".format(jobdb))
+        for column in RUN_COLUMNS:
+            if column in stats:
+                click.echo("{}\t{}".format(column, format_value(stats[column])))
+
+        click.echo("\t".join(["job_type"] + TYPE_COLUMNS))
+        for curr_type_stats in type_stats(timeline, critical_path(timeline)):
+            click.echo("\t".join([curr_type_stats["type"]] +
+                                 [format_value(curr_type_stats[column]) for column in TYPE_COLUMNS]))
+        click.echo("")
+
+        if occupancy_dir:
+            if not os.path.isdir(occupancy_dir):
+                os.makedirs(occupancy_dir)
+            occupancy_filename = os.path.join(occupancy_dir,
+                                              os.path.splitext(os.path.basename(jobdb))[0] + "-occupancy.tsv")
+            with open(occupancy_filename, "w") as occupancy_file:
+                occupancy_file.write("seconds\tcores\tjobs\n")
+                for time, cores_in_use, running_jobs in zip(*occupancy(timeline)):
+                    occupancy_file.write("{:.1f}\t{}\t{}\n".format(time, cores_in_use, running_jobs))
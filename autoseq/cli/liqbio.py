@@ -1,15 +1,19 @@
+import glob
 import json
 import logging
 import os
 import sys
-import time
 
 import click
 
+from autoseq.pipeline.batch import BatchPipeline
 from autoseq.pipeline.liqbio import LiqBioPipeline
-from autoseq.util.clinseq_barcode import extract_clinseq_barcodes, convert_barcodes_to_sampledict, validate_clinseq_barcodes
+from autoseq.util.clinseq_barcode import extract_clinseq_barcodes, convert_barcodes_to_sampledict, \
+    data_available_for_clinseq_barcode, validate_clinseq_barcodes
 from autoseq.util.path import mkdir
 
+from .run import get_events_filename, get_telemetry_dir, run_pipeline
+
 
 @click.command()
 @click.argument('sample', type=click.File('r'))
@@ -33,18 +37,60 @@ def liqbio(ctx, sample):
                                          runner=ctx.obj['runner'],
                                          jobdb=ctx.obj['jobdb'],
                                          dot_file=ctx.obj['dot_file'],
-                                         scratch=ctx.obj['scratch'])
-
-    # start main analysis
-    ctx.obj['pipeline'].start()
-    #
-    logging.info("Waiting for pipeline to finish.")
-    while ctx.obj['pipeline'].is_alive():
-        logging.debug("Waiting for LiqBioPipeline")
-        time.sleep(5)
+                                         scratch=ctx.obj['scratch'],
+                                         cache_dir=ctx.obj['cache_dir'],
+                                         max_memory=ctx.obj['memory'],
+                                         events_filename=get_events_filename(ctx),
+                                         telemetry_dir=get_telemetry_dir(ctx),
+                                         libdir_scanner=ctx.obj['libdir_scanner'])
 
     # # return_code from run_pipeline() will be != 0 if the pipeline fails
-    sys.exit(ctx.obj['pipeline'].exitcode)
+    sys.exit(run_pipeline(ctx, ctx.obj['pipeline']))
+
+
+@click.command()
+@click.argument('sample-dir', type=click.Path(exists=True, file_okay=False))
+@click.pass_context
+def liqbio_batch(ctx, sample_dir):
+    """
+    Run the Liquid Biopsy pipeline for all sample JSON files in SAMPLE_DIR, as written by
+    liqbio-prepare, in a single combined pipeline. Each sample is written to a folder named
+    by its SDID in the output directory.
+    """
+    sample_filenames = sorted(glob.glob(os.path.join(sample_dir, "*.json")))
+    logging.info("Running Liquid Biopsy pipeline for {} samples in {}".format(len(sample_filenames), sample_dir))
+
+    if ctx.obj['jobdb']:
+        mkdir(os.path.dirname(ctx.obj['jobdb']))
+
+    sample_pipelines = []
+    for sample_filename in sample_filenames:
+        logging.debug("Reading sample config from {}".format(sample_filename))
+        with open(sample_filename) as sample_file:
+            sampledata = json.load(sample_file)
+
+        sample_outdir = os.path.join(ctx.obj['outdir'], sampledata['sdid'])
+        sample_pipelines.append(LiqBioPipeline(sampledata=sampledata,
+                                               refdata=ctx.obj['refdata'],
+                                               job_params=ctx.obj['job_params'],
+                                               outdir=sample_outdir,
+                                               libdir=ctx.obj['libdir'],
+                                               maxcores=ctx.obj['cores'],
+                                               scratch=ctx.obj['scratch'],
+                                               cache_dir=ctx.obj['cache_dir'],
+                                               shared_outdir=ctx.obj['outdir'],
+                                               max_memory=ctx.obj['memory'],
+                                               libdir_scanner=ctx.obj['libdir_scanner']))
+
+    ctx.obj['pipeline'] = BatchPipeline(sample_pipelines,
+                                        outdir=ctx.obj['outdir'],
+                                        runner=ctx.obj['runner'],
+                                        jobdb=ctx.obj['jobdb'],
+                                        dot_file=ctx.obj['dot_file'],
+                                        events_filename=get_events_filename(ctx),
+                                        telemetry_dir=get_telemetry_dir(ctx))
+
+    sys.exit(run_pipeline(ctx, ctx.obj['pipeline']))
 
 
 @click.command()
@@ -58,6 +104,15 @@ def liqbio_prepare(ctx, outdir, barcodes_filename):
     logging.info("Validating all clinseq barcodes.")
     validate_clinseq_barcodes(clinseq_barcodes)
 
+    if ctx.obj['libdir_catalogue']:
+        # Only the catalogue is queried, so that preparing samples does not list the library folders:
+        missing_barcodes = [clinseq_barcode for clinseq_barcode in clinseq_barcodes
+                            if not data_available_for_clinseq_barcode(ctx.obj['libdir'], clinseq_barcode,
+                                                                      ctx.obj['libdir_scanner'])]
+        if missing_barcodes:
+            logging.warning("No fastq files in {} for {} clinseq barcodes: {}".format(
+                ctx.obj['libdir'], len(missing_barcodes), ", ".join(missing_barcodes)))
+
     logging.info("Generating sample dictionary from the input clinseq barcode strings.")
     sample_dict = convert_barcodes_to_sampledict(clinseq_barcodes)
     for sdid in sample_dict:
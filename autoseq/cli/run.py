@@ -0,0 +1,61 @@
+import logging
+import os
+
+from autoseq.util.events import EVENTS_FILENAME, start_events_file, wait_for_pipeline
+from autoseq.util.manifest import MANIFEST_FILENAME, invalidate_stale_jobs, write_manifest
+from autoseq.util.path import mkdir
+from autoseq.util.priority import assign_priorities
+from autoseq.util.runtime_model import RuntimeModel, assign_walltimes
+from autoseq.util.telemetry import jobdb_telemetry_dir, merge_telemetry, start_telemetry_dir
+
+
+def get_events_filename(ctx):
+    """
+    :return: The events file for the jobs to report their state transitions in, if --progress is given.
+    """
+    return os.path.join(ctx.obj['outdir'], EVENTS_FILENAME) if ctx.obj['progress'] else None
+
+
+def get_telemetry_dir(ctx):
+    """
+    :return: The folder for the jobs to record their resource usage in, if --jobdb is given.
+    """
+    return jobdb_telemetry_dir(ctx.obj['jobdb']) if ctx.obj['jobdb'] else None
+
+
+def run_pipeline(ctx, pipeline):
+    """
+    Run a configured pipeline and wait for it to finish: prioritise its jobs and set their time
+    limits from the runtime history, skip the jobs that are up to date with --incremental, and
+    collect the resource usage of the jobs in the jobdb afterwards.
+
+    :param ctx: The click context.
+    :param pipeline: A pipeline configured with the events file and telemetry folder of the context.
+    :return: The exit code of the pipeline.
+    """
+    runtime_model = RuntimeModel.from_jobdbs(ctx.obj['runtime_history'])
+    assign_priorities(pipeline.graph, runtime_model)
+    assign_walltimes(pipeline.graph, runtime_model)
+
+    manifest_filename = os.path.join(ctx.obj['outdir'], MANIFEST_FILENAME)
+    if ctx.obj['incremental']:
+        job_records = invalidate_stale_jobs(pipeline.graph, manifest_filename)
+
+    if pipeline.events_filename:
+        start_events_file(pipeline.events_filename)
+    if pipeline.telemetry_dir:
+        start_telemetry_dir(pipeline.telemetry_dir)
+
+    pipeline.start()
+
+    logging.info("Waiting for {} to finish.".format(type(pipeline).__name__))
+    wait_for_pipeline(pipeline, pipeline.events_filename)
+
+    if pipeline.telemetry_dir and os.path.exists(ctx.obj['jobdb']):
+        merge_telemetry(ctx.obj['jobdb'], pipeline.telemetry_dir)
+
+    if ctx.obj['incremental']:
+        mkdir(ctx.obj['outdir'])
+        write_manifest(pipeline.graph, manifest_filename, job_records)
+
+    return pipeline.exitcode
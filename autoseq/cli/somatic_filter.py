@@ -0,0 +1,15 @@
+import click
+
+from autoseq.util.bcbio import call_somatic_input_stream
+
+
+@click.command()
+@click.argument('input_vcf', type=click.File('r'), default='-')
+@click.argument('output_vcf', type=click.File('w'), default='-')
+def cli(input_vcf, output_vcf):
+    """
+    Flag somatic variants in a tumor/normal VCF, adding the SOMATIC flag to passing
+    records and a REJECT filter to the rest. Reads from stdin and writes to stdout
+    unless file names are given.
+    """
+    call_somatic_input_stream(input_vcf, output_vcf)
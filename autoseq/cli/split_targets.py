@@ -0,0 +1,17 @@
+import click
+
+from autoseq.util.intervals import split_intervals
+
+
+@click.command()
+@click.option('--depth-profile', default=None, type=click.Path(exists=True),
+              help='BED file with the expected mean depth of each target in the last column')
+@click.argument('input_targets', type=click.Path(exists=True))
+@click.argument('output_shards', nargs=-1, required=True)
+def cli(depth_profile, input_targets, output_shards):
+    """
+    Split a BED or interval_list file into contiguous shards balanced by total number of bases
+    (weighted by expected depth if a depth profile is given), writing one shard to each of the
+    specified output files.
+    """
+    split_intervals(input_targets, list(output_shards), depth_profile)
@@ -0,0 +1,20 @@
+import sys
+
+import click
+
+from autoseq.util.telemetry import run_with_telemetry
+
+
+@click.command()
+@click.option('--output', required=True, type=click.Path(), help='JSON file to write resource usage to')
+@click.option('--jobname', default='', help='name of the job running the command')
+@click.option('--scratch', default=None, help='scratch folder used by the command')
+@click.option('--threads', default=None, type=int, help='number of threads assigned to the job')
+@click.option('--memory', default=None, type=int, help='memory in GB declared by the job')
+@click.option('-i', '--input', 'inputs', multiple=True, help='input file of the job')
+@click.argument('command')
+def cli(output, jobname, scratch, threads, memory, inputs, command):
+    """
+    Run a job command line and record its CPU time, peak memory, disk I/O and scratch usage.
+    """
+    sys.exit(run_with_telemetry(command, output, jobname, scratch, threads, memory, inputs))
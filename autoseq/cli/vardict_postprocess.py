@@ -0,0 +1,17 @@
+import click
+
+from autoseq.util.vcfstream import process_vcf_stream, vardict_postprocessing_stages
+
+
+@click.command()
+@click.option('--tumor-index', default=0, help='index of the tumor sample among the VCF sample columns')
+@click.option('--aligner', default='bwa', help='aligner used to produce the alignments')
+@click.argument('input_vcf', type=click.File('r'), default='-')
+@click.argument('output_vcf', type=click.File('w'), default='-')
+def cli(tumor_index, aligner, input_vcf, output_vcf):
+    """
+    Post-process paired VarDict output in a single pass: keep somatic calls, apply the
+    depth/frequency and somatic filters, mask ambiguous REF bases and drop records where
+    REF equals ALT. Reads from stdin and writes to stdout unless file names are given.
+    """
+    process_vcf_stream(vardict_postprocessing_stages(tumor_index, aligner), input_vcf, output_vcf)
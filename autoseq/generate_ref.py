@@ -15,8 +15,9 @@ __author__ = 'dankle'
 @click.option('--runner_name', default='shellrunner', help='Runner to use.')
 @click.option('--loglevel', default='INFO', help='level of logging')
 @click.option('--cores', default=1, help="write graph to dot file with this name")
+@click.option('--target-shards', default=8, help="number of target region shards to generate per panel")
 @click.option('--debug', default=False, is_flag=True)
-def main(genome_resources, outdir, runner_name, loglevel, cores, debug):
+def main(genome_resources, outdir, runner_name, loglevel, cores, target_shards, debug):
     setup_logging(loglevel)
 
     mkdir(outdir)
@@ -24,7 +25,7 @@ def main(genome_resources, outdir, runner_name, loglevel, cores, debug):
 
     runner = get_runner(runner_name, cores)
     p = GenerateRefFilesPipeline(genome_resources, outdir,
-                                 maxcores=cores, runner=runner)
+                                 maxcores=cores, runner=runner, num_target_shards=target_shards)
 
     # start main analysis
     p.start()
@@ -59,15 +59,14 @@ class AlasccaPipeline(ClinseqPipeline):
         :return: (normal_capture, tumor_capture) tuple, denoting those unique library captures.
         """
 
+        normal_captures = self.capture_to_results.normal
+        tumor_captures = self.capture_to_results.cancer
+
         # There must be exactly one tumor and exactly one normal for this to be valid:
-        if len(self.get_mapped_captures_cancer()) != 1 or \
-           len(self.get_mapped_captures_normal()) != 1:
+        if len(tumor_captures) != 1 or len(normal_captures) != 1:
             raise ValueError("Invalid pipeline state for configuration of ALASCCA CNA.")
 
-        normal_capture = self.get_mapped_captures_normal()[0]
-        tumor_capture = self.get_mapped_captures_cancer()[0]
-
-        return normal_capture, tumor_capture
+        return normal_captures[0], tumor_captures[0]
 
     def configure_alascca_cna(self, normal_capture, tumor_capture):
         tumor_vs_normal_results = self.normal_cancer_pair_to_results[(normal_capture, tumor_capture)]
@@ -0,0 +1,96 @@
+import logging
+
+from pypedream.pipeline.pypedreampipeline import PypedreamPipeline
+
+from autoseq.util.cache import job_files, normalize_command
+from autoseq.util.events import CompletionPipe, enable_job_events
+from autoseq.util.priority import dispatch_order
+from autoseq.util.path import normpath
+from autoseq.util.telemetry import enable_job_telemetry
+
+
+class BatchPipeline(PypedreamPipeline):
+    """
+    A pipeline running the jobs of several configured sample pipelines as one graph, so that
+    they are scheduled together by a single runner under a single core budget.
+    """
+    def __init__(self, pipelines, outdir, events_filename=None, telemetry_dir=None, **kwargs):
+        """
+        :param pipelines: List of configured pipelines, which are not started themselves.
+        :param outdir: Output folder location string, holding the sample output folders.
+        :param events_filename: Optional file for jobs to report their state transitions in.
+        :param telemetry_dir: Optional folder for jobs to record their resource usage in.
+        :param kwargs: Additional key-word arguments.
+        """
+        PypedreamPipeline.__init__(self, normpath(outdir), **kwargs)
+        self.pipelines = pipelines
+        self.events_filename = events_filename
+        self.telemetry_dir = telemetry_dir
+        # Created when the pipeline is started, see start():
+        self.completion = None
+
+        # Dictionary linking the outputs of each added job to that job and its source pipeline:
+        self.outputs_to_job = {}
+
+        for pipeline in pipelines:
+            for job in pipeline.graph.nodes():
+                self.add(job, pipeline)
+
+    def add(self, job, source=None):
+        """
+        Add a job to this pipeline, unless an equivalent job producing the same outputs, such as
+        a job processing reference data shared between samples, has already been added from
+        another sample pipeline. Jobs of the same sample pipeline are always added.
+
+        :param job: The job to add.
+        :param source: The sample pipeline the job is configured in, if any.
+        """
+        outputs = tuple(job_files(job, "output"))
+        if outputs and outputs in self.outputs_to_job and \
+                (source is None or self.outputs_to_job[outputs][1] is not source):
+            shared_job = self.outputs_to_job[outputs][0]
+            if type(shared_job) != type(job) or self.comparable_command(shared_job) != self.comparable_command(job):
+                raise ValueError("Jobs {} and {} write the same outputs with different commands".format(
+                    shared_job.jobname, job.jobname))
+            logging.debug("Sharing job {} between samples".format(shared_job.jobname))
+            return
+
+        if outputs and outputs not in self.outputs_to_job:
+            self.outputs_to_job[outputs] = (job, source)
+        if self.telemetry_dir:
+            enable_job_telemetry(job, self.telemetry_dir)
+        if self.events_filename:
+            enable_job_events(job, self.events_filename)
+        PypedreamPipeline.add(self, job)
+
+    @staticmethod
+    def comparable_command(job):
+        """
+        :return: The command line of a job, with the scratch folder and the random uuids that
+        differ between equivalent jobs replaced by placeholders.
+        """
+        return normalize_command(job.command(), [], [], getattr(job, "scratch", None))
+
+    def get_ordered_jobs_to_run(self):
+        """
+        :return: The jobs to run, in the order in which they are submitted to the runner: ready
+        jobs on the critical path first, see assign_priorities().
+        """
+        return dispatch_order(PypedreamPipeline.get_ordered_jobs_to_run(self))
+
+    def start(self):
+        """
+        Start the pipeline, creating the completion pipe for waiting on it.
+        """
+        self.completion = CompletionPipe()
+        PypedreamPipeline.start(self)
+        self.completion.close_writer()
+
+    def run(self):
+        """
+        Run the pipeline, notifying the completion pipe when it has finished.
+        """
+        try:
+            PypedreamPipeline.run(self)
+        finally:
+            self.completion.notify()
@@ -1,8 +1,8 @@
 from pypedream.pipeline.pypedreampipeline import PypedreamPipeline
 from autoseq.util.path import normpath, stripsuffix
-from autoseq.tools.alignment import align_library
+from autoseq.tools.alignment import align_library, align_capture
 from autoseq.tools.cnvcalling import QDNASeq
-from autoseq.util.library import find_fastqs
+from autoseq.util.library import LibdirScanner, find_fastqs
 from autoseq.tools.picard import PicardCollectInsertSizeMetrics, PicardCollectOxoGMetrics, \
     PicardMergeSamFiles, PicardMarkDuplicates, PicardCollectHsMetrics, PicardCollectWgsMetrics
 from autoseq.tools.variantcalling import Freebayes, VEP, VcfAddSample, call_somatic_variants
@@ -10,6 +10,11 @@ from autoseq.tools.intervals import MsiSensor
 from autoseq.tools.cnvcalling import CNVkit
 from autoseq.tools.contamination import ContEst, ContEstToContamCaveat, CreateContestVCFs
 from autoseq.tools.qc import *
+from autoseq.util.cache import enable_job_cache
+from autoseq.util.events import CompletionPipe, enable_job_events
+from autoseq.util.priority import dispatch_order
+from autoseq.util.resources import configure_job_resources
+from autoseq.util.telemetry import enable_job_telemetry
 from autoseq.util.clinseq_barcode import *
 import collections, logging
 
@@ -30,6 +35,59 @@ class SinglePanelResults(object):
         self.cov_qc_call = None
 
 
+class CaptureResults(collections.OrderedDict):
+    """
+    Dictionary linking unique captures to their SinglePanelResults, which are created when a
+    capture is first accessed. Lists of the WGS, non-WGS, normal and cancer captures are
+    maintained as captures are added and removed, so that the captures of each kind are
+    obtained without scanning all captures.
+    """
+    def __init__(self, *args, **kwargs):
+        # Captures of each kind, in order of addition. Normal and cancer captures exclude
+        # "WGS" (no) capture items:
+        self.no_wgs = []
+        self.only_wgs = []
+        self.normal = []
+        self.cancer = []
+        collections.OrderedDict.__init__(self, *args, **kwargs)
+
+    def __missing__(self, unique_capture):
+        results = SinglePanelResults()
+        self[unique_capture] = results
+        return results
+
+    def __setitem__(self, unique_capture, results, **kwargs):
+        if unique_capture not in self:
+            for captures in self.capture_lists(unique_capture):
+                captures.append(unique_capture)
+        collections.OrderedDict.__setitem__(self, unique_capture, results, **kwargs)
+
+    def __delitem__(self, unique_capture, **kwargs):
+        collections.OrderedDict.__delitem__(self, unique_capture, **kwargs)
+        for captures in self.capture_lists(unique_capture):
+            captures.remove(unique_capture)
+
+    def clear(self):
+        collections.OrderedDict.clear(self)
+        for captures in [self.no_wgs, self.only_wgs, self.normal, self.cancer]:
+            del captures[:]
+
+    def __reduce__(self):
+        # Copies rebuild their capture lists rather than sharing those of this dictionary:
+        return self.__class__, (self.items(),)
+
+    def capture_lists(self, unique_capture):
+        """
+        :return: The lists of captures that the specified capture belongs in.
+        """
+        if unique_capture.capture_kit_id == "WG":
+            return [self.only_wgs]
+        elif unique_capture.sample_type == "N":
+            return [self.no_wgs, self.normal]
+        else:
+            return [self.no_wgs, self.cancer]
+
+
 class CancerVsNormalPanelResults(object):
     """
     Represents the results generated by performing a paired analysis comparing a cancer and a normal capture.
@@ -50,7 +108,8 @@ class ClinseqPipeline(PypedreamPipeline):
     A pipeline for processing clinseq cancer genomics.
     """
     def __init__(self, sampledata, refdata, job_params, outdir, libdir, maxcores=1,
-                 scratch="/scratch/tmp/tmp", analysis_id=None, **kwargs):
+                 scratch="/scratch/tmp/tmp", analysis_id=None, cache_dir=None, shared_outdir=None, max_memory=None,
+                 events_filename=None, telemetry_dir=None, libdir_scanner=None, **kwargs):
         """
         :param sampledata: A dictionary specifying the clinseq barcodes of samples of different types.
         :param refdata: A dictionary specifying the reference data used for configuring the pipeline jobs.
@@ -58,6 +117,14 @@ class ClinseqPipeline(PypedreamPipeline):
         :param libdir: String specifying location of the library fastq files.
         :param maxcores: Maximum number of cores to use concurrently in this analysis.
         :param scratch: String indicating folder in which jobs should output all temporary files.
+        :param cache_dir: Optional folder of a job output cache shared between analyses.
+        :param shared_outdir: Folder for outputs derived only from reference data, which can be shared
+        between analyses run together. Defaults to outdir.
+        :param max_memory: Optional maximum memory in gigabytes to use concurrently in this analysis.
+        :param events_filename: Optional file for jobs to report their state transitions in.
+        :param telemetry_dir: Optional folder for jobs to record their resource usage in.
+        :param libdir_scanner: Optional LibdirScanner or LibdirCatalogue of libdir, which can be shared between pipelines
+        configured together. By default, a LibdirScanner is created for this pipeline.
         :param kwargs: Additional key-word arguments.
         """
         PypedreamPipeline.__init__(self, normpath(outdir), **kwargs)
@@ -68,9 +135,18 @@ class ClinseqPipeline(PypedreamPipeline):
         self.job_params = job_params
         self.maxcores = maxcores
         self.libdir = libdir
+        self.libdir_scanner = libdir_scanner or LibdirScanner(libdir)
         self.qc_files = []
         self.scratch = scratch
         self.analysis_id = analysis_id
+        self.cache_dir = cache_dir
+        self.shared_outdir = normpath(shared_outdir) if shared_outdir else self.outdir
+        self.max_memory = max_memory
+        self.events_filename = events_filename
+        self.telemetry_dir = telemetry_dir
+        # Created when the pipeline is started, so that pipelines that are only configured,
+        # such as the sample pipelines of a batch, do not hold a pipe:
+        self.completion = None
 
         # Set up default job parameters:
         self.default_job_params = {
@@ -80,12 +156,20 @@ class ClinseqPipeline(PypedreamPipeline):
             "cov-low-thresh-fold-cov": 50,
             "vardict-min-alt-frac": 0.02,
             "vardict-min-num-reads": None,
+            "vardict-fused-postprocessing": False,
+            "vardict-shards": 1,
+            "single-pass-panel-qc": False,
+            "fused-align-markdups": False,
+            "streamed-trimming": False,
+            "align-per-lane": False,
+            "align-chunks": 1,
+            "output-placement": "move",
             "vep-additional-options": ""
         }
 
         # Dictionary linking unique captures to corresponding generic single panel
         # analysis results (SinglePanelResults objects as values):
-        self.capture_to_results = collections.defaultdict(SinglePanelResults)
+        self.capture_to_results = CaptureResults()
 
         # Dictionary linking unique normal library capture items to their corresponding
         # germline VCF filenames:
@@ -95,6 +179,64 @@ class ClinseqPipeline(PypedreamPipeline):
         # cancer library capture analysis results (CancerPanelResults objects as values):
         self.normal_cancer_pair_to_results = collections.defaultdict(CancerVsNormalPanelResults)
 
+    @property
+    def capture_to_results(self):
+        return self._capture_to_results
+
+    @capture_to_results.setter
+    def capture_to_results(self, capture_to_results):
+        """
+        :param capture_to_results: Dictionary linking unique captures to their results, which is
+        converted to a CaptureResults dictionary if needed.
+        """
+        if not isinstance(capture_to_results, CaptureResults):
+            capture_to_results = CaptureResults(capture_to_results)
+        self._capture_to_results = capture_to_results
+
+    def add(self, job):
+        """
+        Add a job to this pipeline, fitting its threads to the core and memory budgets, applying the
+        output placement mode to jobs placing outputs from scratch, and making it run through the job
+        output cache, record its resource usage and report its state transitions, if configured.
+
+        :param job: The job to add.
+        """
+        configure_job_resources(job, self.maxcores, self.max_memory)
+        # Not named "output_placement", as attributes starting with "output" are output ports:
+        if hasattr(job, "placement"):
+            job.placement = self.get_job_param('output-placement')
+        if self.cache_dir:
+            enable_job_cache(job, self.cache_dir, self.scratch)
+        if self.telemetry_dir:
+            enable_job_telemetry(job, self.telemetry_dir, self.scratch)
+        if self.events_filename:
+            enable_job_events(job, self.events_filename)
+        PypedreamPipeline.add(self, job)
+
+    def get_ordered_jobs_to_run(self):
+        """
+        :return: The jobs to run, in the order in which they are submitted to the runner: ready
+        jobs on the critical path first, see assign_priorities().
+        """
+        return dispatch_order(PypedreamPipeline.get_ordered_jobs_to_run(self))
+
+    def start(self):
+        """
+        Start the pipeline, creating the completion pipe for waiting on it.
+        """
+        self.completion = CompletionPipe()
+        PypedreamPipeline.start(self)
+        self.completion.close_writer()
+
+    def run(self):
+        """
+        Run the pipeline, notifying the completion pipe when it has finished.
+        """
+        try:
+            PypedreamPipeline.run(self)
+        finally:
+            self.completion.notify()
+
     def get_job_param(self, param_name):
         """
         Retrieve the parameter of the specified name from the job parameters, or
@@ -168,7 +310,7 @@ class ClinseqPipeline(PypedreamPipeline):
         :return: The corresponding bam filename, or None if it has not been configured.
         """
 
-        if unique_capture in self.get_mapped_captures_all():
+        if unique_capture in self.capture_to_results:
             return self.capture_to_results[unique_capture].merged_bamfile
         else:
             return None
@@ -183,7 +325,7 @@ class ClinseqPipeline(PypedreamPipeline):
         for sample_type in ['N', 'T', 'CFDNA']:
             clinseq_barcodes_with_data = []
             for clinseq_barcode in self.sampledata[sample_type]:
-                if data_available_for_clinseq_barcode(self.libdir, clinseq_barcode):
+                if data_available_for_clinseq_barcode(self.libdir, clinseq_barcode, self.libdir_scanner):
                     clinseq_barcodes_with_data.append(clinseq_barcode)
 
             self.sampledata[sample_type] = clinseq_barcodes_with_data
@@ -214,8 +356,7 @@ class ClinseqPipeline(PypedreamPipeline):
         :return: List of unique capture named tuples.
         """
 
-        return [capture for capture in self.capture_to_results.keys()
-                if capture.capture_kit_id != "WG"]
+        return list(self.capture_to_results.no_wgs)
 
     def get_mapped_captures_only_wgs(self):
         """
@@ -225,8 +366,7 @@ class ClinseqPipeline(PypedreamPipeline):
         :return: List of unique capture named tuples.
         """
 
-        return [capture for capture in self.capture_to_results.keys()
-                if capture.capture_kit_id == "WG"]
+        return list(self.capture_to_results.only_wgs)
 
     def get_mapped_captures_normal(self):
         """
@@ -236,9 +376,7 @@ class ClinseqPipeline(PypedreamPipeline):
         :return: List of named tuples.
         """
 
-        non_wgs_unique_captures = self.get_mapped_captures_no_wgs()
-        return filter(lambda unique_capture: unique_capture.sample_type == "N",
-                      non_wgs_unique_captures)
+        return list(self.capture_to_results.normal)
 
     def get_mapped_captures_cancer(self):
         """
@@ -248,9 +386,7 @@ class ClinseqPipeline(PypedreamPipeline):
         :return: List of named tuples.
         """
 
-        non_wgs_unique_captures = self.get_mapped_captures_no_wgs()
-        return filter(lambda unique_capture: unique_capture.sample_type != "N",
-                      non_wgs_unique_captures)
+        return list(self.capture_to_results.cancer)
 
     def get_prep_kit_name(self, prep_kit_code):
         """
@@ -317,16 +453,11 @@ class ClinseqPipeline(PypedreamPipeline):
         Retrieves all clinseq barcodes for this clinseq analysis, and organises them according
         to unique library captures.
 
-        :return: A dictionary with tuples indicating unique library captures as keys,
+        :return: An ordered dictionary with tuples indicating unique library captures as keys,
         and barcode lists as values.
         """
 
-        capture_to_barcodes = collections.defaultdict(list)
-        for clinseq_barcode in self.get_all_clinseq_barcodes():
-            unique_capture = extract_unique_capture(clinseq_barcode)
-            capture_to_barcodes[unique_capture].append(clinseq_barcode)
-
-        return capture_to_barcodes
+        return UniqueCaptureIndex(self.get_all_clinseq_barcodes()).capture_to_barcodes
 
     def merge_and_rm_dup(self, unique_capture, input_bams):
         """
@@ -371,6 +502,42 @@ class ClinseqPipeline(PypedreamPipeline):
 
         self.qc_files.append(markdups.output_metrics)
 
+    def align_and_mark_duplicates(self, unique_capture, clinseq_barcodes):
+        """
+        Configures alignment, merging and duplicate marking of all the specified clinseq barcodes
+        as a single job, producing the final bam and duplicate metrics files at the same paths as
+        merge_and_rm_dup. The metrics are samtools markdup statistics, see BwaMergeMarkDuplicates.
+
+        Registers the final output bam file for this library capture in this analysis.
+
+        :param unique_capture: A unique library capture specification
+        :param clinseq_barcodes: The clinseq barcodes for this library capture
+        """
+
+        capture_str = compose_lib_capture_str(unique_capture)
+        capture_kit = unique_capture.capture_kit_id
+
+        barcodes_to_fastqs = []
+        for clinseq_barcode in clinseq_barcodes:
+            fq1_files, fq2_files = find_fastqs(clinseq_barcode, self.libdir, self.libdir_scanner)
+            barcodes_to_fastqs.append((clinseq_barcode, fq1_files, fq2_files))
+
+        mark_dups_bam_filename = \
+            "{}/bams/{}/{}-nodups.bam".format(self.outdir, capture_kit, capture_str)
+        mark_dups_metrics_filename = \
+            "{}/qc/picard/{}/{}-markdups-metrics.txt".format(self.outdir, capture_kit, capture_str)
+
+        bam = align_capture(self, barcodes_to_fastqs,
+                            ref=self.refdata['bwaIndex'],
+                            outdir="{}/bams/{}".format(self.outdir, capture_kit),
+                            output_bam=mark_dups_bam_filename,
+                            output_metrics=mark_dups_metrics_filename,
+                            maxcores=self.maxcores,
+                            remove_duplicates=True)
+
+        self.set_capture_bam(unique_capture, bam)
+        self.qc_files.append(mark_dups_metrics_filename)
+
     def configure_fastq_qcs(self):
         """
         Configure QC on all fastq files that exist for this pipeline instance.
@@ -380,7 +547,7 @@ class ClinseqPipeline(PypedreamPipeline):
 
         for clinseq_barcode in self.get_all_clinseq_barcodes():
             curr_fqs = reduce(lambda l1, l2: l1 + l2,
-                              find_fastqs(clinseq_barcode, self.libdir))
+                              find_fastqs(clinseq_barcode, self.libdir, self.libdir_scanner))
             for fq in curr_fqs:
                 fastqc = FastQC()
                 fastqc.input = fq
@@ -400,18 +567,26 @@ class ClinseqPipeline(PypedreamPipeline):
 
         capture_to_barcodes = self.get_unique_capture_to_clinseq_barcodes()
         for unique_capture in capture_to_barcodes.keys():
+            if self.get_job_param('fused-align-markdups'):
+                self.align_and_mark_duplicates(unique_capture, capture_to_barcodes[unique_capture])
+                continue
+
             curr_bamfiles = []
             capture_kit = unique_capture.capture_kit_id
             for clinseq_barcode in capture_to_barcodes[unique_capture]:
+                fastqs = find_fastqs(clinseq_barcode, self.libdir, self.libdir_scanner)
                 curr_bamfiles.append(
                     align_library(self,
-                                  fq1_files=find_fastqs(clinseq_barcode, self.libdir)[0],
-                                  fq2_files=find_fastqs(clinseq_barcode, self.libdir)[1],
+                                  fq1_files=fastqs[0],
+                                  fq2_files=fastqs[1],
                                   clinseq_barcode=clinseq_barcode,
                                   ref=self.refdata['bwaIndex'],
                                   outdir= "{}/bams/{}".format(self.outdir, capture_kit),
                                   maxcores=self.maxcores,
-                                  remove_duplicates=True))
+                                  remove_duplicates=True,
+                                  streamed=self.get_job_param('streamed-trimming'),
+                                  per_lane=self.get_job_param('align-per-lane'),
+                                  num_chunks=self.get_job_param('align-chunks')))
 
             self.merge_and_rm_dup(unique_capture, curr_bamfiles)
 
@@ -590,7 +765,9 @@ class ClinseqPipeline(PypedreamPipeline):
             target_name=target_name,
             outdir=self.outdir, callers=['vardict'],
             min_alt_frac=self.get_job_param('vardict-min-alt-frac'),
-            min_num_reads=self.get_job_param('vardict-min-num-reads'))
+            min_num_reads=self.get_job_param('vardict-min-num-reads'),
+            fused_vardict_postprocessing=self.get_job_param('vardict-fused-postprocessing'),
+            vardict_shards=self.get_job_param('vardict-shards'))
 
         self.normal_cancer_pair_to_results[(normal_capture, cancer_capture)].somatic_vcf = \
             somatic_variants.values()[0]
@@ -902,33 +1079,52 @@ class ClinseqPipeline(PypedreamPipeline):
 
         capture_str = compose_lib_capture_str(unique_capture)
 
-        isize = PicardCollectInsertSizeMetrics()
-        isize.input = bam
-        isize.output_metrics = "{}/qc/picard/{}/{}.picard-insertsize.txt".format(
+        isize_output = "{}/qc/picard/{}/{}.picard-insertsize.txt".format(
             self.outdir, unique_capture.capture_kit_id, capture_str)
-        isize.jobname = "picard-isize-{}".format(capture_str)
-        self.add(isize)
-
-        oxog = PicardCollectOxoGMetrics()
-        oxog.input = bam
-        oxog.reference_sequence = self.refdata['reference_genome']
-        oxog.output_metrics = "{}/qc/picard/{}/{}.picard-oxog.txt".format(
+        oxog_output = "{}/qc/picard/{}/{}.picard-oxog.txt".format(
             self.outdir, unique_capture.capture_kit_id, capture_str)
-        oxog.jobname = "picard-oxog-{}".format(capture_str)
-        self.add(oxog)
-
-        hsmetrics = PicardCollectHsMetrics()
-        hsmetrics.input = bam
-        hsmetrics.reference_sequence = self.refdata['reference_genome']
-        hsmetrics.target_regions = self.refdata['targets'][targets][
-            'targets-interval_list-slopped20']
-        hsmetrics.bait_regions = self.refdata['targets'][targets][
-            'targets-interval_list-slopped20']
-        hsmetrics.bait_name = targets
-        hsmetrics.output_metrics = "{}/qc/picard/{}/{}.picard-hsmetrics.txt".format(
+        hsmetrics_output = "{}/qc/picard/{}/{}.picard-hsmetrics.txt".format(
             self.outdir, unique_capture.capture_kit_id, capture_str)
-        hsmetrics.jobname = "picard-hsmetrics-{}".format(capture_str)
-        self.add(hsmetrics)
+        coverage_hist_output = "{}/qc/{}.coverage-histogram.txt".format(
+            self.outdir, capture_str)
+
+        if self.get_job_param('single-pass-panel-qc'):
+            self.configure_single_pass_panel_qc(bam, targets, capture_str, isize_output, oxog_output,
+                                                hsmetrics_output, coverage_hist_output)
+        else:
+            isize = PicardCollectInsertSizeMetrics()
+            isize.input = bam
+            isize.output_metrics = isize_output
+            isize.jobname = "picard-isize-{}".format(capture_str)
+            self.add(isize)
+
+            oxog = PicardCollectOxoGMetrics()
+            oxog.input = bam
+            oxog.reference_sequence = self.refdata['reference_genome']
+            oxog.output_metrics = oxog_output
+            oxog.jobname = "picard-oxog-{}".format(capture_str)
+            self.add(oxog)
+
+            hsmetrics = PicardCollectHsMetrics()
+            hsmetrics.input = bam
+            hsmetrics.reference_sequence = self.refdata['reference_genome']
+            hsmetrics.target_regions = self.refdata['targets'][targets][
+                'targets-interval_list-slopped20']
+            hsmetrics.bait_regions = self.refdata['targets'][targets][
+                'targets-interval_list-slopped20']
+            hsmetrics.bait_name = targets
+            hsmetrics.output_metrics = hsmetrics_output
+            hsmetrics.jobname = "picard-hsmetrics-{}".format(capture_str)
+            self.add(hsmetrics)
+
+            coverage_hist = CoverageHistogram()
+            # FIXME: Ugly temporary solution to allow the alascca pipeline to use a specific
+            # targets file:
+            coverage_hist.input_bed = self.get_coverage_bed(targets)
+            coverage_hist.input_bam = bam
+            coverage_hist.output = coverage_hist_output
+            coverage_hist.jobname = "alascca-coverage-hist/{}".format(capture_str)
+            self.add(coverage_hist)
 
         sambamba = SambambaDepth()
         sambamba.targets_bed = self.refdata['targets'][targets]['targets-bed-slopped20']
@@ -938,24 +1134,43 @@ class ClinseqPipeline(PypedreamPipeline):
         sambamba.jobname = "sambamba-depth-{}".format(capture_str)
         self.add(sambamba)
 
-        coverage_hist = CoverageHistogram()
-        # FIXME: Ugly temporary solution to allow the alascca pipeline to use a specific
-        # targets file:
-        coverage_hist.input_bed = self.get_coverage_bed(targets)
-        coverage_hist.input_bam = bam
-        coverage_hist.output = "{}/qc/{}.coverage-histogram.txt".format(
-            self.outdir, capture_str)
-        coverage_hist.jobname = "alascca-coverage-hist/{}".format(capture_str)
-        self.add(coverage_hist)
-
         coverage_qc_call = CoverageCaveat()
         coverage_qc_call.low_thresh_fraction = self.get_job_param('cov-low-thresh-fraction')
         coverage_qc_call.low_thresh_fold_cov = self.get_job_param('cov-low-thresh-fold-cov')
-        coverage_qc_call.input_histogram = coverage_hist.output
+        coverage_qc_call.input_histogram = coverage_hist_output
         coverage_qc_call.output = "{}/qc/{}.coverage-qc-call.json".format(self.outdir, capture_str)
         coverage_qc_call.jobname = "coverage-qc-call/{}".format(capture_str)
         self.add(coverage_qc_call)
         self.capture_to_results[unique_capture].cov_qc_call = coverage_qc_call.output
 
-        return [isize.output_metrics, oxog.output_metrics, hsmetrics.output_metrics,
-                sambamba.output, coverage_hist.output, coverage_qc_call.output]
+        return [isize_output, oxog_output, hsmetrics_output,
+                sambamba.output, coverage_hist_output, coverage_qc_call.output]
+
+    def configure_single_pass_panel_qc(self, bam, targets, capture_str, isize_output, oxog_output,
+                                       hsmetrics_output, coverage_hist_output):
+        """
+        Configure the Picard insert size, OxoG and hybrid selection metrics and the target coverage
+        histogram for a given library capture as a single job reading the bam file once, see PanelQC.
+
+        :param bam: The bam file for the library capture.
+        :param targets: The name of the capture panel used.
+        :param capture_str: The library capture string.
+        :param isize_output: The insert size metrics file.
+        :param oxog_output: The OxoG metrics file.
+        :param hsmetrics_output: The hybrid selection metrics file.
+        :param coverage_hist_output: The target coverage histogram file.
+        """
+
+        panel_qc = PanelQC()
+        panel_qc.input_bam = bam
+        panel_qc.reference_sequence = self.refdata['reference_genome']
+        panel_qc.target_interval_list = self.refdata['targets'][targets]['targets-interval_list-slopped20']
+        panel_qc.bait_name = targets
+        panel_qc.output_isize = isize_output
+        panel_qc.output_oxog = oxog_output
+        panel_qc.coverage_bed = self.get_coverage_bed(targets)
+        panel_qc.output_hsmetrics = hsmetrics_output
+        panel_qc.output_coverage_histogram = coverage_hist_output
+        panel_qc.scratch = self.scratch
+        panel_qc.jobname = "panel-qc/{}".format(capture_str)
+        self.add(panel_qc)
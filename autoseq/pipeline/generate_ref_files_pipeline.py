@@ -8,7 +8,8 @@ from pypedream.runners.shellrunner import Shellrunner
 
 from autoseq.tools.genes import FilterGTFChromosomes, GTF2GenePred, FilterGTFGenes
 from autoseq.tools.indexing import BwaIndex, SamtoolsFaidx, GenerateChrSizes
-from autoseq.tools.intervals import SlopIntervalList, IntervalListToBed, MsiSensorScan, IntersectMsiSites
+from autoseq.tools.intervals import SlopIntervalList, IntervalListToBed, MsiSensorScan, IntersectMsiSites, \
+    SplitTargets
 from autoseq.tools.picard import PicardCreateSequenceDictionary
 from autoseq.tools.qc import *
 from autoseq.tools.unix import Gunzip, Curl, Copy
@@ -22,7 +23,7 @@ class GenerateRefFilesPipeline(PypedreamPipeline):
     outdir = None
     maxcores = None
 
-    def __init__(self, genome_resources, outdir, maxcores=1, runner=Shellrunner()):
+    def __init__(self, genome_resources, outdir, maxcores=1, runner=Shellrunner(), num_target_shards=8):
         PypedreamPipeline.__init__(self, normpath(outdir), runner=runner)
 
         self.genome_resources = genome_resources
@@ -32,6 +33,7 @@ class GenerateRefFilesPipeline(PypedreamPipeline):
         self.swegene_common_vcf = "{}/swegen_common.vcf.gz".format(genome_resources)
         self.outdir = outdir
         self.maxcores = maxcores
+        self.num_target_shards = num_target_shards
         self.reference_data = dict()
 
         self.exac_remote = "ftp://ftp.broadinstitute.org/pub/ExAC_release/release0.3.1/ExAC.r0.3.1.sites.vep.vcf.gz"
@@ -166,6 +168,21 @@ class GenerateRefFilesPipeline(PypedreamPipeline):
             else:
                 self.reference_data['targets'][kit_name]['cnvkit-ref'] = None
 
+            if self.num_target_shards > 1:
+                # Use the expected per-target depth, if available, to balance the shards. The profile
+                # has the unslopped target coordinates, and is matched to the slopped targets by overlap:
+                depth_profile_file = stripsuffix(file_full_path, ".interval_list") + ".depth.bed"
+                split_targets = SplitTargets()
+                split_targets.input = interval_list_to_bed.output
+                if os.path.exists(depth_profile_file):
+                    split_targets.input_depth_profile = depth_profile_file
+                split_targets.output_shards = [
+                    "{}/intervals/targets/shards/{}.slopped20.shard-{}.bed".format(self.outdir, kit_name, idx)
+                    for idx in range(self.num_target_shards)]
+                self.add(split_targets)
+                self.reference_data['targets'][kit_name]['targets-bed-slopped20-shards'] = \
+                    split_targets.output_shards
+
             self.reference_data['targets'][kit_name]['targets-interval_list'] = copy_file.output
             self.reference_data['targets'][kit_name]['targets-interval_list-slopped20'] = slop_interval_list.output
             self.reference_data['targets'][kit_name]['targets-bed-slopped20'] = interval_list_to_bed.output
@@ -256,6 +273,9 @@ class GenerateRefFilesPipeline(PypedreamPipeline):
             for k, v in d.items():
                 if isinstance(v, dict):
                     make_paths_relative(v)
+                elif isinstance(v, list):
+                    d[k] = [os.path.relpath(item, self.outdir) if item and self.outdir in item else item
+                            for item in v]
                 else:
                     if v and self.outdir in v:
                         d[k] = os.path.relpath(v, self.outdir)
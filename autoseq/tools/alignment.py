@@ -1,7 +1,9 @@
 from pypedream.job import *
 from pypedream.tools.unix import Cat
 
-from autoseq.util.path import normpath
+from autoseq.tools.picard import PicardMergeSamFiles
+from autoseq.util.path import normpath, place_output_cmd
+from autoseq.util.streams import failed_marker, fifo_stream_cmd, record_failure_cmd, tmpdir_cmd
 from autoseq.util.clinseq_barcode import *
 
 __author__ = 'dankle'
@@ -17,7 +19,9 @@ class Bwa(Job):
         self.remove_duplicates = True
         self.readgroup = None
         self.output = None  # output ports must start with "output", can be "output_metrics", "output", etc
-        self.duplication_metrics = None
+        self.output_duplication_metrics = None
+        self.max_threads = 32
+        self.memory = 6
         self.jobname = "bwa"
 
     def command(self):
@@ -34,7 +38,7 @@ class Bwa(Job):
                required("2>", bwalog) + \
                "| samblaster -M --addMateTags " + \
                conditional(self.remove_duplicates, "--removeDups") + \
-               optional("--metricsFile ", self.duplication_metrics) + \
+               optional("--metricsFile ", self.output_duplication_metrics) + \
                required("2>", samblasterlog) + \
                "| samtools view -Sb -u - " + \
                "| samtools sort " + \
@@ -53,12 +57,15 @@ class Skewer(Job):
         self.input1 = None
         self.input2 = None
         self.output1 = None
-        self.output2 = None
-        self.stats = None
+        self.output2 = None  # Only for paired end data
+        self.output_stats = None
+        self.placement = "move"
+        self.max_threads = 8
+        self.memory = 1
         self.jobname = "skewer"
 
     def command(self):
-        if not self.output1.endswith(".gz") or not self.output2.endswith(".gz"):
+        if not self.output1.endswith(".gz") or (self.output2 and not self.output2.endswith(".gz")):
             raise ValueError("Output files need to end with .gz")
 
         tmpdir = os.path.join(self.scratch, "skewer-" + str(uuid.uuid4()))
@@ -80,18 +87,171 @@ class Skewer(Job):
                      required("-o ", prefix) + \
                      required("", self.input1) + \
                      optional("", self.input2)
-        copy_output_cmd = "cp " + out_fq1 + " " + self.output1 + \
-            conditional(self.input2, " && cp " + out_fq2 + " " + self.output2)
+        copy_output_cmd = place_output_cmd(out_fq1, self.output1, self.placement)
+        if self.input2:
+            copy_output_cmd += " && " + place_output_cmd(out_fq2, self.output2, self.placement)
 
-        copy_stats_cmd = "cp " + out_stats + " " + self.stats
+        copy_stats_cmd = place_output_cmd(out_stats, self.output_stats, self.placement)
         rm_cmd = "rm -r {}".format(tmpdir)
         return " && ".join([mkdir_cmd, skewer_cmd, copy_output_cmd, copy_stats_cmd, rm_cmd])
 
 
+class SkewerBwa(Job):
+    """
+    Trims the reads of all fastq files of a clinseq barcode with skewer and streams the
+    trimmed reads directly into bwa, without writing trimmed fastq files. The skewer output
+    files are links to the streams read by bwa, see fifo_stream_cmd(). The job fails without
+    leaving processes behind if skewer or bwa fails.
+    """
+
+    def __init__(self):
+        Job.__init__(self)
+        self.input_fastq1s = None
+        self.input_fastq2s = None  # Optional, for paired end data
+        self.input_reference_sequence = None
+        self.remove_duplicates = True
+        self.readgroup = None
+        self.output = None
+        self.output_stats = None  # One skewer stats file per input fastq (pair)
+        self.placement = "move"
+        self.max_threads = 32
+        self.memory = 6
+        self.jobname = "skewer-bwa"
+
+    def command(self):
+        required("", self.input_fastq1s)
+        required("", self.output_stats)
+
+        tmpdir = os.path.join(self.scratch, "skewer-bwa-" + str(uuid.uuid4()))
+        fastq2s = self.input_fastq2s or [None] * len(self.input_fastq1s)
+        paired = any(fastq2s)
+
+        link_cmds = []
+        skewer_cmds = []
+        copy_stats_cmds = []
+        for idx, (fastq1, fastq2, stats) in enumerate(zip(self.input_fastq1s, fastq2s, self.output_stats)):
+            prefix = "{}/{}".format(tmpdir, idx)
+            # The trimmed reads of all fastq files are written to one stream per read:
+            if fastq2:
+                link_cmds.append("ln -s /dev/fd/3 {}-trimmed-pair1.fastq".format(prefix))
+                link_cmds.append("ln -s /dev/fd/4 {}-trimmed-pair2.fastq".format(prefix))
+            else:
+                link_cmds.append("ln -s /dev/fd/3 {}-trimmed.fastq".format(prefix))
+            skewer_cmds.append("skewer " + optional("-t ", self.threads) + " --quiet " +
+                               required("-o ", prefix) + required("", fastq1) + optional("", fastq2))
+            copy_stats_cmds.append(place_output_cmd(prefix + "-trimmed.log", stats, self.placement))
+
+        bwa = Bwa()
+        bwa.input_fastq1 = "/dev/fd/3"
+        bwa.input_fastq2 = "/dev/fd/4" if paired else None
+        bwa.input_reference_sequence = self.input_reference_sequence
+        bwa.remove_duplicates = self.remove_duplicates
+        bwa.readgroup = self.readgroup
+        bwa.threads = self.threads
+        bwa.output = self.output
+        bwa.scratch = tmpdir
+
+        num_streams = 2 if paired else 1
+        stream_cmd = fifo_stream_cmd(tmpdir, " && ".join(skewer_cmds), num_streams,
+                                     [(bwa.command(), range(num_streams))])
+        return tmpdir_cmd(tmpdir, " && ".join(link_cmds + [stream_cmd] + copy_stats_cmds))
+
+
+class BwaMergeMarkDuplicates(Job):
+    """
+    Aligns the reads of several clinseq barcodes, sorts them together and marks duplicates in a
+    single streaming step, producing one final indexed bam file. The barcodes are aligned one
+    after the other into one stream, with all their read groups in the header, so that only the
+    sort writes to scratch. Duplicates are marked once by samtools markdup, within each library
+    (LB) as by PicardMarkDuplicates, which cannot read its input from a stream. The metrics file
+    holds the samtools markdup statistics.
+    """
+
+    def __init__(self):
+        Job.__init__(self)
+        self.input_fastq1s = None  # One trimmed fastq file per clinseq barcode
+        self.input_fastq2s = None  # Optional, for paired end data
+        self.readgroups = None
+        self.input_reference_sequence = None
+        self.remove_duplicates = True
+        self.output = None
+        self.output_metrics = None
+        self.max_threads = 32
+        # bwa and the sort buffers:
+        self.memory = 11
+        self.jobname = "bwa-merge-markdups"
+
+    def command(self):
+        required("", self.input_fastq1s)
+        required("", self.readgroups)
+
+        tmpdir = "{}/bwa-merge-markdups-{}".format(self.scratch, uuid.uuid4())
+        bwalog = self.output + ".bwa.log"
+        fastq2s = self.input_fastq2s or [None] * len(self.input_fastq1s)
+        align_cmds = []
+        for idx, (fastq1, fastq2, readgroup) in enumerate(zip(self.input_fastq1s, fastq2s, self.readgroups)):
+            # The first alignment writes the header, with the read groups of all barcodes, and the
+            # header lines of the others are dropped:
+            bwa_cmd = "bwa mem -M -v 1 " + \
+                      required("-R ", readgroup) + \
+                      (repeat("-H ", self.readgroups[1:]) if idx == 0 else "") + \
+                      optional("-t ", self.threads) + \
+                      required(" ", self.input_reference_sequence) + \
+                      required(" ", fastq1) + \
+                      optional("", fastq2) + \
+                      required("2>> ", bwalog)
+            align_cmds.append(record_failure_cmd(bwa_cmd, tmpdir) + ("" if idx == 0 else " | grep -v '^@'"))
+
+        fixmate_cmd = "samtools fixmate -m -u - -"
+        sort_cmd = "samtools sort -u " + \
+                   required("-T ", "{}/sort".format(tmpdir)) + \
+                   optional("-@ ", self.threads) + " -"
+        markdup_cmd = "samtools markdup " + \
+                      required("-T ", "{}/markdup".format(tmpdir)) + \
+                      optional("-@ ", self.threads) + \
+                      conditional(self.remove_duplicates, "-r") + \
+                      required("-f ", self.output_metrics) + \
+                      required(" - ", self.output)
+
+        stream_cmd = " | ".join(["{{ {} ; }}".format(" ; ".join(align_cmds)),
+                                 record_failure_cmd(fixmate_cmd, tmpdir),
+                                 record_failure_cmd(sort_cmd, tmpdir),
+                                 markdup_cmd])
+        return tmpdir_cmd(tmpdir, stream_cmd + " && [ ! -e {} ]".format(failed_marker(tmpdir))) + \
+            " && samtools index " + self.output + \
+            " && cat {} && rm {}".format(bwalog, bwalog)
+
+
+class SplitFastq(Job):
+    """
+    Splits a gzipped fastq file into chunks by distributing the reads in a round-robin
+    fashion, so that the read pairs of two fastq files split with the same number of
+    chunks stay in the same order.
+    """
+
+    def __init__(self):
+        Job.__init__(self)
+        self.input = None
+        self.output_chunks = None
+        self.max_threads = 1
+        self.memory = 1
+        self.jobname = "split-fastq"
+
+    def command(self):
+        required("", self.output_chunks)
+        return "gzip -dc " + required("", self.input) + \
+               " | awk -v outputs=\"{}\" ".format(" ".join(self.output_chunks)) + \
+               "'BEGIN {{ n = split(outputs, chunks, \" \") }} " \
+               "{{ print | (\"gzip -1 -c > \" chunks[int((NR - 1) / 4) % n + 1]) }}'".format()
+
+
 def align_library(pipeline, fq1_files, fq2_files, clinseq_barcode, ref, outdir, maxcores=1,
-                  remove_duplicates=True):
+                  remove_duplicates=True, streamed=False, per_lane=False, num_chunks=1):
     """
     Align fastq files for a PE library
+    :param streamed: Stream the trimmed reads directly into bwa, see align_streamed()
+    :param per_lane: Align each input fastq (pair) as a separate job, see align_chunked()
+    :param num_chunks: Split the reads into this many chunks aligned as separate jobs, see align_chunked()
     :param remove_duplicates:
     :param pipeline:
     :param fq1_files:
@@ -102,7 +262,13 @@ def align_library(pipeline, fq1_files, fq2_files, clinseq_barcode, ref, outdir,
     :param maxcores:
     :return:
     """
-    if not fq2_files:
+    if streamed:
+        return align_streamed(pipeline, fq1_files, fq2_files, clinseq_barcode, ref, outdir, maxcores,
+                              remove_duplicates)
+    elif per_lane or num_chunks > 1:
+        return align_chunked(pipeline, fq1_files, fq2_files, clinseq_barcode, ref, outdir, maxcores,
+                             remove_duplicates, None if per_lane else num_chunks)
+    elif not fq2_files:
         logging.debug("lib {} is SE".format(clinseq_barcode))
         return align_se(pipeline, fq1_files, clinseq_barcode, ref, outdir, maxcores, remove_duplicates)
     else:
@@ -123,6 +289,186 @@ def align_se(pipeline, fq1_files, clinseq_barcode, ref, outdir, maxcores, remove
     :return:
     """
     logging.debug("Aligning files: {}".format(fq1_files))
+    trimmed_fq1 = trim_se(pipeline, fq1_files, clinseq_barcode, outdir, maxcores)
+
+    bwa = Bwa()
+    bwa.input_fastq1 = trimmed_fq1
+    bwa.input_reference_sequence = ref
+    bwa.remove_duplicates = remove_duplicates
+    bwa.readgroup = compose_readgroup(clinseq_barcode)
+
+    bwa.threads = maxcores
+    bwa.output = "{}/{}.bam".format(outdir, clinseq_barcode)
+    bwa.scratch = pipeline.scratch
+    bwa.jobname = "bwa/{}".format(clinseq_barcode)
+    bwa.is_intermediate = False
+    pipeline.add(bwa)
+
+    return bwa.output
+
+
+def align_pe(pipeline, fq1_files, fq2_files, clinseq_barcode, ref, outdir, maxcores=1, remove_duplicates=True):
+    """
+    align paired end data
+    :param pipeline:
+    :param fq1_files:
+    :param fq2_files:
+    :param lib:
+    :param ref:
+    :param outdir:
+    :param maxcores:
+    :param remove_duplicates:
+    :return:
+    """
+    trimmed_fq1, trimmed_fq2 = trim_pe(pipeline, fq1_files, fq2_files, clinseq_barcode, outdir, maxcores)
+
+    bwa = Bwa()
+    bwa.input_fastq1 = trimmed_fq1
+    bwa.input_fastq2 = trimmed_fq2
+    bwa.input_reference_sequence = ref
+    bwa.remove_duplicates = remove_duplicates
+    bwa.readgroup = compose_readgroup(clinseq_barcode)
+
+    bwa.threads = maxcores
+    bwa.output = "{}/{}.bam".format(outdir, clinseq_barcode)
+    bwa.jobname = "bwa/{}".format(clinseq_barcode)
+    bwa.scratch = pipeline.scratch
+    bwa.is_intermediate = False
+    pipeline.add(bwa)
+
+    return bwa.output
+
+
+def align_streamed(pipeline, fq1_files, fq2_files, clinseq_barcode, ref, outdir, maxcores=1, remove_duplicates=True):
+    """
+    Align single or paired end data, trimming the reads and streaming them into bwa in a single
+    job. Produces the same bam and skewer stats files as align_se/align_pe, but no trimmed fastq files.
+    :param pipeline:
+    :param fq1_files:
+    :param fq2_files:
+    :param clinseq_barcode:
+    :param ref:
+    :param outdir:
+    :param maxcores:
+    :param remove_duplicates:
+    :return:
+    """
+    fq1_abs = [normpath(x) for x in fq1_files]
+    fq2_abs = [normpath(x) for x in fq2_files] if fq2_files else None
+    stats_dir = outdir + "/skewer/libs" if fq2_files else outdir + "/skewer"
+    logging.debug("Streaming trimmed reads from {} and {} into bwa".format(fq1_abs, fq2_abs))
+
+    bwa = SkewerBwa()
+    bwa.input_fastq1s = fq1_abs
+    bwa.input_fastq2s = fq2_abs
+    bwa.output_stats = [stats_dir + "/skewer-stats-{}.log".format(os.path.basename(fq1)) for fq1 in fq1_abs]
+    bwa.input_reference_sequence = ref
+    bwa.remove_duplicates = remove_duplicates
+    bwa.readgroup = compose_readgroup(clinseq_barcode)
+    bwa.threads = maxcores
+    bwa.output = "{}/{}.bam".format(outdir, clinseq_barcode)
+    bwa.jobname = "skewer-bwa/{}".format(clinseq_barcode)
+    bwa.scratch = pipeline.scratch
+    bwa.is_intermediate = False
+    pipeline.add(bwa)
+
+    return bwa.output
+
+
+def align_chunked(pipeline, fq1_files, fq2_files, clinseq_barcode, ref, outdir, maxcores=1, remove_duplicates=True,
+                  num_chunks=None):
+    """
+    Align single or paired end data as several independent jobs, which are then merged into
+    the same bam file as produced by align_se/align_pe, with the same read group. Duplicates
+    are removed within each chunk only; duplicates across chunks are left to be marked
+    after merging.
+    :param pipeline:
+    :param fq1_files:
+    :param fq2_files:
+    :param clinseq_barcode:
+    :param ref:
+    :param outdir:
+    :param maxcores:
+    :param remove_duplicates:
+    :param num_chunks: The number of read chunks to split the trimmed reads into. If None, each
+    input fastq (pair) is aligned separately.
+    :return:
+    """
+    if fq2_files:
+        trimmed = trim_pe(pipeline, fq1_files, fq2_files, clinseq_barcode, outdir, maxcores,
+                          concatenate=num_chunks is not None)
+    else:
+        trimmed = (trim_se(pipeline, fq1_files, clinseq_barcode, outdir, maxcores,
+                           concatenate=num_chunks is not None), None)
+
+    if num_chunks is None:
+        chunks1, chunks2 = trimmed
+    else:
+        chunks1 = []
+        chunks2 = [] if fq2_files else None
+        for read_idx, (trimmed_fq, chunks) in enumerate(zip(trimmed, [chunks1, chunks2])):
+            if trimmed_fq is None:
+                continue
+            split_fastq = SplitFastq()
+            split_fastq.input = trimmed_fq
+            split_fastq.output_chunks = [outdir + "/chunks/{}-chunk{}_{}.fastq.gz".format(
+                clinseq_barcode, chunk_idx, read_idx + 1) for chunk_idx in range(num_chunks)]
+            split_fastq.jobname = "split-fastq/{}/{}".format(clinseq_barcode, read_idx + 1)
+            split_fastq.is_intermediate = True
+            pipeline.add(split_fastq)
+            chunks.extend(split_fastq.output_chunks)
+
+    chunk_bams = []
+    for chunk_idx, chunk_fq1 in enumerate(chunks1):
+        bwa = Bwa()
+        bwa.input_fastq1 = chunk_fq1
+        bwa.input_fastq2 = chunks2[chunk_idx] if chunks2 else None
+        bwa.input_reference_sequence = ref
+        bwa.remove_duplicates = remove_duplicates
+        bwa.readgroup = compose_readgroup(clinseq_barcode)
+        bwa.threads = maxcores
+        bwa.output = "{}/chunks/{}-chunk{}.bam".format(outdir, clinseq_barcode, chunk_idx)
+        bwa.jobname = "bwa/{}/{}".format(clinseq_barcode, chunk_idx)
+        bwa.scratch = pipeline.scratch
+        bwa.is_intermediate = True
+        pipeline.add(bwa)
+        chunk_bams.append(bwa.output)
+
+    merge_bams = PicardMergeSamFiles(chunk_bams, "{}/{}.bam".format(outdir, clinseq_barcode))
+    merge_bams.jobname = "picard-mergechunks/{}".format(clinseq_barcode)
+    merge_bams.is_intermediate = False
+    pipeline.add(merge_bams)
+
+    return merge_bams.output_bam
+
+
+def compose_readgroup(clinseq_barcode):
+    """
+    Compose the bwa read group argument for the specified clinseq barcode. The library ID
+    is used as LB, so that duplicates are marked within each library.
+
+    :param clinseq_barcode: A clinseq barcode.
+    :return: Quoted read group string.
+    """
+    parsed = parse_clinseq_barcode(clinseq_barcode)
+    library_id = parsed.prep_id
+    sample_string = compose_sample_str(parsed.unique_capture)
+
+    return "\"@RG\\tID:{rg_id}\\tSM:{rg_sm}\\tLB:{rg_lb}\\tPL:ILLUMINA\"".format(\
+        rg_id=clinseq_barcode, rg_sm=sample_string, rg_lb=library_id)
+
+
+def trim_se(pipeline, fq1_files, clinseq_barcode, outdir, maxcores, concatenate=True):
+    """
+    Trim single end fastq files and concatenate the results
+    :param pipeline:
+    :param fq1_files:
+    :param clinseq_barcode:
+    :param outdir:
+    :param maxcores:
+    :param concatenate: If False, return the trimmed fastq files without concatenating them
+    :return: The concatenated trimmed fastq file, or list of trimmed fastq files
+    """
     fq1_abs = [normpath(x) for x in fq1_files]
     fq1_trimmed = []
     for fq1 in fq1_abs:
@@ -130,8 +476,7 @@ def align_se(pipeline, fq1_files, clinseq_barcode, ref, outdir, maxcores, remove
         skewer.input1 = fq1
         skewer.input2 = None
         skewer.output1 = outdir + "/skewer/{}".format(os.path.basename(fq1))
-        skewer.output2 = outdir + "/skewer/unused-dummyfq2-{}".format(os.path.basename(fq1))
-        skewer.stats = outdir + "/skewer/skewer-stats-{}.log".format(os.path.basename(fq1))
+        skewer.output_stats = outdir + "/skewer/skewer-stats-{}.log".format(os.path.basename(fq1))
         skewer.threads = maxcores
         skewer.jobname = "skewer/{}".format(os.path.basename(fq1))
         skewer.scratch = pipeline.scratch
@@ -139,6 +484,9 @@ def align_se(pipeline, fq1_files, clinseq_barcode, ref, outdir, maxcores, remove
         fq1_trimmed.append(skewer.output1)
         pipeline.add(skewer)
 
+    if not concatenate:
+        return fq1_trimmed
+
     cat1 = Cat()
     cat1.input = fq1_trimmed
     cat1.output = outdir + "/skewer/{}_1.fastq.gz".format(clinseq_barcode)
@@ -146,39 +494,21 @@ def align_se(pipeline, fq1_files, clinseq_barcode, ref, outdir, maxcores, remove
     cat1.is_intermediate = False
     pipeline.add(cat1)
 
-    bwa = Bwa()
-    bwa.input_fastq1 = cat1.output
-    bwa.input_reference_sequence = ref
-    bwa.remove_duplicates = remove_duplicates
-
-    library_id = parse_prep_id(clinseq_barcode)
-    sample_string = compose_sample_str(extract_unique_capture(clinseq_barcode))
-
-    bwa.readgroup = "\"@RG\\tID:{rg_id}\\tSM:{rg_sm}\\tLB:{rg_lb}\\tPL:ILLUMINA\"".format(\
-        rg_id=clinseq_barcode, rg_sm=sample_string, rg_lb=library_id)
-
-    bwa.threads = maxcores
-    bwa.output = "{}/{}.bam".format(outdir, clinseq_barcode)
-    bwa.scratch = pipeline.scratch
-    bwa.jobname = "bwa/{}".format(clinseq_barcode)
-    bwa.is_intermediate = False
-    pipeline.add(bwa)
-
-    return bwa.output
+    return cat1.output
 
 
-def align_pe(pipeline, fq1_files, fq2_files, clinseq_barcode, ref, outdir, maxcores=1, remove_duplicates=True):
+def trim_pe(pipeline, fq1_files, fq2_files, clinseq_barcode, outdir, maxcores, concatenate=True):
     """
-    align paired end data
+    Trim paired end fastq files and concatenate the results
     :param pipeline:
     :param fq1_files:
     :param fq2_files:
-    :param lib:
-    :param ref:
+    :param clinseq_barcode:
     :param outdir:
     :param maxcores:
-    :param remove_duplicates:
-    :return:
+    :param concatenate: If False, return the trimmed fastq files without concatenating them
+    :return: Tuple of the concatenated trimmed fastq files for read 1 and read 2, or of lists of
+    trimmed fastq files
     """
     fq1_abs = [normpath(x) for x in fq1_files]
     fq2_abs = [normpath(x) for x in fq2_files]
@@ -194,7 +524,7 @@ def align_pe(pipeline, fq1_files, fq2_files, clinseq_barcode, ref, outdir, maxco
         skewer.input2 = fq2
         skewer.output1 = outdir + "/skewer/libs/{}".format(os.path.basename(fq1))
         skewer.output2 = outdir + "/skewer/libs/{}".format(os.path.basename(fq2))
-        skewer.stats = outdir + "/skewer/libs/skewer-stats-{}.log".format(os.path.basename(fq1))
+        skewer.output_stats = outdir + "/skewer/libs/skewer-stats-{}.log".format(os.path.basename(fq1))
         skewer.threads = maxcores
         skewer.jobname = "skewer/{}".format(os.path.basename(fq1))
         skewer.scratch = pipeline.scratch
@@ -203,6 +533,9 @@ def align_pe(pipeline, fq1_files, fq2_files, clinseq_barcode, ref, outdir, maxco
         fq2_trimmed.append(skewer.output2)
         pipeline.add(skewer)
 
+    if not concatenate:
+        return fq1_trimmed, fq2_trimmed
+
     cat1 = Cat()
     cat1.input = fq1_trimmed
     cat1.output = outdir + "/skewer/{}-concatenated_1.fastq.gz".format(clinseq_barcode)
@@ -217,21 +550,46 @@ def align_pe(pipeline, fq1_files, fq2_files, clinseq_barcode, ref, outdir, maxco
     cat2.is_intermediate = True
     pipeline.add(cat2)
 
-    bwa = Bwa()
-    bwa.input_fastq1 = cat1.output
-    bwa.input_fastq2 = cat2.output
-    bwa.input_reference_sequence = ref
-    bwa.remove_duplicates = remove_duplicates
+    return cat1.output, cat2.output
 
-    library_id = parse_prep_id(clinseq_barcode)
-    sample_string = compose_sample_str(extract_unique_capture(clinseq_barcode))
 
-    bwa.readgroup = "\"@RG\\tID:{rg_id}\\tSM:{rg_sm}\\tLB:{rg_lb}\\tPL:ILLUMINA\"".format(\
-        rg_id=clinseq_barcode, rg_sm=sample_string, rg_lb=library_id)
+def align_capture(pipeline, barcodes_to_fastqs, ref, outdir, output_bam, output_metrics, maxcores=1,
+                  remove_duplicates=True):
+    """
+    Align the fastq files of all clinseq barcodes of one unique capture, and merge and mark
+    duplicates in a single job
+    :param pipeline:
+    :param barcodes_to_fastqs: List of (clinseq_barcode, fq1_files, fq2_files) tuples
+    :param ref:
+    :param outdir: Output folder for the trimmed fastq files
+    :param output_bam: The final bam file
+    :param output_metrics: The duplicate marking metrics file
+    :param maxcores:
+    :param remove_duplicates:
+    :return: The final bam file
+    """
+    bwa = BwaMergeMarkDuplicates()
+    bwa.input_fastq1s = []
+    bwa.input_fastq2s = []
+    bwa.readgroups = []
+    for clinseq_barcode, fq1_files, fq2_files in barcodes_to_fastqs:
+        if fq2_files:
+            trimmed_fq1, trimmed_fq2 = trim_pe(pipeline, fq1_files, fq2_files, clinseq_barcode, outdir, maxcores)
+        else:
+            trimmed_fq1 = trim_se(pipeline, fq1_files, clinseq_barcode, outdir, maxcores)
+            trimmed_fq2 = None
+        bwa.input_fastq1s.append(trimmed_fq1)
+        bwa.input_fastq2s.append(trimmed_fq2)
+        bwa.readgroups.append(compose_readgroup(clinseq_barcode))
+    if not any(bwa.input_fastq2s):
+        bwa.input_fastq2s = None
 
+    bwa.input_reference_sequence = ref
+    bwa.remove_duplicates = remove_duplicates
     bwa.threads = maxcores
-    bwa.output = "{}/{}.bam".format(outdir, clinseq_barcode)
-    bwa.jobname = "bwa/{}".format(clinseq_barcode)
+    bwa.output = output_bam
+    bwa.output_metrics = output_metrics
+    bwa.jobname = "bwa-merge-markdups/{}".format(os.path.basename(output_bam))
     bwa.scratch = pipeline.scratch
     bwa.is_intermediate = False
     pipeline.add(bwa)
@@ -4,6 +4,8 @@ import uuid
 
 from pypedream.job import Job, repeat, required, optional, conditional, stripsuffix
 
+from autoseq.util.path import place_output_cmd
+
 
 class QDNASeq(Job):
     def __init__(self, input_bam, output_segments, background=None):
@@ -11,6 +13,8 @@ class QDNASeq(Job):
         self.input = input_bam
         self.output = output_segments
         self.background = background
+        self.max_threads = 1
+        self.memory = 4
         self.jobname = "qdnaseq"
 
     def command(self):
@@ -28,6 +32,8 @@ class QDNASeq2Bed(Job):
         self.input_segments = input_segments
         self.output_bed = output_bed
         self.genes_gtf = genes_gtf
+        self.max_threads = 1
+        self.memory = 1
 
     def command(self):
         qdnaseq2bed_cmd = "qdnaseq2bed.py -n segments " + \
@@ -51,6 +57,8 @@ class AlasccaCNAPlot(Job):
         self.output_png = None
         self.output_cna = None
         self.output_purity = None
+        self.max_threads = 1
+        self.memory = 2
         self.jobname = "alascca-cna"
 
     def command(self):
@@ -75,6 +83,9 @@ class CNVkit(Job):
         self.output_cns = output_cns
         self.targets_bed = targets_bed
         self.scratch = scratch
+        self.placement = "move"
+        self.max_threads = 1
+        self.memory = 4
 
     def command(self):
         if not self.reference and not self.targets_bed:
@@ -89,7 +100,11 @@ class CNVkit(Job):
                      conditional(self.targets_bed, "-n") + \
                      optional("-t ", self.targets_bed) + \
                      required("-d ", tmpdir)
-        copy_cns_cmd = "cp {}/{}.cns ".format(tmpdir, sample_prefix) + required(" ", self.output_cns)
-        copy_cnr_cmd = "cp {}/{}.cnr ".format(tmpdir, sample_prefix) + required(" ", self.output_cnr)
+        required("", self.output_cns)
+        required("", self.output_cnr)
+        copy_cns_cmd = place_output_cmd("{}/{}.cns".format(tmpdir, sample_prefix), self.output_cns,
+                                        self.placement)
+        copy_cnr_cmd = place_output_cmd("{}/{}.cnr".format(tmpdir, sample_prefix), self.output_cnr,
+                                        self.placement)
         rm_cmd = "rm -r {}".format(tmpdir)
         return " && ".join([cnvkit_cmd, copy_cns_cmd, copy_cnr_cmd, rm_cmd])
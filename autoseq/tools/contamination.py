@@ -14,6 +14,8 @@ class CreateContestVCFs(Job):
         self.input_target_regions_bed_2 = None
         self.input_population_vcf = None
         self.output = None
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "create_contest_vcfs"
 
     def command(self):
@@ -34,12 +36,14 @@ class ContEst(Job):
         self.input_genotype_bam = None
         self.input_population_af_vcf = None
         self.output = None
+        self.max_threads = 1
+        self.memory = 15
         self.jobname = "contest"
 
     def command(self):
         min_genotype_ratio = "0.95"
 
-        return "java -Xmx15g -jar $GATK -T ContEst " + \
+        return "java -Xmx{}g -jar $GATK -T ContEst ".format(self.memory) + \
             required("-R ", self.reference_genome) + \
             required("-I:eval ", self.input_eval_bam) + \
             required("-I:genotype ", self.input_genotype_bam) + \
@@ -56,6 +60,8 @@ class ContEstToContamCaveat(Job):
         Job.__init__(self)
         self.input_contest_results = None
         self.output = None
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "contest_to_contam_qc"
 
     def command(self):
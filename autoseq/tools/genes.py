@@ -6,6 +6,8 @@ class FilterGTFChromosomes(Job):
         Job.__init__(self)
         self.input = None
         self.output = None
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "filter-gtf-chrs"
 
     def command(self):
@@ -19,6 +21,8 @@ class FilterGTFGenes(Job):
         Job.__init__(self)
         self.input = None
         self.output = None
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "filter-gtf-genes"
 
     def command(self):
@@ -33,6 +37,8 @@ class GTF2GenePred(Job):
         Job.__init__(self)
         self.input = None
         self.output = None
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "gtf2genepred"
 
     def command(self):
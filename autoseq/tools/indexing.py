@@ -7,6 +7,8 @@ class BwaIndex(Job):
         self.input_fasta = None
         self.algorithm = "bwtsw"
         self.output = None
+        self.max_threads = 1
+        self.memory = 6
         self.jobname = "bwa-index"
 
     def command(self):
@@ -20,6 +22,8 @@ class SamtoolsFaidx(Job):
         Job.__init__(self)
         self.input_fasta = None
         self.output = None
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "samtools-faidx"
 
     def command(self):
@@ -32,6 +36,8 @@ class GenerateChrSizes(Job):
         Job.__init__(self)
         self.input_fai = None
         self.output = None
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "make-chrsizes"
 
     def command(self):
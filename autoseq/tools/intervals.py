@@ -1,5 +1,7 @@
 import uuid
-from pypedream.job import required, Job, conditional
+from pypedream.job import required, optional, Job, conditional, repeat
+
+from autoseq.util.path import place_output_cmd
 
 
 class SlopIntervalList(Job):
@@ -7,6 +9,8 @@ class SlopIntervalList(Job):
         Job.__init__(self)
         self.input = None
         self.output = None
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "slop-interval-list"
 
     def command(self):
@@ -20,6 +24,8 @@ class IntervalListToBed(Job):
         Job.__init__(self)
         self.input = None
         self.output = None
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "interval-list-to-bed"
 
     def command(self):
@@ -28,12 +34,62 @@ class IntervalListToBed(Job):
                required(" ", self.output)
 
 
+class SplitTargets(Job):
+    def __init__(self):
+        Job.__init__(self)
+        self.input = None
+        self.input_depth_profile = None
+        self.output_shards = None
+        self.max_threads = 1
+        self.memory = 1
+        self.jobname = "split-targets"
+
+    def command(self):
+        return "autoseq-split-targets " + \
+               optional("--depth-profile ", self.input_depth_profile) + \
+               required(" ", self.input) + \
+               repeat(" ", self.output_shards)
+
+
+def target_shards(pipeline, target_name, num_shards, output_prefix, jobname="split-targets"):
+    """
+    Get a list of contiguous shards of the slopped target BED for the specified capture panel.
+    Shards precomputed by generate-ref are used if there are num_shards of them, otherwise
+    a job producing the shards is added to the pipeline, unless it has already been added.
+
+    :param pipeline: The analysis pipeline to add the splitting job to if needed.
+    :param target_name: The name of the capture panel used.
+    :param num_shards: The number of shards to produce.
+    :param output_prefix: Prefix for the shard file names, if a splitting job is added.
+    :param jobname: Job name for the splitting job.
+    :return: List of shard BED file names, in target order.
+    """
+    targets = pipeline.refdata['targets'][target_name]
+    precomputed_shards = targets.get('targets-bed-slopped20-shards')
+    if precomputed_shards and len(precomputed_shards) == num_shards:
+        return precomputed_shards
+
+    output_shards = ["{}.targets-{}.bed".format(output_prefix, idx) for idx in range(num_shards)]
+    for job in pipeline.graph.nodes():
+        if isinstance(job, SplitTargets) and job.output_shards == output_shards:
+            return job.output_shards
+
+    split_targets = SplitTargets()
+    split_targets.input = targets['targets-bed-slopped20']
+    split_targets.output_shards = output_shards
+    split_targets.jobname = jobname
+    pipeline.add(split_targets)
+    return split_targets.output_shards
+
+
 class MsiSensorScan(Job):
     def __init__(self):
         Job.__init__(self)
         self.input_fasta = None
         self.output = None
         self.homopolymers_only = True
+        self.max_threads = 1
+        self.memory = 2
         self.jobname = "msisensor-scan"
 
     def command(self):
@@ -49,6 +105,8 @@ class IntersectMsiSites(Job):
         self.input_msi_sites = None
         self.target_bed = None
         self.output_msi_sites = True
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "msi-intersect"
 
     def command(self):
@@ -65,6 +123,9 @@ class MsiSensor(Job):
         self.input_normal_bam = None
         self.input_tumor_bam = None
         self.output = None
+        self.placement = "move"
+        self.max_threads = 8
+        self.memory = 2
         self.jobname = "msisensor"
 
     def command(self):
@@ -81,6 +142,6 @@ class MsiSensor(Job):
                required("-t ", self.input_tumor_bam) + \
                required("-o ", output_prefix) + \
                required("-b ", self.threads) + \
-               " && cp {} {}".format(output_prefix, self.output) + \
-               " && rm {} {} {} {}".format(output_table, output_dis,
+               " && " + place_output_cmd(output_table, self.output, self.placement) + \
+               " && rm -f {} {} {} {}".format(output_table, output_dis,
                                            output_germline, output_somatic)
@@ -6,10 +6,12 @@ class PicardCollectInsertSizeMetrics(Job):
         Job.__init__(self)
         self.input = None
         self.output_metrics = None
+        self.max_threads = 1
+        self.memory = 2
         self.jobname = "picard-isize"
 
     def command(self):
-        return "picard -XX:ParallelGCThreads=1 CollectInsertSizeMetrics H=/dev/null" + \
+        return "picard -XX:ParallelGCThreads=1 -Xmx{}g CollectInsertSizeMetrics H=/dev/null".format(self.memory) + \
                required("I=", self.input) + \
                required("O=", self.output_metrics)
 
@@ -22,10 +24,12 @@ class PicardCollectGcBiasMetrics(Job):
         self.output_metrics = None
         self.output_summary = None
         self.stop_after = None
+        self.max_threads = 1
+        self.memory = 5
         self.jobname = "picard-gcbias"
 
     def command(self):
-        return "picard -XX:ParallelGCThreads=1 -Xmx5g CollectGcBiasMetrics CHART=/dev/null" + \
+        return "picard -XX:ParallelGCThreads=1 -Xmx{}g CollectGcBiasMetrics CHART=/dev/null".format(self.memory) + \
                required("I=", self.input) + \
                required("O=", self.output_metrics) + \
                required("S=", self.output_summary) + \
@@ -39,10 +43,12 @@ class PicardCollectOxoGMetrics(Job):
         self.input = None
         self.reference_sequence = None
         self.output_metrics = None
+        self.max_threads = 1
+        self.memory = 2
         self.jobname = "picard-oxog"
 
     def command(self):
-        return "picard -XX:ParallelGCThreads=1 -Xmx2g CollectOxoGMetrics " + \
+        return "picard -XX:ParallelGCThreads=1 -Xmx{}g CollectOxoGMetrics ".format(self.memory) + \
                required("I=", self.input) + \
                required("R=", self.reference_sequence) + \
                required("O=", self.output_metrics)
@@ -58,10 +64,12 @@ class PicardCollectHsMetrics(Job):
         self.bait_name = None
         self.output_metrics = None
         self.accumulation_level = ['LIBRARY']
+        self.max_threads = 1
+        self.memory = 2
         self.jobname = "picard-hsmetrics"
 
     def command(self):
-        return "picard -XX:ParallelGCThreads=1 CollectHsMetrics " + \
+        return "picard -XX:ParallelGCThreads=1 -Xmx{}g CollectHsMetrics ".format(self.memory) + \
                required("I=", self.input) + \
                required("R=", self.reference_sequence) + \
                required("O=", self.output_metrics) + \
@@ -80,10 +88,12 @@ class PicardCollectWgsMetrics(Job):
         self.minimum_base_quality = None
         self.coverage_cap = None
         self.output_metrics = None
+        self.max_threads = 1
+        self.memory = 2
         self.jobname = "picard-wgsmetrics"
 
     def command(self):
-        return "picard -XX:ParallelGCThreads=1 CollectWgsMetrics " + \
+        return "picard -XX:ParallelGCThreads=1 -Xmx{}g CollectWgsMetrics ".format(self.memory) + \
                required("I=", self.input) + \
                required("R=", self.reference_sequence) + \
                required("O=", self.output_metrics) + \
@@ -97,10 +107,12 @@ class PicardCreateSequenceDictionary(Job):
         Job.__init__(self)
         self.input = None
         self.output_dict = None
+        self.max_threads = 1
+        self.memory = 2
         self.jobname = "picard-createdict"
 
     def command(self):
-        return "picard -XX:ParallelGCThreads=1 CreateSequenceDictionary " + \
+        return "picard -XX:ParallelGCThreads=1 -Xmx{}g CreateSequenceDictionary ".format(self.memory) + \
                required("REFERENCE=", self.input) + \
                required("OUTPUT=", self.output_dict)
 
@@ -111,10 +123,12 @@ class PicardBedToIntervalList(Job):
         self.input = None
         self.reference_dict = None
         self.output = None
+        self.max_threads = 1
+        self.memory = 2
         self.jobname = "picard-bedtointervallist"
 
     def command(self):
-        return "picard -XX:ParallelGCThreads=1 BedToIntervalList " + \
+        return "picard -XX:ParallelGCThreads=1 -Xmx{}g BedToIntervalList ".format(self.memory) + \
                required("INPUT=", self.input) + \
                required("SEQUENCE_DICTIONARY=", self.reference_dict) + \
                required("OUTPUT=", self.output)
@@ -127,10 +141,12 @@ class PicardMergeSamFiles(Job):
         self.output_bam = output_bam
         self.assume_sorted = assume_sorted
         self.merge_dicts = merge_dicts
+        self.max_threads = 1
+        self.memory = 2
         self.jobname = "picard-mergesamfiles"
 
     def command(self):
-        return "picard -XX:ParallelGCThreads=1 MergeSamFiles " + \
+        return "picard -XX:ParallelGCThreads=1 -Xmx{}g MergeSamFiles ".format(self.memory) + \
                repeat("INPUT=", self.input_bams) + \
                required("ASSUME_SORTED=", str(self.assume_sorted).lower()) + \
                required("MERGE_SEQUENCE_DICTIONARIES=", str(self.merge_dicts).lower()) + \
@@ -145,10 +161,12 @@ class PicardMarkDuplicates(Job):
         self.output_bam = output_bam
         self.output_metrics = output_metrics
         self.remove_duplicates = remove_duplicates
+        self.max_threads = 1
+        self.memory = 5
         self.jobname = "picard-markdups"
 
     def command(self):
-        return "picard -Xmx5g -XX:ParallelGCThreads=1 " + \
+        return "picard -XX:ParallelGCThreads=1 -Xmx{}g ".format(self.memory) + \
             required("-Djava.io.tmpdir=", self.scratch) + \
                 " MarkDuplicates " + \
                 required("INPUT=", self.input_bam) + \
@@ -1,5 +1,8 @@
 import os
+import uuid
 from pypedream.job import Job, required, optional, conditional, repeat
+from autoseq.tools.picard import PicardCollectInsertSizeMetrics, PicardCollectOxoGMetrics, PicardCollectHsMetrics
+from autoseq.util.streams import fifo_stream_cmd, record_failure_cmd, tmpdir_cmd
 
 
 class HeterzygoteConcordance(Job):
@@ -12,6 +15,8 @@ class HeterzygoteConcordance(Job):
         self.normalid = None
         self.filter_reads_with_N_cigar = True
         self.output = None
+        self.max_threads = 1
+        self.memory = 4
         self.jobname = "hzconcordance"
 
     def command(self):
@@ -32,6 +37,8 @@ class FastQC(Job):
         self.output = None
         self.outdir = None
         self.extract = False
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "fastqc"
 
     def command(self):
@@ -48,6 +55,8 @@ class MultiQC(Job):
         self.output = None
         self.report_title = None
         self.data_format = 'json'
+        self.max_threads = 1
+        self.memory = 2
         self.jobname = "multiqc"
 
     def command(self):
@@ -73,6 +82,8 @@ class SambambaDepth(Job):
         self.targets_bed = None
         self.coverage_thresholds = [30, 50, 70, 100, 200, 300]
         self.output = None
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "sambamba-depth"
 
     def command(self):
@@ -90,6 +101,8 @@ class BedtoolsCoverageHistogram(Job):
         self.input_bed = None
         self.tag = None
         self.output = None
+        self.max_threads = 1
+        self.memory = 4
 
     def command(self):
         tag_cmd = ""
@@ -111,6 +124,8 @@ class CoverageHistogram(Job):
         self.input_bed = None
         self.min_basequal = None
         self.output = None
+        self.max_threads = 1
+        self.memory = 1
 
     def command(self):
         return "target_coverage_histogram.py " + \
@@ -129,6 +144,8 @@ class CoverageCaveat(Job):
         self.high_thresh_fold_cov = 100
         self.low_thresh_fraction = 0.95
         self.low_thresh_fold_cov = 50
+        self.max_threads = 1
+        self.memory = 1
 
     def command(self):
         return "extract_coverage_caveat.py " + \
@@ -138,3 +155,70 @@ class CoverageCaveat(Job):
                required("--low-thresh-fraction ", self.low_thresh_fraction) + \
                required("--low-thresh-fold-cov ", self.low_thresh_fold_cov) + \
                required("> ", self.output)
+
+
+class PanelQC(Job):
+    """
+    Runs the Picard insert size, OxoG and hybrid selection metrics collectors and the target
+    coverage histogram on a BAM file read only once: the BAM is streamed with tee to the four
+    tools, see fifo_stream_cmd(). Picard treats an input that is not a regular file as a stream,
+    so the collectors read their stream sequentially without looking for an index. The Picard
+    output files are identical to those of the individual jobs. The histogram is computed with
+    samtools depth, which streams the reads instead of holding them in memory as bedtools
+    coverage does for unsorted input, in the format of the "all" lines of bedtools coverage -hist.
+    Sambamba depth fetches the reads of each target region through the BAM index, so it is not
+    run by this job. The job fails if tee or any of the tools fails.
+    """
+
+    def __init__(self):
+        Job.__init__(self)
+        self.input_bam = None
+        self.reference_sequence = None
+        self.target_interval_list = None
+        self.bait_name = None
+        self.coverage_bed = None
+        self.min_basequal = None
+        self.output_isize = None
+        self.output_oxog = None
+        self.output_hsmetrics = None
+        self.output_coverage_histogram = None
+        # One thread each for the three Picard collectors and samtools depth:
+        self.max_threads = 4
+        # The heaps of the three Picard collectors:
+        self.memory = 6
+        self.jobname = "panel-qc"
+
+    def command(self):
+        tmpdir = "{}/panel-qc-{}".format(self.scratch, uuid.uuid4())
+
+        isize = PicardCollectInsertSizeMetrics()
+        isize.input = "/dev/fd/3"
+        isize.output_metrics = self.output_isize
+
+        oxog = PicardCollectOxoGMetrics()
+        oxog.input = "/dev/fd/3"
+        oxog.reference_sequence = self.reference_sequence
+        oxog.output_metrics = self.output_oxog
+
+        hsmetrics = PicardCollectHsMetrics()
+        hsmetrics.input = "/dev/fd/3"
+        hsmetrics.reference_sequence = self.reference_sequence
+        hsmetrics.target_regions = self.target_interval_list
+        hsmetrics.bait_regions = self.target_interval_list
+        hsmetrics.bait_name = self.bait_name
+        hsmetrics.output_metrics = self.output_hsmetrics
+
+        # Number of target positions at each depth, with the total and fraction of positions:
+        depth_cmd = "samtools depth -a " + \
+                    required("-b ", self.coverage_bed) + \
+                    optional("-q ", self.min_basequal) + " /dev/fd/3"
+        histogram_cmd = record_failure_cmd(depth_cmd, tmpdir) + \
+            " | awk '{ hist[$3]++ ; total++ } END { for (depth in hist) " \
+            "printf \"all\\t%d\\t%d\\t%d\\t%f\\n\", depth, hist[depth], total, hist[depth] / total }'" + \
+            " | sort -k2,2n " + required("> ", self.output_coverage_histogram)
+
+        tee_cmd = "tee /dev/fd/3 /dev/fd/4 /dev/fd/5 /dev/fd/6 " + required("< ", self.input_bam) + " > /dev/null"
+        return tmpdir_cmd(tmpdir, fifo_stream_cmd(tmpdir, tee_cmd, 4, [(isize.command(), [0]),
+                                                                       (oxog.command(), [1]),
+                                                                       (hsmetrics.command(), [2]),
+                                                                       (histogram_cmd, [3])]))
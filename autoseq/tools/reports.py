@@ -3,6 +3,8 @@ import uuid
 
 from pypedream.job import Job, required
 
+from autoseq.util.path import place_output_cmd
+
 
 class CompileMetadata(Job):
     def __init__(self, referral_db_conf, blood_barcode, tumor_barcode, output_json, addresses):
@@ -12,6 +14,8 @@ class CompileMetadata(Job):
         self.tumor_barcode = tumor_barcode
         self.output_json = output_json
         self.addresses = addresses
+        self.max_threads = 1
+        self.memory = 1
 
     def command(self):
         # compileMetadata 3098121 3098849 --db_config $HOME/repos/reportgen/tests/referral-db-config.json \
@@ -37,6 +41,8 @@ class CompileAlasccaGenomicJson(Job):
         self.input_tcov_qc = input_tcov_qc
         self.input_ncov_qc = input_ncov_qc
         self.output_json = output_json
+        self.max_threads = 1
+        self.memory = 1
 
     def command(self):
         return 'compileAlasccaGenomicReport ' + \
@@ -56,6 +62,9 @@ class WriteAlasccaReport(Job):
         self.input_metadata_json = input_metadata_json
         self.input_genomic_json = input_genomic_json
         self.output_pdf = output_pdf
+        self.placement = "move"
+        self.max_threads = 1
+        self.memory = 1
 
     def command(self):
         tmpdir = "{}/write-alascca-report-{}".format(self.scratch, uuid.uuid4())
@@ -67,7 +76,7 @@ class WriteAlasccaReport(Job):
               required('', self.input_genomic_json) + \
               required('', self.input_metadata_json)
 
-        cp_cmd = "cp {} {}".format(tmp_pdf, self.output_pdf)
+        cp_cmd = place_output_cmd(tmp_pdf, self.output_pdf, self.placement)
         rmdir_cmd = "rm -r {}".format(tmpdir)
 
         return " && ".join([mkdir_tmp_cmd, cmd, cp_cmd, rmdir_cmd])
@@ -16,6 +16,8 @@ class Copy(Job):
         Job.__init__(self)
         self.input = input_file
         self.output = output_file
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "copy"
 
     def command(self):
@@ -32,6 +34,8 @@ class Gunzip(Job):
         Job.__init__(self)
         self.input = None
         self.output = None
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "gunzip"
 
     def command(self):
@@ -45,6 +49,8 @@ class Curl(Job):
         Job.__init__(self)
         self.remote = None
         self.output = None
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "curl"
 
     def command(self):
@@ -3,7 +3,9 @@ import sys
 import uuid
 
 from pypedream.job import Job, repeat, required, optional, conditional
+from autoseq.tools.intervals import target_shards
 from autoseq.util.clinseq_barcode import *
+from autoseq.util.resources import command_threads
 from autoseq.util.vcfutils import vt_split_and_leftaln, fix_ambiguous_cl, remove_dup_cl
 
 
@@ -19,14 +21,15 @@ class Freebayes(Job):
         self.min_alt_frac = 0.01
         self.use_harmonic_indel_quals = False
         self.output = ""
+        self.max_threads = 32
+        self.memory = 8
         self.jobname = "freebayes-somatic"
 
     def command(self):
         regions_file = "{scratch}/{uuid}.regions".format(scratch=self.scratch, uuid=uuid.uuid4())
         bed_to_regions_cmd = "cat {} | bed_to_regions.py > {}".format(self.target_bed, regions_file)
 
-        call_somatic_cmd = " | {} -c 'from autoseq.util.bcbio import call_somatic; import sys; print call_somatic(sys.stdin.read())' ".format(
-            sys.executable)
+        call_somatic_cmd = " | autoseq-somatic-filter "
 
         freebayes_cmd = "freebayes-parallel {} {} ".format(regions_file, self.threads) + \
                         required("-f ", self.reference_sequence) + " --use-mapping-quality " + \
@@ -48,7 +51,8 @@ class Freebayes(Job):
 
 class VarDict(Job):
     def __init__(self, input_tumor=None, input_normal=None, tumorid=None, normalid=None, reference_sequence=None,
-                 reference_dict=None, target_bed=None, output=None, min_alt_frac=0.1, min_num_reads=None):
+                 reference_dict=None, target_bed=None, output=None, min_alt_frac=0.1, min_num_reads=None,
+                 fused_postprocessing=False):
         Job.__init__(self)
         self.input_tumor = input_tumor
         self.input_normal = input_normal
@@ -60,29 +64,42 @@ class VarDict(Job):
         self.output = output
         self.min_alt_frac = min_alt_frac
         self.min_num_reads = min_num_reads
+        # Run the VarDict post-processing filters in a single python process:
+        self.fused_postprocessing = fused_postprocessing
+        # Optional list of VarDictShard outputs to use instead of running vardict-java here:
+        self.input_shards = None
+        self.max_threads = 1
+        self.memory = 8
 
     def command(self):
         required("", self.input_tumor)
         required("", self.input_normal)
 
         freq_filter = (" bcftools filter -e 'STATUS !~ \".*Somatic\"' 2> /dev/null "
-                       "| %s -c 'from autoseq.util.bcbio import depth_freq_filter_input_stream; import sys; print depth_freq_filter_input_stream(sys.stdin, %s, \"%s\")' " %
+                       "| %s -c 'from autoseq.util.bcbio import depth_freq_filter_input_stream; import sys; depth_freq_filter_input_stream(sys.stdin, %s, \"%s\")' " %
                        (sys.executable, 0, 'bwa'))
 
         somatic_filter = (" sed 's/\\.*Somatic\\\"/Somatic/' "  # changes \".*Somatic\" to Somatic
                           "| sed 's/REJECT,Description=\".*\">/REJECT,Description=\"Not Somatic via VarDict\">/' "
-                          "| %s -c 'from autoseq.util.bcbio import call_somatic; import sys; print call_somatic(sys.stdin.read())' " % sys.executable)
-
-        cmd = "vardict-java " + required("-G ", self.reference_sequence) + \
-              optional("-f ", self.min_alt_frac) + \
-              required("-N ", self.tumorid) + \
-              optional("-r ", self.min_num_reads) + \
-              " -b \"{}|{}\" ".format(self.input_tumor, self.input_normal) + \
-              " -c 1 -S 2 -E 3 -g 4 -Q 10 " + required("", self.target_bed) + \
-              " | testsomatic.R " + \
+                          "| autoseq-somatic-filter ")
+
+        if self.fused_postprocessing:
+            postprocessing = " autoseq-vardict-postprocess --tumor-index 0 --aligner bwa "
+        else:
+            postprocessing = freq_filter + " | " + somatic_filter + " | " + fix_ambiguous_cl() + " | " + remove_dup_cl()
+
+        if self.input_shards:
+            # Raw per-shard output, in the same order as the target regions:
+            calling_cmd = "cat " + repeat(" ", self.input_shards)
+        else:
+            calling_cmd = vardict_calling_cmd(self.reference_sequence, self.tumorid, self.input_tumor,
+                                              self.input_normal, self.target_bed, self.min_alt_frac,
+                                              self.min_num_reads)
+
+        cmd = calling_cmd + \
               " | var2vcf_paired.pl -P 0.9 -m 4.25 -M " + required("-f ", self.min_alt_frac) + \
               " -N \"{}|{}\" ".format(self.tumorid, self.normalid) + \
-              " | " + freq_filter + " | " + somatic_filter + " | " + fix_ambiguous_cl() + " | " + remove_dup_cl() + \
+              " | " + postprocessing + \
               " | vcfstreamsort -w 1000 " + \
               " | " + vt_split_and_leftaln(self.reference_sequence) + \
               " | bcftools view --apply-filters .,PASS " + \
@@ -91,6 +108,51 @@ class VarDict(Job):
         return cmd
 
 
+class VarDictShard(Job):
+    """
+    Runs the calling part of VarDict on a subset of the target regions. The raw output
+    of a set of shards is turned into a VCF by a VarDict job with input_shards set.
+    """
+
+    def __init__(self, input_tumor=None, input_normal=None, tumorid=None, reference_sequence=None,
+                 input_target_bed=None, output=None, min_alt_frac=0.1, min_num_reads=None):
+        Job.__init__(self)
+        self.input_tumor = input_tumor
+        self.input_normal = input_normal
+        self.tumorid = tumorid
+        self.reference_sequence = reference_sequence
+        self.input_target_bed = input_target_bed
+        self.output = output
+        self.min_alt_frac = min_alt_frac
+        self.min_num_reads = min_num_reads
+        self.max_threads = 1
+        self.memory = 8
+        self.jobname = "vardict-shard"
+
+    def command(self):
+        required("", self.input_tumor)
+        required("", self.input_normal)
+
+        return vardict_calling_cmd(self.reference_sequence, self.tumorid, self.input_tumor,
+                                   self.input_normal, self.input_target_bed, self.min_alt_frac,
+                                   self.min_num_reads) + \
+               required(" > ", self.output)
+
+
+def vardict_calling_cmd(reference_sequence, tumorid, input_tumor, input_normal, target_bed,
+                        min_alt_frac, min_num_reads):
+    """
+    Command line running paired VarDict calling and testsomatic.R over the specified target regions.
+    """
+    return "vardict-java " + required("-G ", reference_sequence) + \
+           optional("-f ", min_alt_frac) + \
+           required("-N ", tumorid) + \
+           optional("-r ", min_num_reads) + \
+           " -b \"{}|{}\" ".format(input_tumor, input_normal) + \
+           " -c 1 -S 2 -E 3 -g 4 -Q 10 " + required("", target_bed) + \
+           " | testsomatic.R "
+
+
 class VEP(Job):
     def __init__(self):
         Job.__init__(self)
@@ -98,14 +160,18 @@ class VEP(Job):
         self.output_vcf = None
         self.reference_sequence = None
         self.vep_dir = None
+        # VEP forks do not scale beyond a few processes, and each holds its own copy of the cache:
+        self.max_threads = 4
+        self.memory = 8
         self.jobname = "vep"
         self.additional_options = ""
 
     def command(self):
         bgzip = ""
         fork = ""
-        if self.threads > 1:  # vep does not accept "--fork 1", so need to check.
-            fork = " --fork {} ".format(self.threads)
+        threads = command_threads(self)
+        if threads > 1:  # vep does not accept "--fork 1", so need to check.
+            fork = " --fork {} ".format(threads)
         if self.output_vcf.endswith('gz'):
             bgzip = " | bgzip "
 
@@ -133,6 +199,8 @@ class VcfAddSample(Job):
         self.samplename = None
         self.filter_hom = True
         self.output = None
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "vcf-add-sample"
 
     def command(self):
@@ -161,6 +229,8 @@ class VcfFilter(Job):
         self.input = None
         self.filter = None
         self.output = None
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "vcffilter"
 
     def command(self):
@@ -179,6 +249,8 @@ class CurlSplitAndLeftAlign(Job):
         self.input_reference_sequence = None
         self.input_reference_sequence_fai = None
         self.output = None
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "curl-split-leftaln"
 
     def command(self):
@@ -194,6 +266,8 @@ class InstallVep(Job):
     def __init__(self):
         Job.__init__(self)
         self.output_dir = None
+        self.max_threads = 1
+        self.memory = 1
         self.jobname = "fetch-vep-cache"
 
     def command(self):
@@ -205,7 +279,8 @@ class InstallVep(Job):
 
 def call_somatic_variants(pipeline, cancer_bam, normal_bam, cancer_capture, normal_capture,
                           target_name, outdir, callers=['vardict', 'freebayes'],
-                          min_alt_frac=0.1, min_num_reads=None):
+                          min_alt_frac=0.1, min_num_reads=None, fused_vardict_postprocessing=False,
+                          vardict_shards=1):
     """
     Configuring calling of somatic variants on a given pairing of cancer and normal bam files,
     using a set of specified algorithms.
@@ -219,6 +294,10 @@ def call_somatic_variants(pipeline, cancer_bam, normal_bam, cancer_capture, norm
     :param outdir: Output location
     :param callers: List of calling algorithms to use - can include 'vardict' and/or 'freebayes'
     :param min_alt_frac: The minimum allelic fraction value in order to retain a called variant 
+    :param min_num_reads: The minimum number of reads supporting a variant, for VarDict
+    :param fused_vardict_postprocessing: Post-process VarDict output in a single python process
+    rather than a chain of separate filtering processes
+    :param vardict_shards: Number of target region shards to run VarDict calling on in parallel
     :return: A dictionary with somatic caller name as key and corresponding output file location as value
     """
     cancer_capture_str = compose_lib_capture_str(cancer_capture)
@@ -250,10 +329,33 @@ def call_somatic_variants(pipeline, cancer_bam, normal_bam, cancer_capture, norm
                           reference_dict=pipeline.refdata['reference_dict'],
                           target_bed=pipeline.refdata['targets'][target_name]['targets-bed-slopped20'],
                           output="{}/variants/{}-{}.vardict-somatic.vcf.gz".format(outdir, cancer_capture_str, normal_capture_str),
-                          min_alt_frac=min_alt_frac, min_num_reads=min_num_reads
+                          min_alt_frac=min_alt_frac, min_num_reads=min_num_reads,
+                          fused_postprocessing=fused_vardict_postprocessing
                           )
 
         vardict.jobname = "vardict/{}".format(cancer_capture_str)
+
+        if vardict_shards > 1:
+            shard_prefix = "{}/variants/shards/{}-{}".format(outdir, cancer_capture_str, normal_capture_str)
+            shard_beds = target_shards(pipeline, target_name, vardict_shards,
+                                       "{}/intervals/shards/{}".format(pipeline.shared_outdir, target_name),
+                                       jobname="split-targets/{}".format(target_name))
+
+            # Only the conversion of the shard outputs to VCF is left for the VarDict job:
+            vardict.input_shards = []
+            vardict.memory = 1
+            for idx, shard_bed in enumerate(shard_beds):
+                vardict_shard = VarDictShard(input_tumor=cancer_bam, input_normal=normal_bam,
+                                             tumorid=tumor_sample_str,
+                                             reference_sequence=vardict.reference_sequence,
+                                             input_target_bed=shard_bed,
+                                             output="{}.vardict-{}.txt".format(shard_prefix, idx),
+                                             min_alt_frac=min_alt_frac, min_num_reads=min_num_reads)
+                vardict_shard.is_intermediate = True
+                vardict_shard.jobname = "vardict-shard/{}/{}".format(cancer_capture_str, idx)
+                pipeline.add(vardict_shard)
+                vardict.input_shards.append(vardict_shard.output)
+
         pipeline.add(vardict)
         d['vardict'] = vardict.output
 
@@ -1,20 +1,34 @@
 """
 Functions taken from bcbio. These are methods that can be run on the command line like so:
 
-python -c 'import sys; from autoseq.util.bcbio import depth_freq_filter; depth_freq_filter(sys.stdin.read(), 0, \"bwa\")'
+python -c 'import sys; from autoseq.util.bcbio import depth_freq_filter_input_stream; depth_freq_filter_input_stream(sys.stdin, 0, \"bwa\")'
 
-and
+The somatic filter is installed as a command line tool that reads a VCF on stdin:
 
-python -c 'import sys; from autoseq.util.bcbio import call_somatic; print call_somatic(sys.stdin.read())'
+autoseq-somatic-filter < input.vcf > output.vcf
 
 """
+import sys
 
 
-def depth_freq_filter_input_stream(input_stream, tumor_index, aligner):
-    processed_output = ""
-    for line in input_stream.readlines():
-        processed_output = processed_output + depth_freq_filter(line, tumor_index, aligner)
-    return processed_output
+def depth_freq_filter_input_stream(input_stream, tumor_index, aligner, output_stream=None):
+    """Apply depth_freq_filter to each line of a VCF stream.
+
+    Lines are read one at a time and each processed line is written to the output stream
+    directly, so memory use does not depend on the size of the input and downstream
+    stages of a pipe can start consuming records straight away.
+
+    :param input_stream: File-like object to read VCF lines from.
+    :param tumor_index: Index of the tumor sample among the VCF sample columns.
+    :param aligner: Name of the aligner used to produce the alignments.
+    :param output_stream: File-like object to write to. Defaults to sys.stdout.
+    """
+    if output_stream is None:
+        output_stream = sys.stdout
+    # iter(readline) rather than iterating the file object, which uses a read-ahead
+    # buffer in python 2 and would hold back records when reading from a pipe:
+    for line in iter(input_stream.readline, ""):
+        output_stream.write(depth_freq_filter(line, tumor_index, aligner))
 
 
 def depth_freq_filter(line, tumor_index, aligner):
@@ -45,34 +59,58 @@ def depth_freq_filter(line, tumor_index, aligner):
         return line
     else:
         parts = line.split("\t")
-        sample_ft = {a: v for (a, v) in zip(parts[8].split(":"), parts[9 + tumor_index].split(":"))}
-        qual = _safe_to_float(parts[5])
-        dp = _safe_to_float(sample_ft.get("DP"))
-        af = _safe_to_float(sample_ft.get("AF"))
-        nm = _safe_to_float(sample_ft.get("NM"))
-        mq = _safe_to_float(sample_ft.get("MQ"))
-        ssfs = [x for x in parts[7].split(";") if x.startswith("SSF=")]
-        pval = _safe_to_float(ssfs[0].split("=")[-1] if ssfs else None)
-        fname = None
-        if dp is not None and af is not None:
-            if dp * af < 6:
-                if aligner == "bwa" and nm is not None and mq is not None:
-                    if (mq < 55.0 and nm > 1.0) or (mq < 60.0 and nm > 2.0):
-                        fname = "LowAlleleDepth"
-                if dp < 10:
-                    fname = "LowAlleleDepth"
-                if qual is not None and qual < 45:
+        return "\t".join(depth_freq_filter_record(parts, tumor_index, aligner))
+
+
+def depth_freq_filter_record(parts, tumor_index, aligner):
+    """Apply the depth_freq_filter logic to a single VCF record that has already been
+    split into its tab-delimited fields.
+
+    :param parts: List of VCF record fields. Updated in place.
+    :return: The updated list of fields.
+    """
+    sample_ft = {a: v for (a, v) in zip(parts[8].split(":"), parts[9 + tumor_index].split(":"))}
+    qual = _safe_to_float(parts[5])
+    dp = _safe_to_float(sample_ft.get("DP"))
+    af = _safe_to_float(sample_ft.get("AF"))
+    nm = _safe_to_float(sample_ft.get("NM"))
+    mq = _safe_to_float(sample_ft.get("MQ"))
+    ssfs = [x for x in parts[7].split(";") if x.startswith("SSF=")]
+    pval = _safe_to_float(ssfs[0].split("=")[-1] if ssfs else None)
+    fname = None
+    if dp is not None and af is not None:
+        if dp * af < 6:
+            if aligner == "bwa" and nm is not None and mq is not None:
+                if (mq < 55.0 and nm > 1.0) or (mq < 60.0 and nm > 2.0):
                     fname = "LowAlleleDepth"
-        if af is not None and qual is not None and pval is not None:
-            if af < 0.2 and qual < 55 and pval > 0.06:
-                fname = "LowFreqQuality"
-        if fname:
-            if parts[6] in set([".", "PASS"]):
-                parts[6] = fname
-            else:
-                parts[6] += ";%s" % fname
-        line = "\t".join(parts)
-        return line
+            if dp < 10:
+                fname = "LowAlleleDepth"
+            if qual is not None and qual < 45:
+                fname = "LowAlleleDepth"
+    if af is not None and qual is not None and pval is not None:
+        if af < 0.2 and qual < 55 and pval > 0.06:
+            fname = "LowFreqQuality"
+    if fname:
+        if parts[6] in set([".", "PASS"]):
+            parts[6] = fname
+        else:
+            parts[6] += ";%s" % fname
+    return parts
+
+
+def call_somatic_input_stream(input_stream, output_stream=None):
+    """Apply call_somatic to each line of a VCF stream.
+
+    Records are written to the output stream as soon as they have been processed. The
+    FORMAT field indices are only worked out once for each distinct FORMAT string.
+
+    :param input_stream: File-like object to read VCF lines from.
+    :param output_stream: File-like object to write to. Defaults to sys.stdout.
+    """
+    if output_stream is None:
+        output_stream = sys.stdout
+    for line in iter(input_stream.readline, ""):
+        output_stream.write(call_somatic(line))
 
 
 def call_somatic(line):
@@ -108,15 +146,26 @@ def call_somatic(line):
         return line
     else:
         parts = line.split("\t")
-        if _check_lods(parts, tumor_thresh, normal_thresh) and _check_freqs(parts):
-            parts[7] += ";SOMATIC"
+        return "\t".join(call_somatic_record(parts, tumor_thresh, normal_thresh))
+
+
+def call_somatic_record(parts, tumor_thresh=3.5, normal_thresh=3.5):
+    """Apply the call_somatic logic to a single VCF record that has already been
+    split into its tab-delimited fields.
+
+    :param parts: List of VCF record fields. Updated in place.
+    :return: The updated list of fields.
+    """
+    format_indices = _get_format_indices(parts[8])
+    if _check_lods(parts, tumor_thresh, normal_thresh, format_indices) and \
+            _check_freqs(parts, format_indices):
+        parts[7] += ";SOMATIC"
+    else:
+        if parts[6] in set([".", "PASS"]):
+            parts[6] = "REJECT"
         else:
-            if parts[6] in set([".", "PASS"]):
-                parts[6] = "REJECT"
-            else:
-                parts[6] += ";REJECT"
-        line = "\t".join(parts)
-        return line
+            parts[6] += ";REJECT"
+    return parts
 
 
 def _safe_to_float(x):
@@ -129,14 +178,38 @@ def _safe_to_float(x):
             return None
 
 
-def _check_lods(parts, tumor_thresh, normal_thresh):
+# Cache of FORMAT field indices, keyed on the FORMAT string:
+_format_indices_cache = {}
+
+
+def _get_format_indices(format_str):
+    """Look up the indices of the GL, AO, RO and AF fields in a VCF FORMAT string.
+
+    Results are cached, as a VCF typically only contains a handful of distinct FORMAT strings.
+
+    :param format_str: The FORMAT column of a VCF record.
+    :return: A dictionary with field name as key and index (or None if missing) as value.
+    """
+    try:
+        return _format_indices_cache[format_str]
+    except KeyError:
+        fields = format_str.split(":")
+        indices = {}
+        for field in ["GL", "AO", "RO", "AF"]:
+            indices[field] = fields.index(field) if field in fields else None
+        _format_indices_cache[format_str] = indices
+        return indices
+
+
+def _check_lods(parts, tumor_thresh, normal_thresh, format_indices=None):
     """Ensure likelihoods for tumor and normal pass thresholds.
 
     Skipped if no FreeBayes GL annotations available.
     """
-    try:
-        gl_index = parts[8].split(":").index("GL")
-    except ValueError:
+    if format_indices is None:
+        format_indices = _get_format_indices(parts[8])
+    gl_index = format_indices["GL"]
+    if gl_index is None:
         return True
     try:
         tumor_gls = [float(x) for x in parts[9].split(":")[gl_index].split(",") if x != "."]
@@ -159,22 +232,21 @@ def _check_lods(parts, tumor_thresh, normal_thresh):
     return normal_lod >= normal_thresh and tumor_lod >= tumor_thresh
 
 
-def _check_freqs(parts):
+def _check_freqs(parts, format_indices=None):
     """Ensure frequency of tumor to normal passes a reasonable threshold.
 
     Avoids calling low frequency tumors also present at low frequency in normals,
     which indicates a contamination or persistent error.
     """
     thresh_ratio = 2.7
-    try:  # FreeBayes
-        ao_index = parts[8].split(":").index("AO")
-        ro_index = parts[8].split(":").index("RO")
-    except ValueError:
+    if format_indices is None:
+        format_indices = _get_format_indices(parts[8])
+    # FreeBayes:
+    ao_index, ro_index = format_indices["AO"], format_indices["RO"]
+    if ao_index is None or ro_index is None:
         ao_index, ro_index = None, None
-    try:  # VarDict
-        af_index = parts[8].split(":").index("AF")
-    except ValueError:
-        af_index = None
+    # VarDict:
+    af_index = format_indices["AF"]
     if af_index is None and ao_index is None:
         raise NotImplementedError("Unexpected format annotations: %s" % parts[0])
 
@@ -0,0 +1,322 @@
+"""
+Content-addressed cache of job outputs, shared across analysis output directories.
+
+A job's cache key is computed when the job runs, from its command line, the content of
+its input files, the executables of the tools it runs and the autoseq version. The command
+line is normalised first, so that output locations, scratch folders and random uuids do not
+affect the key. If the cache already holds outputs for the key, they are hardlinked (or
+copied, across filesystems) into place instead of running the command. Otherwise the command
+is run and its outputs are added to the cache.
+"""
+import distutils.spawn
+import hashlib
+import logging
+import os
+import pipes
+import re
+import shutil
+import subprocess
+import uuid
+
+UUID_REGEX = re.compile("[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+# Separators between the simple commands of a command line, each starting with a program name:
+COMMAND_SEPARATOR_REGEX = re.compile(r"\|\||&&|(?<![<>])&|[|;(){}\n]")
+REDIRECTION_REGEX = re.compile(r"^[0-9]*[<>]")
+
+# Files created next to job outputs by indexing commands, which are not job outputs themselves:
+INDEX_SUFFIXES = [".bai", ".tbi", ".fai", ".idx"]
+
+
+def autoseq_version():
+    """
+    :return: The installed autoseq version string, or "unknown".
+    """
+    try:
+        import pkg_resources
+        return pkg_resources.get_distribution("autoseq").version
+    except Exception:
+        return "unknown"
+
+
+def command_tools(command):
+    """
+    Get the names of the programs run by a command line. Words that only look like program
+    names, for example in quoted awk scripts, are harmless as they are not found on the PATH.
+
+    :param command: Command line string.
+    :return: Sorted list of program names.
+    """
+    tools = set()
+    for simple_command in COMMAND_SEPARATOR_REGEX.split(command):
+        words = [word for word in simple_command.split()
+                 if "=" not in word and word != "exec" and not REDIRECTION_REGEX.match(word)]
+        if words:
+            tools.add(words[0])
+    return sorted(tools)
+
+
+def tool_versions(command, cache_dir):
+    """
+    Identify the versions of the external tools run by a command line by the content of
+    their executables, as tools do not report their versions in a common way.
+
+    :param command: Command line string.
+    :param cache_dir: The cache folder.
+    :return: List of "program digest" strings, for the programs found on the PATH.
+    """
+    versions = []
+    for tool in command_tools(command):
+        executable = distutils.spawn.find_executable(tool)
+        if executable:
+            versions.append("{} {}".format(tool, file_digest(os.path.realpath(executable), cache_dir)))
+    return versions
+
+
+def job_files(job, prefix):
+    """
+    Get the files connected to a job port, following the pypedream convention that input
+    and output port attributes are named starting with "input" and "output".
+
+    :param job: A pypedream Job.
+    :param prefix: "input" or "output".
+    :return: Sorted list of file names.
+    """
+    filenames = []
+    for attribute, value in vars(job).items():
+        if not attribute.startswith(prefix) or not value:
+            continue
+        values = value if isinstance(value, list) else [value]
+        filenames.extend([v for v in values if isinstance(v, basestring)])
+    return sorted(set(filenames))
+
+
+def consumers_by_input(jobs):
+    """
+    :param jobs: List of pypedream Jobs.
+    :return: Dictionary with file names as keys and lists of the jobs reading them as values.
+    """
+    consumers = {}
+    for job in jobs:
+        for filename in job_files(job, "input"):
+            consumers.setdefault(filename, []).append(job)
+    return consumers
+
+
+def normalize_command(command, inputs, outputs, scratch):
+    """
+    Replace the parts of a command line that vary between otherwise identical runs with placeholders.
+
+    :param command: Command line string.
+    :param inputs: List of input file names.
+    :param outputs: List of output file names.
+    :param scratch: The scratch folder.
+    :return: Normalised command line string.
+    """
+    replacements = [(filename, "<input{}>".format(idx)) for idx, filename in enumerate(inputs)] + \
+                   [(filename, "<output{}>".format(idx)) for idx, filename in enumerate(outputs)]
+    if scratch:
+        replacements.append((scratch, "<scratch>"))
+
+    # Replace longer strings first, so that file names containing other file names are handled:
+    for original, placeholder in sorted(replacements, key=lambda item: len(item[0]), reverse=True):
+        command = command.replace(original, placeholder)
+    return UUID_REGEX.sub("<uuid>", command)
+
+
+def file_digest(filename, cache_dir):
+    """
+    Calculate the SHA-1 digest of a file's content. Digests are remembered in the cache folder
+    together with the file size and modification time, so that each file is only read once.
+
+    :param filename: The file to calculate the digest for.
+    :param cache_dir: The cache folder.
+    :return: Hex digest string.
+    """
+    stat = os.stat(filename)
+    signature = "{} {}".format(stat.st_size, stat.st_mtime)
+    memo_filename = os.path.join(cache_dir, "digests", hashlib.sha1(os.path.abspath(filename)).hexdigest())
+    if os.path.exists(memo_filename):
+        with open(memo_filename) as memo_file:
+            memo_signature, digest = memo_file.read().rsplit(" ", 1)
+        if memo_signature == signature:
+            return digest
+
+    sha1 = hashlib.sha1()
+    with open(filename, "rb") as input_file:
+        for block in iter(lambda: input_file.read(1024 * 1024), ""):
+            sha1.update(block)
+    digest = sha1.hexdigest()
+
+    _makedirs(os.path.dirname(memo_filename))
+    tmp_memo_filename = "{}.{}".format(memo_filename, uuid.uuid4())
+    with open(tmp_memo_filename, "w") as memo_file:
+        memo_file.write("{} {}".format(signature, digest))
+    os.rename(tmp_memo_filename, memo_filename)
+    return digest
+
+
+def cache_key(command, inputs, outputs, scratch, cache_dir, salt=""):
+    """
+    :param command: Command line string.
+    :param inputs: List of input file names.
+    :param outputs: List of output file names.
+    :param scratch: The scratch folder.
+    :param cache_dir: The cache folder.
+    :param salt: Additional string to include in the key, such as the job type.
+    :return: The cache key for running the command on the current input files.
+    """
+    sha1 = hashlib.sha1()
+    sha1.update(autoseq_version() + "\n")
+    sha1.update(salt + "\n")
+    sha1.update(normalize_command(command, inputs, outputs, scratch) + "\n")
+    for version in tool_versions(command, cache_dir):
+        sha1.update(version + "\n")
+    for filename in inputs:
+        # Inputs that are not regular files (e.g. folders) only contribute their name:
+        if os.path.isfile(filename):
+            sha1.update(file_digest(filename, cache_dir) + "\n")
+        else:
+            sha1.update(filename + "\n")
+    return sha1.hexdigest()
+
+
+def _makedirs(dirname):
+    if not os.path.isdir(dirname):
+        try:
+            os.makedirs(dirname)
+        except OSError:
+            # Created concurrently by another job:
+            if not os.path.isdir(dirname):
+                raise
+
+
+def link_or_copy(source, target):
+    """
+    Hardlink source to target, or copy it if that is not possible, replacing any existing target.
+    """
+    _makedirs(os.path.dirname(os.path.abspath(target)))
+    tmp_target = "{}.{}".format(target, uuid.uuid4())
+    try:
+        os.link(source, tmp_target)
+    except OSError:
+        shutil.copy2(source, tmp_target)
+    os.rename(tmp_target, target)
+
+
+def _entry_files(entry_dir, outputs):
+    """
+    :return: List of (cache file, output file) tuples for the outputs and their index files.
+    """
+    entry_files = []
+    for idx, output in enumerate(outputs):
+        entry_files.append((os.path.join(entry_dir, str(idx)), output))
+        for suffix in INDEX_SUFFIXES:
+            entry_files.append((os.path.join(entry_dir, str(idx) + suffix), output + suffix))
+    return entry_files
+
+
+def entry_dir(cache_dir, key):
+    return os.path.join(cache_dir, "objects", key[:2], key)
+
+
+def restore_outputs(key, outputs, cache_dir):
+    """
+    Place the cached outputs for a key at the specified output locations.
+
+    :return: True if the key was found in the cache, False otherwise.
+    """
+    cached_dir = entry_dir(cache_dir, key)
+    if not os.path.isdir(cached_dir):
+        return False
+
+    for cache_file, output in _entry_files(cached_dir, outputs):
+        if os.path.exists(cache_file):
+            link_or_copy(cache_file, output)
+    return True
+
+
+def store_outputs(key, outputs, cache_dir):
+    """
+    Add the outputs of a successful run to the cache. Outputs that are not regular files
+    (e.g. folders) are not cacheable, in which case nothing is stored.
+    """
+    if not all(os.path.isfile(output) for output in outputs):
+        logging.debug("Not caching outputs {}, as they are not all files".format(outputs))
+        return
+
+    final_dir = entry_dir(cache_dir, key)
+    tmp_dir = "{}.{}".format(final_dir, uuid.uuid4())
+    _makedirs(tmp_dir)
+    for cache_file, output in _entry_files(tmp_dir, outputs):
+        if os.path.exists(output):
+            link_or_copy(output, cache_file)
+    try:
+        os.rename(tmp_dir, final_dir)
+    except OSError:
+        # Stored concurrently by another job:
+        shutil.rmtree(tmp_dir)
+
+
+def run_cached(command, inputs, outputs, cache_dir, scratch, salt=""):
+    """
+    Satisfy a job from the cache if possible, otherwise run its command and cache the outputs.
+
+    :param command: Command line string.
+    :param inputs: List of input file names.
+    :param outputs: List of output file names.
+    :param cache_dir: The cache folder.
+    :param scratch: The scratch folder.
+    :param salt: Additional string to include in the key, such as the job type.
+    :return: The exit code of the command, or 0 if the outputs were restored from the cache.
+    """
+    key = cache_key(command, inputs, outputs, scratch, cache_dir, salt)
+    if restore_outputs(key, outputs, cache_dir):
+        logging.info("Restored {} from cache entry {}".format(outputs, key))
+        return 0
+
+    # Existing outputs may be hardlinks into the cache, which must not be written to:
+    for _, output in _entry_files("", outputs):
+        if os.path.isfile(output):
+            os.remove(output)
+
+    exitcode = subprocess.call(command, shell=True)
+    if exitcode == 0:
+        store_outputs(key, outputs, cache_dir)
+    return exitcode
+
+
+def cached_command(command, inputs, outputs, cache_dir, scratch, salt=""):
+    """
+    Wrap a command line so that it is run through the cache by autoseq-cache-run.
+
+    :return: Command line string.
+    """
+    return "autoseq-cache-run " + \
+           "--cache-dir {} ".format(pipes.quote(cache_dir)) + \
+           "--scratch {} ".format(pipes.quote(scratch)) + \
+           "--salt {} ".format(pipes.quote(salt)) + \
+           "".join(["-i {} ".format(pipes.quote(filename)) for filename in inputs]) + \
+           "".join(["-o {} ".format(pipes.quote(filename)) for filename in outputs]) + \
+           pipes.quote(command)
+
+
+def enable_job_cache(job, cache_dir, scratch):
+    """
+    Make a job run through the cache. The job's ports are read when its command is
+    generated, so they can still be changed after calling this.
+
+    :param job: A pypedream Job.
+    :param cache_dir: The cache folder.
+    :param scratch: The scratch folder, unless set for the job.
+    """
+    original_command = job.command
+
+    def command():
+        outputs = job_files(job, "output")
+        if not outputs:
+            return original_command()
+        return cached_command(original_command(), job_files(job, "input"), outputs, cache_dir,
+                              getattr(job, "scratch", None) or scratch, salt=type(job).__name__)
+
+    job.command = command
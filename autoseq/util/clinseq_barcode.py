@@ -17,24 +17,50 @@ UniqueCapture = collections.namedtuple(
     'capture_kit_id']
 )
 
+# The fields of a parsed clinseq barcode, with the unique library capture it belongs to:
+ClinseqBarcode = collections.namedtuple(
+    'ClinseqBarcode',
 
-def data_available_for_clinseq_barcode(libdir, clinseq_barcode):
+    ['barcode',
+    'project',
+    'sdid',
+    'sample_type',
+    'sample_id',
+    'prep_id',
+    'capture_id',
+    'unique_capture']
+)
+
+SDID_REGEX = re.compile("^P-[a-zA-Z0-9]+$")
+SAMPLE_ID_REGEX = re.compile("^[a-zA-Z0-9]+$")
+PREP_ID_REGEX = re.compile("^[A-Z]{2}[0-9]+$")
+CAPTURE_ID_REGEX = re.compile("^([A-Z]{2}[0-9]+|WGS)$")
+
+# All fields of a clinseq barcode, matched in a single pass:
+CLINSEQ_BARCODE_REGEX = re.compile(
+    "^(AL|LB|OT)-(P-[a-zA-Z0-9]+)-(N|T|CFDNA)-([a-zA-Z0-9]+)-([A-Z]{2}[0-9]+)-([A-Z]{2}[0-9]+|WGS)$")
+
+# Dictionary linking clinseq barcode strings to their ClinseqBarcode named tuples:
+_parsed_clinseq_barcodes = {}
+
+
+def data_available_for_clinseq_barcode(libdir, clinseq_barcode, scanner=None):
     """
     Check that data is available for the specified clinseq barcode in the specified library folder.
 
     :param libdir: Directory name where fastqs are organised.
     :param clinseq_barcode: A valid clinseq barcode string
+    :param scanner: Optional LibdirScanner or LibdirCatalogue of the library folder, to use the cached folder listings of.
     :return: True if data is available, False otherwise
     """
 
-    if not clinseq_barcode_is_valid(clinseq_barcode):
-        raise ValueError("Invalid clinseq barcode: " + clinseq_barcode)
+    parse_clinseq_barcode(clinseq_barcode)
 
     filedir = os.path.join(libdir, clinseq_barcode)
-    if not os.path.exists(filedir):
+    if not (scanner.has_library(clinseq_barcode) if scanner else os.path.exists(filedir)):
         logging.warn("Dir {} does not exists for {}. Not using library.".format(filedir, clinseq_barcode))
         return False
-    if find_fastqs(clinseq_barcode, libdir) == (None, None):
+    if find_fastqs(clinseq_barcode, libdir, scanner) == (None, None):
         logging.warn("No fastq files found for {} in dir {}".format(clinseq_barcode, filedir))
         return False
 
@@ -51,20 +77,41 @@ def convert_to_libdict(clinseq_barcode):
     :return: A dictionary containing the field types and values present in the barcode
     """
 
-    library_id = clinseq_barcode
+    parsed = parse_clinseq_barcode(clinseq_barcode)
+
+    return {"library_id": parsed.barcode, "capture_id": parsed.capture_id, "type": parsed.sample_type,
+            "sample_id": parsed.sample_id, "project_id": parsed.project, "sdid": parsed.sdid,
+            "prep_id": parsed.prep_id}
 
-    if not clinseq_barcode_is_valid(clinseq_barcode):
-        raise ValueError("Invalid clinseq barcode: " + clinseq_barcode)
 
-    capture_id = parse_capture_id(clinseq_barcode)
-    type = parse_sample_type(clinseq_barcode)
-    sample_id = parse_sample_id(clinseq_barcode)
-    project_id = parse_project(clinseq_barcode)
-    sdid = parse_sdid(clinseq_barcode)
-    prep_id = parse_prep_id(clinseq_barcode)
+def parse_clinseq_barcode(clinseq_barcode):
+    """
+    Parse all fields of the specified clinseq barcode in a single pass. Parsed barcodes
+    are cached, so that the same ClinseqBarcode is returned for repeated calls with the
+    same barcode.
+
+    :param clinseq_barcode: A clinseq barcode string
+    :return: ClinseqBarcode named tuple
+    """
+
+    parsed = _parsed_clinseq_barcodes.get(clinseq_barcode)
+    if parsed is None:
+        match = CLINSEQ_BARCODE_REGEX.match(clinseq_barcode)
+        if match is None:
+            raise ValueError("Invalid clinseq barcode: " + clinseq_barcode)
 
-    return {"library_id": library_id, "capture_id": capture_id, "type": type, "sample_id": sample_id,
-            "project_id": project_id, "sdid": sdid, "prep_id": prep_id}
+        project, sdid, sample_type, sample_id, prep_id, capture_id = match.groups()
+        unique_capture = UniqueCapture(project,
+                                       sdid,
+                                       sample_type,
+                                       sample_id,
+                                       extract_kit_id(prep_id),
+                                       extract_kit_id(capture_id))
+        parsed = ClinseqBarcode(clinseq_barcode, project, sdid, sample_type, sample_id,
+                                prep_id, capture_id, unique_capture)
+        _parsed_clinseq_barcodes[clinseq_barcode] = parsed
+
+    return parsed
 
 
 def extract_unique_capture(clinseq_barcode):
@@ -77,22 +124,33 @@ def extract_unique_capture(clinseq_barcode):
     :return: UniqueCapture named tuple
     """
 
-    if not clinseq_barcode_is_valid(clinseq_barcode):
-        raise ValueError("Invalid clinseq barcode: " + clinseq_barcode)
+    return parse_clinseq_barcode(clinseq_barcode).unique_capture
+
+
+class UniqueCaptureIndex(object):
+    """
+    Index of clinseq barcodes by their unique library captures.
+    """
+
+    def __init__(self, clinseq_barcodes=()):
+        """
+        :param clinseq_barcodes: List of valid clinseq barcode strings to add to the index.
+        """
+        # Dictionary linking unique captures to their clinseq barcodes, in order of addition:
+        self.capture_to_barcodes = collections.OrderedDict()
+
+        for clinseq_barcode in clinseq_barcodes:
+            self.add(clinseq_barcode)
 
-    project = parse_project(clinseq_barcode)
-    sdid = parse_sdid(clinseq_barcode)
-    sample_type = parse_sample_type(clinseq_barcode)
-    sample_id = parse_sample_id(clinseq_barcode)
-    prep_id = parse_prep_id(clinseq_barcode)
-    capture_id = parse_capture_id(clinseq_barcode)
+    def add(self, clinseq_barcode):
+        """
+        Add a clinseq barcode to the index, unless it has already been added.
 
-    return UniqueCapture(project,
-                         sdid,
-                         sample_type,
-                         sample_id,
-                         extract_kit_id(prep_id),
-                         extract_kit_id(capture_id))
+        :param clinseq_barcode: A valid clinseq barcode string.
+        """
+        barcodes = self.capture_to_barcodes.setdefault(extract_unique_capture(clinseq_barcode), [])
+        if clinseq_barcode not in barcodes:
+            barcodes.append(clinseq_barcode)
 
 
 def parse_project(clinseq_barcode):
@@ -215,7 +273,7 @@ def project_valid(project_str):
 
 
 def sdid_valid(sdid_str):
-    return re.match("^P-[a-zA-Z0-9]+$", sdid_str) is not None
+    return SDID_REGEX.match(sdid_str) is not None
 
 
 def sample_type_valid(sample_type_str):
@@ -223,16 +281,15 @@ def sample_type_valid(sample_type_str):
 
 
 def sample_id_valid(sample_id_str):
-    return re.match("^[a-zA-Z0-9]+$", sample_id_str) is not None
+    return SAMPLE_ID_REGEX.match(sample_id_str) is not None
 
 
 def prep_id_valid(prep_id_str):
-    return re.match("^[A-Z]{2}[0-9]+$", prep_id_str) is not None
+    return PREP_ID_REGEX.match(prep_id_str) is not None
 
 
 def capture_id_valid(capture_id_str):
-    return (re.match("^[A-Z]{2}[0-9]+$", capture_id_str) is not None) or \
-           (capture_id_str == "WGS")
+    return CAPTURE_ID_REGEX.match(capture_id_str) is not None
 
 
 def clinseq_barcode_is_valid(clinseq_barcode):
@@ -244,22 +301,8 @@ def clinseq_barcode_is_valid(clinseq_barcode):
     :return: True if the barcode has valid structure, False otherwise.
     """
 
-    fields = clinseq_barcode.split("-")
-    if len(fields) != 7:
-        return False
-
-    project_str = fields[0]
-    sdid_str = "-".join(fields[1:3])
-    sample_type_str = fields[3]
-    sample_id_str = fields[4]
-    prep_id_str = fields[5]
-    capture_id_str = fields[6]
-
-    barcode_valid = \
-        project_valid(project_str) and sdid_valid(sdid_str) and sample_type_valid(sample_type_str) and \
-        sample_id_valid(sample_id_str) and prep_id_valid(prep_id_str) and capture_id_valid(capture_id_str)
-
-    return barcode_valid
+    return clinseq_barcode in _parsed_clinseq_barcodes or \
+        CLINSEQ_BARCODE_REGEX.match(clinseq_barcode) is not None
 
 
 def extract_clinseq_barcodes(input_filename):
@@ -291,8 +334,7 @@ def validate_clinseq_barcodes(clinseq_barcodes):
 
     # Check the input clinseq barcodes for validity:
     for clinseq_barcode in clinseq_barcodes:
-        if not clinseq_barcode_is_valid(clinseq_barcode):
-            raise ValueError("Invalid clinseq barcode: " + clinseq_barcode)
+        parse_clinseq_barcode(clinseq_barcode)
 
 
 def create_scaffold_sampledict(sdids):
@@ -322,12 +364,9 @@ def populate_clinseq_barcode_info(clinseq_barcode_info, clinseq_barcode):
     :param clinseq_barcode: A validated clinseq barcode string.
     """
 
-    if not clinseq_barcode_is_valid(clinseq_barcode):
-        raise ValueError("Invalid clinseq barcode: ", clinseq_barcode)
-
     # Append this clinseq barcode to the relevant field in the specified clinseq barcode
     # info dictionary:
-    sample_type = parse_sample_type(clinseq_barcode)
+    sample_type = parse_clinseq_barcode(clinseq_barcode).sample_type
     clinseq_barcode_info[sample_type].append(clinseq_barcode)
 
 
@@ -340,18 +379,15 @@ def convert_barcodes_to_sampledict(clinseq_barcodes):
     :return: A dictionary with the required structure.
     """
 
-    for curr_clinseq_barcode in clinseq_barcodes:
-        if not clinseq_barcode_is_valid(curr_clinseq_barcode):
-            raise ValueError("Invalid clinseq barcode: ", curr_clinseq_barcode)
+    parsed_barcodes = [parse_clinseq_barcode(clinseq_barcode) for clinseq_barcode in clinseq_barcodes]
 
     # Extract set of unique SDIDs from the specified clinseq barcodes:
-    sdids = set([parse_sdid(clinseq_barcode) for clinseq_barcode in clinseq_barcodes])
+    sdids = set([parsed.sdid for parsed in parsed_barcodes])
 
     # Create a scaffold dictionary from those SDIDs:
     sdid_to_clinseq_barcode_info = create_scaffold_sampledict(sdids)
 
-    for clinseq_barcode in clinseq_barcodes:
-        populate_clinseq_barcode_info(sdid_to_clinseq_barcode_info[parse_sdid(clinseq_barcode)],
-                                      clinseq_barcode)
+    for parsed in parsed_barcodes:
+        sdid_to_clinseq_barcode_info[parsed.sdid][parsed.sample_type].append(parsed.barcode)
 
     return sdid_to_clinseq_barcode_info
@@ -0,0 +1,194 @@
+"""
+Notification of pipeline completion and job state transitions.
+
+A pipeline signals its completion by writing to a pipe, which the command line interface
+blocks on instead of polling the pipeline process. The command line interface closes its copy
+of the write end once the process has started, and the pipe is not inherited by the job
+processes, so that the pipe also reports the end of a pipeline process that exits without
+notifying it, for example when it is killed. Jobs report their state transitions by
+appending a line to an events file in the output directory when they start and finish,
+from which the progress of the analysis is reported.
+"""
+import errno
+import fcntl
+import logging
+import os
+import pipes
+import select
+import uuid
+
+from autoseq.util.cache import job_files
+from autoseq.util.path import mkdir
+
+EVENTS_FILENAME = ".autoseq-events"
+
+STARTED = "started"
+FINISHED = "finished"
+
+
+class CompletionPipe(object):
+    """
+    A pipe that is written to once, when a pipeline has finished.
+    """
+
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        # Closed in the processes that jobs are run in, which could otherwise keep the pipe open
+        # after the pipeline process has exited:
+        for fd in [self.read_fd, self.write_fd]:
+            fcntl.fcntl(fd, fcntl.F_SETFD, fcntl.fcntl(fd, fcntl.F_GETFD) | fcntl.FD_CLOEXEC)
+
+    def notify(self):
+        os.write(self.write_fd, "x")
+
+    def close_writer(self):
+        """
+        Close the write end of the pipe in the parent process, once the pipeline process holding
+        its own copy has been started.
+        """
+        os.close(self.write_fd)
+
+    def wait(self, timeout=None):
+        """
+        Block until the pipeline has finished, or the timeout has passed. The pipeline has
+        finished when it has notified the pipe, or when its process has exited.
+
+        :param timeout: Optional timeout in seconds.
+        :return: True if the pipeline has finished.
+        """
+        while True:
+            try:
+                readable, _, _ = select.select([self.read_fd], [], [], timeout)
+                return bool(readable)
+            except select.error as e:
+                # Interrupted by a signal, which has been handled by now:
+                if e.args[0] != errno.EINTR:
+                    raise
+
+
+def event_cmd(events_filename, event, job_id, jobname, exitcode=""):
+    """
+    :return: Command line appending a job event to the events file. Lines are written with a
+    single write, so that events of concurrent jobs are not interleaved.
+    """
+    return "printf '%s\\t%s\\t%s\\t%s\\t%s\\n' \"$(date +%s)\" {} {} {} {} >> {}".format(
+        event, job_id, pipes.quote(jobname), exitcode or "''", pipes.quote(events_filename))
+
+
+def enable_job_events(job, events_filename):
+    """
+    Make a job report when it starts and finishes in the events file.
+
+    :param job: A pypedream Job.
+    :param events_filename: The events file of the analysis output directory.
+    """
+    original_command = job.command
+    job_id = uuid.uuid4().hex
+
+    def command():
+        return event_cmd(events_filename, STARTED, job_id, job.jobname) + \
+               " && ({}); exitcode=$? ; ".format(original_command()) + \
+               event_cmd(events_filename, FINISHED, job_id, job.jobname, "$exitcode") + \
+               " ; exit $exitcode"
+
+    job.command = command
+
+
+def start_events_file(events_filename):
+    """
+    Create an empty events file, removing the events of any previous run.
+    """
+    mkdir(os.path.dirname(events_filename))
+    open(events_filename, "w").close()
+
+
+def parse_event(line):
+    """
+    :param line: A line from an events file.
+    :return: (timestamp, event, job id, job name, exit code) tuple, with exit code None for started jobs.
+    """
+    timestamp, event, job_id, jobname, exitcode = line.rstrip("\n").split("\t")
+    return float(timestamp), event, job_id, jobname, int(exitcode) if exitcode else None
+
+
+class JobProgress(object):
+    """
+    Keeps track of the number of queued, running, completed and failed jobs of a pipeline
+    from the events written by its jobs.
+    """
+
+    def __init__(self, graph):
+        """
+        :param graph: The pipeline's job graph. Jobs whose outputs already exist are
+        counted as completed.
+        """
+        self.num_jobs = len(graph.nodes())
+        self.num_existing = len([job for job in graph.nodes() if job_files(job, "output") and
+                                 all(os.path.exists(output) for output in job_files(job, "output"))])
+        self.running = set()
+        self.num_completed = 0
+        self.num_failed = 0
+
+    def update(self, line):
+        """
+        :param line: A line from the events file.
+        """
+        _, event, job_id, jobname, exitcode = parse_event(line)
+        if event == STARTED:
+            self.running.add(job_id)
+        elif event == FINISHED:
+            self.running.discard(job_id)
+            if exitcode == 0:
+                self.num_completed += 1
+            else:
+                logging.warning("Job {} failed with exit code {}".format(jobname, exitcode))
+                self.num_failed += 1
+
+    def summary(self):
+        num_done = self.num_existing + self.num_completed
+        num_queued = max(self.num_jobs - num_done - self.num_failed - len(self.running), 0)
+        return "{} running, {} queued, {} done, {} failed".format(
+            len(self.running), num_queued, num_done, self.num_failed)
+
+
+def read_events(events_file, progress):
+    """
+    Update the progress of a pipeline with the complete lines added to its events file.
+    """
+    for line in iter(events_file.readline, ""):
+        if line.endswith("\n"):
+            progress.update(line)
+        else:
+            # Incomplete line, to be read again once completed:
+            events_file.seek(-len(line), os.SEEK_CUR)
+            break
+
+
+def wait_for_pipeline(pipeline, events_filename=None, interval=5):
+    """
+    Block until a started pipeline has finished, or its process has exited without notifying
+    its completion pipe. If an events file is specified, report the progress of the pipeline
+    whenever it changes.
+
+    :param pipeline: A started pipeline with a completion attribute holding a CompletionPipe.
+    :param events_filename: Optional events file written by the pipeline jobs.
+    :param interval: Interval in seconds for checking the events file. Without an events file,
+    the completion pipe is waited on without a timeout.
+    """
+    events_file = open(events_filename) if events_filename else None
+    progress = JobProgress(pipeline.graph) if events_filename else None
+    last_summary = None
+    try:
+        finished = False
+        while not finished:
+            finished = pipeline.completion.wait(interval if events_file else None)
+            if events_file:
+                read_events(events_file, progress)
+                summary = progress.summary()
+                if summary != last_summary:
+                    logging.info("Jobs: {}".format(summary))
+                    last_summary = summary
+    finally:
+        if events_file:
+            events_file.close()
+    pipeline.join()
@@ -0,0 +1,222 @@
+"""
+Utilities for splitting target region files into shards that can be processed in parallel.
+
+Both BED and Picard interval_list files are supported. Shards are contiguous and retain the
+order of the input regions, so that results gathered from the shards in order are identical
+to those obtained from processing the unsplit file.
+"""
+import bisect
+import logging
+
+
+def is_bed_header(line):
+    """
+    Indicates whether a line from a BED file is a header or comment line rather than an interval.
+
+    :param line: A line from a BED file.
+    :return: Boolean.
+    """
+    return line.startswith("#") or line.startswith("track") or line.startswith("browser") or \
+        line.strip() == ""
+
+
+def is_interval_list_header(line):
+    """
+    Indicates whether a line from an interval_list file is a SAM-style header line rather than an interval.
+
+    :param line: A line from an interval_list file.
+    :return: Boolean.
+    """
+    return line.startswith("@") or line.strip() == ""
+
+
+def is_interval_list(filename):
+    """
+    :param filename: Target regions file name.
+    :return: True if the file name indicates a Picard interval_list rather than a BED file.
+    """
+    return filename.endswith(".interval_list")
+
+
+def read_intervals(filename):
+    """
+    Read a BED or interval_list file, separating header lines from interval lines.
+
+    :param filename: Target regions file name.
+    :return: (header_lines, interval_lines) tuple of lists of lines, including line endings.
+    """
+    is_header = is_interval_list_header if is_interval_list(filename) else is_bed_header
+    header_lines = []
+    interval_lines = []
+    with open(filename) as intervals_file:
+        for line in intervals_file:
+            if is_header(line):
+                header_lines.append(line)
+            else:
+                interval_lines.append(line)
+    return header_lines, interval_lines
+
+
+def interval_coords(line, interval_list=False):
+    """
+    :param line: An interval line from a BED or interval_list file.
+    :param interval_list: True if the line is from an interval_list file.
+    :return: (chrom, start, end) tuple, with zero-based, half-open coordinates.
+    """
+    fields = line.split("\t")
+    start = int(fields[1])
+    if interval_list:
+        start -= 1
+    return fields[0], start, int(fields[2])
+
+
+def bed_line_length(line):
+    """
+    :param line: An interval line from a BED file.
+    :return: The number of bases covered by the interval.
+    """
+    _, start, end = interval_coords(line)
+    return end - start
+
+
+def index_depth_profile(targets_by_chrom):
+    """
+    Sort the targets of a depth profile by position, and index their ends for overlap lookups,
+    see overlap_depth(). The targets are expected not to overlap each other, so their ends are
+    sorted too.
+
+    :param targets_by_chrom: Dictionary with chromosomes as keys and lists of (start, end, depth)
+    tuples as values.
+    :return: Dictionary with chromosomes as keys and (targets, ends) tuples as values, where targets
+    is the sorted list of (start, end, depth) tuples and ends the list of their end positions.
+    """
+    depth_profile = {}
+    for chrom, chrom_targets in targets_by_chrom.items():
+        chrom_targets = sorted(chrom_targets)
+        depth_profile[chrom] = (chrom_targets, [target_end for _, target_end, _ in chrom_targets])
+    return depth_profile
+
+
+def read_depth_profile(depth_profile_filename):
+    """
+    Read a per-target depth profile: a BED file with the mean depth of each target in the last column.
+    The targets of the profile are expected not to overlap each other.
+
+    :param depth_profile_filename: Depth profile file name.
+    :return: Dictionary as produced by index_depth_profile().
+    """
+    targets_by_chrom = {}
+    with open(depth_profile_filename) as depth_profile_file:
+        for line in depth_profile_file:
+            if is_bed_header(line):
+                continue
+            chrom, start, end = interval_coords(line)
+            targets_by_chrom.setdefault(chrom, []).append((start, end, float(line.rstrip("\n").split("\t")[-1])))
+    return index_depth_profile(targets_by_chrom)
+
+
+def mean_depth(depth_profile):
+    """
+    :param depth_profile: Dictionary as produced by index_depth_profile().
+    :return: The mean depth of the targets of the profile.
+    """
+    depths = [depth for chrom_targets, _ in depth_profile.values() for _, _, depth in chrom_targets]
+    return sum(depths) / len(depths)
+
+
+def overlap_depth(depth_profile, chrom, start, end):
+    """
+    Calculate the expected depth of an interval from the depth profile targets it overlaps, so
+    that intervals with other coordinates than the profile, such as slopped or merged targets,
+    are also assigned the depth of their targets.
+
+    :param depth_profile: Dictionary as produced by index_depth_profile().
+    :return: The mean depth of the overlapping profile targets, weighted by the number of
+    overlapping bases, or None if the interval overlaps no profile target.
+    """
+    chrom_targets, chrom_ends = depth_profile.get(chrom, ([], []))
+    idx = bisect.bisect_right(chrom_ends, start)
+    overlap_bases = 0
+    depth_bases = 0.0
+    while idx < len(chrom_targets) and chrom_targets[idx][0] < end:
+        target_start, target_end, depth = chrom_targets[idx]
+        overlap = min(end, target_end) - max(start, target_start)
+        overlap_bases += overlap
+        depth_bases += overlap * depth
+        idx += 1
+    if overlap_bases == 0:
+        return None
+    return depth_bases / overlap_bases
+
+
+def interval_weights(interval_lines, interval_list=False, depth_profile=None):
+    """
+    Calculate the amount of work for each interval, as the number of bases covered, multiplied by
+    the expected depth if a depth profile is specified, see overlap_depth(). Intervals overlapping
+    no target of the depth profile are assigned the mean depth of the profile.
+
+    :param interval_lines: List of interval lines from a BED or interval_list file.
+    :param interval_list: True if the lines are from an interval_list file.
+    :param depth_profile: Optional dictionary as produced by index_depth_profile().
+    :return: List of weights, one per interval.
+    """
+    coords = [interval_coords(line, interval_list) for line in interval_lines]
+    if not depth_profile:
+        return [end - start for _, start, end in coords]
+
+    default_depth = mean_depth(depth_profile)
+    weights = []
+    for chrom, start, end in coords:
+        depth = overlap_depth(depth_profile, chrom, start, end)
+        weights.append((end - start) * (depth if depth is not None else default_depth))
+    return weights
+
+
+def split_contiguous(weights, num_shards):
+    """
+    Split a sequence of items into contiguous groups with approximately equal total weight.
+    The original order of the items is retained, both within and across groups.
+
+    :param weights: List of non-negative item weights.
+    :param num_shards: The number of groups to produce.
+    :return: List of num_shards lists of item indices. Groups may be empty if there are
+    fewer items than groups.
+    """
+    if num_shards < 1:
+        raise ValueError("Invalid number of shards: {}".format(num_shards))
+
+    total_weight = float(sum(weights))
+    shards = [[] for _ in range(num_shards)]
+    cumulative_weight = 0
+    for idx, weight in enumerate(weights):
+        # Assign each item according to the position of its midpoint along the cumulative weight:
+        if total_weight > 0:
+            midpoint = cumulative_weight + weight / 2.0
+            shard_idx = min(int(midpoint * num_shards / total_weight), num_shards - 1)
+        else:
+            shard_idx = min(idx * num_shards / len(weights), num_shards - 1)
+        shards[shard_idx].append(idx)
+        cumulative_weight += weight
+    return shards
+
+
+def split_intervals(intervals_filename, output_filenames, depth_profile_filename=None):
+    """
+    Split a BED or interval_list file into contiguous shards that are balanced by total number
+    of bases, or by bases times expected depth if a depth profile is specified, writing one
+    shard per output file. Concatenating the shards gives the intervals of the input file in
+    their original order. Header lines are copied to every shard.
+
+    :param intervals_filename: Input BED or interval_list file name.
+    :param output_filenames: List of output file names, one per shard.
+    :param depth_profile_filename: Optional per-target depth profile, see read_depth_profile().
+    """
+    header_lines, interval_lines = read_intervals(intervals_filename)
+    depth_profile = read_depth_profile(depth_profile_filename) if depth_profile_filename else None
+    weights = interval_weights(interval_lines, is_interval_list(intervals_filename), depth_profile)
+    shards = split_contiguous(weights, len(output_filenames))
+    for output_filename, shard in zip(output_filenames, shards):
+        logging.debug("Writing {} intervals to {}".format(len(shard), output_filename))
+        with open(output_filename, "w") as output_file:
+            output_file.writelines(header_lines)
+            output_file.writelines([interval_lines[idx] for idx in shard])
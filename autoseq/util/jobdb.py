@@ -0,0 +1,59 @@
+"""
+Reading of the job databases written by pypedream with --jobdb. A job database is a JSON
+file with a "jobs" list, holding the name, status, start time and end time of each job.
+"""
+import datetime
+import json
+
+
+def deserialize_date(d):
+    obj = None
+    try:
+        obj = datetime.datetime.strptime(d, "%Y-%m-%dT%H:%M:%S.%f")
+    except ValueError:
+        obj = datetime.datetime.strptime(d, "%Y-%m-%dT%H:%M:%S")
+    return obj
+
+
+def datetime_to_timestamp(d):
+    return (d - datetime.datetime(1970, 1, 1)).total_seconds()
+
+
+def load_jobs(jobdb_filename):
+    """
+    :param jobdb_filename: A job database JSON file.
+    :return: List of job dictionaries.
+    """
+    with open(jobdb_filename) as jobdb_file:
+        return json.load(jobdb_file)['jobs']
+
+
+def job_type(jobname):
+    """
+    Get the part of a job name that is shared by jobs running the same tool in all analyses,
+    e.g. "vardict" for "vardict/AL-P-NA12877-T-03098849-TD-TT".
+
+    :param jobname: A job name.
+    :return: Job type string.
+    """
+    return jobname.split("/")[0]
+
+
+def job_runtime(job):
+    """
+    :param job: A job dictionary from a job database.
+    :return: The runtime of the job in seconds, or None if it did not complete.
+    """
+    if job.get('status') != 'COMPLETED' or not job.get('starttime') or not job.get('endtime'):
+        return None
+    return datetime_to_timestamp(deserialize_date(job['endtime'])) - \
+        datetime_to_timestamp(deserialize_date(job['starttime']))
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) / 2
+    if len(values) % 2 == 1:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
@@ -0,0 +1,145 @@
+"""
+Utilisation and concurrency statistics of a pipeline run, from its job database.
+
+The number of cores in use and of running jobs over time are computed as step functions
+from the job start and end times, weighting jobs with telemetry by their threads. The job
+database does not record job dependencies, so the critical path is traced backwards from
+the last job to finish, through the job that finished last before each job started. The
+queue wait of a job is the part of its runtime in the job database not spent running its
+command, as recorded by the job telemetry.
+"""
+import numpy as np
+
+
+def occupancy(timeline):
+    """
+    :param timeline: A Timeline of a single run.
+    :return: (times, cores, jobs) tuple of arrays, with the number of cores in use and of
+    running jobs from each time until the next.
+    """
+    times = np.concatenate([timeline.start, timeline.end])
+    core_steps = np.concatenate([timeline.threads, -timeline.threads])
+    job_steps = np.concatenate([np.ones(len(timeline), dtype=np.int32),
+                                -np.ones(len(timeline), dtype=np.int32)])
+    # Jobs ending at a time are removed before the jobs starting at the same time are added:
+    order = np.lexsort((job_steps, times))
+    return times[order], np.cumsum(core_steps[order]), np.cumsum(job_steps[order])
+
+
+def time_weighted_mean(times, values):
+    """
+    :return: The mean of a step function over the span of its times.
+    """
+    durations = np.diff(times)
+    if durations.sum() == 0:
+        return 0.0
+    return float((values[:-1] * durations).sum() / durations.sum())
+
+
+def time_at_least(times, values, threshold):
+    """
+    :return: The total time in seconds during which a step function is at least the threshold.
+    """
+    return float(np.diff(times)[values[:-1] >= threshold].sum())
+
+
+def idle_gaps(timeline):
+    """
+    :param timeline: A Timeline of a single run.
+    :return: List of (start, end) tuples of the periods without running jobs between the
+    start of the first job and the end of the last job.
+    """
+    times, _, jobs = occupancy(timeline)
+    idle = np.flatnonzero((jobs[:-1] == 0) & (np.diff(times) > 0))
+    return [(float(times[idx]), float(times[idx + 1])) for idx in idle]
+
+
+def queue_wait(timeline):
+    """
+    :param timeline: A Timeline of a single run.
+    :return: Array with the queue wait of each job in seconds, NaN for jobs without telemetry.
+    """
+    return np.maximum(timeline.duration() - timeline.wall_time, 0)
+
+
+def critical_path(timeline):
+    """
+    :param timeline: A Timeline of a single run.
+    :return: Array with the indices of the jobs on the critical path, from the first job.
+    """
+    if not len(timeline):
+        return np.array([], dtype=np.int64)
+
+    ends_order = np.argsort(timeline.end, kind="mergesort")
+    sorted_ends = timeline.end[ends_order]
+    position = len(timeline) - 1
+    path = [ends_order[position]]
+    while True:
+        # The job finishing last at or before the current job started, excluding the
+        # current job itself and the jobs after it in end order:
+        position = min(np.searchsorted(sorted_ends, timeline.start[path[-1]], side="right"), position) - 1
+        if position < 0:
+            break
+        path.append(ends_order[position])
+    return np.array(path[::-1])
+
+
+def type_stats(timeline, path):
+    """
+    :param timeline: A Timeline of a single run.
+    :param path: Indices of the jobs on the critical path, see critical_path().
+    :return: List with a dictionary per job type, holding the number of jobs, total and
+    critical path time in seconds, and the mean queue wait of the jobs with telemetry,
+    ordered by decreasing critical path time and total time.
+    """
+    num_types = len(timeline.types)
+    duration = timeline.duration()
+    wait = queue_wait(timeline)
+    has_wait = ~np.isnan(wait)
+
+    jobs = np.bincount(timeline.type, minlength=num_types)
+    total = np.bincount(timeline.type, weights=duration, minlength=num_types)
+    on_path = np.bincount(timeline.type[path], weights=duration[path], minlength=num_types)
+    wait_jobs = np.bincount(timeline.type[has_wait], minlength=num_types)
+    wait_total = np.bincount(timeline.type[has_wait], weights=wait[has_wait], minlength=num_types)
+
+    return [{"type": timeline.types[type_code],
+             "jobs": int(jobs[type_code]),
+             "total_seconds": float(total[type_code]),
+             "critical_path_seconds": float(on_path[type_code]),
+             "mean_queue_wait": float(wait_total[type_code] / wait_jobs[type_code])
+             if wait_jobs[type_code] else None}
+            for type_code in np.lexsort((-total, -on_path))]
+
+
+def run_stats(timeline, cores=None):
+    """
+    :param timeline: A Timeline of a single run.
+    :param cores: The number of cores the run was given, if known.
+    :return: Dictionary of run-level statistics. The core utilisation and the fraction of
+    time with all cores in use are included if the number of cores is specified.
+    """
+    times, cores_in_use, running_jobs = occupancy(timeline)
+    makespan = float(timeline.end.max()) if len(timeline) else 0.0
+    path = critical_path(timeline)
+    gaps = idle_gaps(timeline)
+    wait = queue_wait(timeline)
+    core_seconds = float((timeline.duration() * timeline.threads).sum())
+
+    stats = {"jobs": len(timeline),
+             "makespan_hours": makespan / 3600.0,
+             "core_hours": core_seconds / 3600.0,
+             "mean_cores_in_use": time_weighted_mean(times, cores_in_use),
+             "peak_cores_in_use": int(cores_in_use.max()) if len(timeline) else 0,
+             "mean_running_jobs": time_weighted_mean(times, running_jobs),
+             "peak_running_jobs": int(running_jobs.max()) if len(timeline) else 0,
+             "critical_path_hours": float(timeline.duration()[path].sum()) / 3600.0,
+             "critical_path_jobs": len(path),
+             "idle_gaps": len(gaps),
+             "idle_hours": sum([end - start for start, end in gaps]) / 3600.0,
+             "mean_queue_wait": float(np.nanmean(wait)) if (~np.isnan(wait)).any() else None}
+    if cores:
+        stats["cores"] = cores
+        stats["utilisation"] = core_seconds / (cores * makespan) if makespan else 0.0
+        stats["saturated_fraction"] = time_at_least(times, cores_in_use, cores) / makespan if makespan else 0.0
+    return stats
@@ -1,13 +1,256 @@
 import logging
 import os
 import re
+import sqlite3
 
 from autoseq.util.path import normpath
 
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
 logger = logging.getLogger(__name__)
 
+FQ1_REGEX = re.compile('(.+)(_1\.fastq.gz|_1\.fq.gz|R1_\d{3}.fastq.gz)')
+FQ2_REGEX = re.compile('(.+)(_2\.fastq.gz|_2\.fq.gz|R2_\d{3}.fastq.gz)')
+
+
+def list_dir(path, dirs_only=False):
+    """
+    List the entries of a directory with a single scandir() call if available, which also
+    tells directories apart without a stat() call per entry on most filesystems.
+
+    :param path: Directory to list.
+    :param dirs_only: Only list the subdirectories of the directory.
+    :return: List of entry names.
+    """
+    if scandir is None:
+        names = os.listdir(path)
+        if dirs_only:
+            names = [name for name in names if os.path.isdir(os.path.join(path, name))]
+        return names
+    return [entry.name for entry in scandir(path) if not dirs_only or entry.is_dir()]
+
+
+def match_fastqs(library, libdir, filenames):
+    """
+    :param filenames: Names of the files in the library folder.
+    :return: Tuple with the sorted read 1 and read 2 fastq files among the filenames, see find_fastqs().
+    """
+    fq1s = []
+    fq2s = []
+
+    for f in filenames:
+        match1 = FQ1_REGEX.search(f)
+        if match1:
+            fn = "".join(match1.groups())
+            fq1s.append(os.path.join(libdir, library, fn))
+        match2 = FQ2_REGEX.search(f)
+        if match2:
+            fn = "".join(match2.groups())
+            fq2s.append(os.path.join(libdir, library, fn))
+
+    fq1s.sort()
+    fq2s.sort()
+    return fq1s, fq2s
+
+
+class LibdirScanner(object):
+    """
+    Finds the fastq files of libraries in a library folder, listing the library folder and each
+    library subfolder at most once, so that a pipeline configuration looking up the same libraries
+    repeatedly does not list the folders again, which is slow on network filesystems.
+    """
+
+    def __init__(self, libdir):
+        self.libdir = libdir
+        self.library_names = None
+        # Dictionary linking library names to their (fq1s, fq2s) tuples:
+        self.library_fastqs = {}
+
+    def has_library(self, library):
+        """
+        :return: True if the library folder has a subfolder for the specified library.
+        """
+        if self.library_names is None:
+            logger.debug("Scanning library folder {}".format(self.libdir))
+            self.library_names = set(list_dir(normpath(self.libdir), dirs_only=True))
+        return library in self.library_names
+
+    def find_fastqs(self, library):
+        """
+        :return: Tuple with lists of the read 1 and read 2 fastq files of the library, see find_fastqs().
+        """
+        if library not in self.library_fastqs:
+            d = normpath(os.path.join(self.libdir, library))
+            logger.debug("Looking for fastq files for library {library} in {libdir}".format(
+                library=library, libdir=self.libdir))
+            self.library_fastqs[library] = match_fastqs(library, self.libdir, list_dir(d))
+            logging.debug("Found {}".format(self.library_fastqs[library]))
+
+        fq1s, fq2s = self.library_fastqs[library]
+        return list(fq1s), list(fq2s)
+
+
+CATALOGUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (path TEXT PRIMARY KEY, mtime REAL);
+CREATE TABLE IF NOT EXISTS libraries (name TEXT PRIMARY KEY, mtime REAL);
+CREATE TABLE IF NOT EXISTS fastqs (library TEXT, filename TEXT, read INTEGER, pair TEXT, size INTEGER, mtime REAL);
+CREATE INDEX IF NOT EXISTS fastqs_library ON fastqs (library);
+"""
+
+
+def fastq_pair_name(match, read):
+    """
+    :param match: Match of FQ1_REGEX or FQ2_REGEX against a fastq filename.
+    :param read: The read number of the regex, 1 or 2.
+    :return: The filename with its read number masked, shared by the fastq files of a read pair.
+    """
+    prefix, suffix = match.groups()
+    return prefix + suffix.replace(str(read), "?", 1)
+
 
-def find_fastqs(library, libdir):
+class LibdirCatalogue(object):
+    """
+    On-disk SQLite catalogue of the fastq files of the libraries in a library folder, with their
+    sizes, modification times and read pairs. The catalogue is updated incrementally: the library
+    folder is only listed again if its modification time changed, and each library subfolder is
+    only listed again if its own modification time changed, which happens when files are added,
+    removed or renamed in it. Looking up a catalogued library therefore takes a single stat() call
+    instead of a folder listing. Can be used in place of a LibdirScanner.
+    """
+
+    def __init__(self, libdir, filename):
+        """
+        :param libdir: The library folder.
+        :param filename: The SQLite database file of the catalogue, created if it does not exist.
+        """
+        self.libdir = libdir
+        self.filename = filename
+        self.connection = sqlite3.connect(filename, timeout=60)
+        self.connection.executescript(CATALOGUE_SCHEMA)
+        self.library_names = None
+        # Libraries checked to be up to date by this catalogue instance:
+        self.checked_libraries = set()
+
+    def close(self):
+        self.connection.close()
+
+    def update_libraries(self):
+        """
+        Update the libraries in the catalogue if the library folder changed since it was catalogued.
+        """
+        path = normpath(self.libdir)
+        mtime = os.stat(path).st_mtime
+        row = self.connection.execute("SELECT mtime FROM folders WHERE path = ?", (path,)).fetchone()
+        names = set([name for name, in self.connection.execute("SELECT name FROM libraries")])
+
+        if row is None or row[0] != mtime:
+            logger.debug("Scanning library folder {}".format(self.libdir))
+            scanned_names = set(list_dir(path, dirs_only=True))
+            with self.connection:
+                for name in names - scanned_names:
+                    self.connection.execute("DELETE FROM libraries WHERE name = ?", (name,))
+                    self.connection.execute("DELETE FROM fastqs WHERE library = ?", (name,))
+                # New libraries are catalogued without a modification time, so that their
+                # fastq files are catalogued when first looked up:
+                self.connection.executemany("INSERT INTO libraries VALUES (?, NULL)",
+                                            [(name,) for name in scanned_names - names])
+                self.connection.execute("INSERT OR REPLACE INTO folders VALUES (?, ?)", (path, mtime))
+            names = scanned_names
+
+        self.library_names = names
+
+    def update_library(self, library):
+        """
+        Update the fastq files of a library in the catalogue if its folder changed since it was catalogued.
+        """
+        if library in self.checked_libraries:
+            return
+
+        d = normpath(os.path.join(self.libdir, library))
+        mtime = os.stat(d).st_mtime
+        row = self.connection.execute("SELECT mtime FROM libraries WHERE name = ?", (library,)).fetchone()
+
+        if row is None or row[0] != mtime:
+            logger.debug("Looking for fastq files for library {library} in {libdir}".format(
+                library=library, libdir=self.libdir))
+            fastqs = []
+            for f in list_dir(d):
+                for read, regex in [(1, FQ1_REGEX), (2, FQ2_REGEX)]:
+                    match = regex.search(f)
+                    if match:
+                        stat = os.stat(os.path.join(d, f))
+                        fastqs.append((library, "".join(match.groups()), read, fastq_pair_name(match, read),
+                                       stat.st_size, stat.st_mtime))
+            with self.connection:
+                self.connection.execute("DELETE FROM fastqs WHERE library = ?", (library,))
+                self.connection.executemany("INSERT INTO fastqs VALUES (?, ?, ?, ?, ?, ?)", fastqs)
+                self.connection.execute("INSERT OR REPLACE INTO libraries VALUES (?, ?)", (library, mtime))
+
+        self.checked_libraries.add(library)
+
+    def update(self):
+        """
+        Update the catalogue of all libraries in the library folder.
+        """
+        self.update_libraries()
+        for library in sorted(self.library_names):
+            self.update_library(library)
+
+    def has_library(self, library):
+        """
+        :return: True if the library folder has a subfolder for the specified library.
+        """
+        if self.library_names is None:
+            self.update_libraries()
+        return library in self.library_names
+
+    def fastqs(self, library):
+        """
+        :return: List of (filename, read, pair, size, mtime) tuples of the fastq files of the library,
+        where pair is the name shared by the files of a read pair, see fastq_pair_name().
+        """
+        self.update_library(library)
+        return self.connection.execute(
+            "SELECT filename, read, pair, size, mtime FROM fastqs WHERE library = ? ORDER BY filename, read",
+            (library,)).fetchall()
+
+    def find_fastqs(self, library):
+        """
+        :return: Tuple with lists of the read 1 and read 2 fastq files of the library, see find_fastqs().
+        """
+        fastqs = self.fastqs(library)
+        fq1s = sorted([os.path.join(self.libdir, library, fn) for fn, read, _, _, _ in fastqs if read == 1])
+        fq2s = sorted([os.path.join(self.libdir, library, fn) for fn, read, _, _, _ in fastqs if read == 2])
+        return fq1s, fq2s
+
+    def read_pairs(self, library):
+        """
+        :return: Sorted list of (fq1, fq2) tuples of the read pairs of the library, with None in
+        place of a missing read 1 or read 2 file.
+        """
+        pairs = {}
+        for fn, read, pair, _, _ in self.fastqs(library):
+            pairs.setdefault(pair, [None, None])[read - 1] = os.path.join(self.libdir, library, fn)
+        return sorted([tuple(pairs[pair]) for pair in pairs])
+
+
+def open_libdir_scanner(libdir, catalogue_filename=None):
+    """
+    :return: A LibdirCatalogue of the library folder if a catalogue file is specified, otherwise a
+    LibdirScanner.
+    """
+    if catalogue_filename:
+        return LibdirCatalogue(libdir, catalogue_filename)
+    return LibdirScanner(libdir)
+
+
+def find_fastqs(library, libdir, scanner=None):
     """Find fastq files for a given library id in a given direcory.
 
         Returns a tuple with two lists:
@@ -19,33 +262,19 @@ def find_fastqs(library, libdir):
     *_1.fq.gz / *_2.fq.gz
     *R1_nnn.fastq.gz / *R2_nnn.fastq.gz
 
+    If a LibdirScanner or LibdirCatalogue of the directory is given, its cached results are used.
+
     :rtype: tuple[str,str]
     """
     if not library:
         return (None, None)
-    regex_fq1 = '(.+)(_1\.fastq.gz|_1\.fq.gz|R1_\d{3}.fastq.gz)'
-    regex_fq2 = '(.+)(_2\.fastq.gz|_2\.fq.gz|R2_\d{3}.fastq.gz)'
+    if scanner is not None:
+        return scanner.find_fastqs(library)
 
     d = normpath(os.path.join(libdir, library))
     logger.debug("Looking for fastq files for library {library} in {libdir}".format(library=library, libdir=libdir))
 
-    fq1s = []
-    fq2s = []
-
-    for f in os.listdir(d):
-        match1 = re.search(regex_fq1, f)
-        if match1:
-            fn = "".join(match1.groups())
-            fq1s.append(os.path.join(libdir, library, fn))
-        match2 = re.search(regex_fq2, f)
-        if match2:
-            fn = "".join(match2.groups())
-            fq2s.append(os.path.join(libdir, library, fn))
-
-    fq1s.sort()
-    fq2s.sort()
+    fq1s, fq2s = match_fastqs(library, libdir, os.listdir(d))
 
     logging.debug("Found {}".format((fq1s, fq2s)))
     return fq1s, fq2s
-
-
@@ -0,0 +1,182 @@
+"""
+Persistent record of the jobs that produced the files in an analysis output directory.
+
+For each job whose outputs exist after a run, the manifest records the job parameters and
+the size, modification time and (for small files) checksum of each input file. When the
+analysis is restarted, a job is stale if its parameters or any of its recorded inputs have
+changed. The outputs of stale jobs and of all jobs downstream of them are removed, so
+that only that part of the pipeline is run again.
+"""
+import hashlib
+import json
+import logging
+import os
+
+from autoseq.util.cache import consumers_by_input, job_files, UUID_REGEX
+
+MANIFEST_FILENAME = ".autoseq-manifest.json"
+
+# Input files larger than this are compared by size and modification time only:
+CHECKSUM_MAX_SIZE = 64 * 1024 * 1024
+
+# Job attributes that do not affect job outputs:
+IGNORED_ATTRIBUTES = ["threads", "max_threads", "memory", "priority", "walltime", "scratch", "jobname",
+                      "is_intermediate"]
+
+
+def job_key(job):
+    """
+    :return: String identifying a job across runs of the same analysis, based on its outputs.
+    """
+    return "\t".join(job_files(job, "output"))
+
+
+def job_parameters(job):
+    """
+    :return: Dictionary of the job attributes that are neither ports nor ignored, with uuids
+    replaced by a placeholder.
+    """
+    parameters = {}
+    for attribute, value in vars(job).items():
+        if attribute.startswith("input") or attribute.startswith("output") or attribute in IGNORED_ATTRIBUTES:
+            continue
+        if value is None or isinstance(value, (basestring, int, float, bool, list, dict)):
+            parameters[attribute] = UUID_REGEX.sub("<uuid>", json.dumps(value, sort_keys=True))
+    return parameters
+
+
+def file_state(filename):
+    """
+    :return: [size, mtime, sha1] list for an existing file, with sha1 None for large files, or
+    None if the file does not exist.
+    """
+    if not os.path.isfile(filename):
+        return None
+    stat = os.stat(filename)
+    digest = None
+    if stat.st_size <= CHECKSUM_MAX_SIZE:
+        sha1 = hashlib.sha1()
+        with open(filename, "rb") as input_file:
+            for block in iter(lambda: input_file.read(1024 * 1024), ""):
+                sha1.update(block)
+        digest = sha1.hexdigest()
+    return [stat.st_size, stat.st_mtime, digest]
+
+
+def file_changed(recorded_state, current_state):
+    """
+    Indicates whether a file has changed. Files that are missing now, such as removed
+    intermediate files, are not considered changed.
+    """
+    if recorded_state is None or current_state is None:
+        return False
+    recorded_size, recorded_mtime, recorded_digest = recorded_state
+    current_size, current_mtime, current_digest = current_state
+    if recorded_size != current_size:
+        return True
+    if recorded_digest and current_digest:
+        return recorded_digest != current_digest
+    return recorded_mtime != current_mtime
+
+
+def job_record(job):
+    """
+    :return: Manifest record describing the current parameters and input files of a job.
+    """
+    return {"parameters": job_parameters(job),
+            "inputs": dict([(filename, file_state(filename)) for filename in job_files(job, "input")])}
+
+
+def is_stale(job, record, current_record):
+    """
+    :param job: A pypedream Job.
+    :param record: The job's record from the manifest of a previous run.
+    :param current_record: The job's record as produced by job_record() now.
+    :return: True if the job's parameters or inputs have changed since its outputs were produced.
+    """
+    if record["parameters"] != current_record["parameters"]:
+        logging.info("Parameters of {} have changed".format(job_key(job)))
+        return True
+    for filename, current_state in current_record["inputs"].items():
+        if filename not in record["inputs"] or file_changed(record["inputs"][filename], current_state):
+            logging.info("Input {} of {} has changed".format(filename, job_key(job)))
+            return True
+    return False
+
+
+def load_manifest(manifest_filename):
+    if not os.path.exists(manifest_filename):
+        return {}
+    with open(manifest_filename) as manifest_file:
+        return json.load(manifest_file)
+
+
+def find_stale_jobs(graph, manifest, current_records):
+    """
+    Jobs are connected through their input and output file names, as the edges of the graph
+    are only added by pypedream when the pipeline is started.
+
+    :param graph: The pipeline's job graph.
+    :param manifest: Dictionary of job records from a previous run, by job key.
+    :param current_records: Dictionary of current job records, by job key.
+    :return: Set of jobs that are stale or downstream of a stale job.
+    """
+    consumers = consumers_by_input(graph.nodes())
+    stale_jobs = set([job for job in graph.nodes() if job_key(job) and job_key(job) in manifest and
+                      is_stale(job, manifest[job_key(job)], current_records[job_key(job)])])
+    jobs_to_visit = list(stale_jobs)
+    while jobs_to_visit:
+        for output in job_files(jobs_to_visit.pop(), "output"):
+            for downstream_job in consumers.get(output, []):
+                if downstream_job not in stale_jobs:
+                    stale_jobs.add(downstream_job)
+                    jobs_to_visit.append(downstream_job)
+    return stale_jobs
+
+
+def invalidate_stale_jobs(graph, manifest_filename):
+    """
+    Remove the outputs of stale jobs and of all jobs downstream of them, so that they are run again.
+    Should be called after configuring the pipeline and before starting it.
+
+    :param graph: The pipeline's job graph.
+    :param manifest_filename: The manifest file of the analysis output directory.
+    :return: Dictionary of current job records, to be passed to write_manifest() after the run.
+    """
+    manifest = load_manifest(manifest_filename)
+    current_records = dict([(job_key(job), job_record(job)) for job in graph.nodes()])
+    for job in find_stale_jobs(graph, manifest, current_records):
+        for output in job_files(job, "output"):
+            if os.path.isfile(output):
+                logging.info("Removing stale output {}".format(output))
+                os.remove(output)
+    return current_records
+
+
+def write_manifest(graph, manifest_filename, records):
+    """
+    Record the jobs whose outputs all exist after a run. The recorded input file states are those
+    at the end of the run. Previous records are kept for jobs whose outputs have been removed
+    as intermediate files.
+
+    :param graph: The pipeline's job graph.
+    :param manifest_filename: The manifest file of the analysis output directory.
+    :param records: Dictionary of job records as returned by invalidate_stale_jobs().
+    """
+    previous_manifest = load_manifest(manifest_filename)
+    manifest = {}
+    for job in graph.nodes():
+        outputs = job_files(job, "output")
+        if not outputs:
+            continue
+        if all(os.path.exists(output) for output in outputs):
+            record = records[job_key(job)]
+            record["inputs"] = dict([(filename, file_state(filename)) for filename in record["inputs"]])
+            manifest[job_key(job)] = record
+        elif job_key(job) in previous_manifest and job.is_intermediate:
+            manifest[job_key(job)] = previous_manifest[job_key(job)]
+
+    tmp_manifest_filename = manifest_filename + ".tmp"
+    with open(tmp_manifest_filename, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=4, sort_keys=True)
+    os.rename(tmp_manifest_filename, manifest_filename)
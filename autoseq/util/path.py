@@ -20,6 +20,39 @@ def stripsuffix(thestring, suffix):
     return thestring
 
 
+# Ways of placing a job output file from scratch into the output directory:
+OUTPUT_PLACEMENT_MODES = ["move", "hardlink", "reflink"]
+
+
+def place_output_cmd(source, target, mode="move"):
+    """
+    Compose a shell command placing a file produced in scratch at its final location, without
+    copying the data where possible, and without leaving a partially written target file.
+
+    - move: rename the file if source and target are on the same filesystem, otherwise copy it
+    to a temporary file next to the target and rename that.
+    - hardlink: as move, but link the target to the source instead of renaming the source.
+    - reflink: copy-on-write clone where supported by the filesystem, otherwise a regular
+    copy, to a temporary file that is then renamed.
+
+    :param source: The file to place.
+    :param target: The final file name.
+    :param mode: One of OUTPUT_PLACEMENT_MODES.
+    :return: Command string.
+    """
+    if mode not in OUTPUT_PLACEMENT_MODES:
+        raise ValueError("Invalid output placement mode: {}".format(mode))
+
+    partial_target = target + ".partial"
+    if mode == "reflink":
+        return "cp --reflink=auto {} {} && mv -f {} {}".format(source, partial_target, partial_target, target)
+
+    same_fs_test = "[ \"$(stat -c %d {})\" = \"$(stat -c %d $(dirname {}))\" ]".format(source, target)
+    same_fs_cmd = "mv -f {} {}" if mode == "move" else "ln -f {} {}"
+    copy_cmd = "cp {} {} && mv -f {} {}".format(source, partial_target, partial_target, target)
+    return "if {}; then {}; else {}; fi".format(same_fs_test, same_fs_cmd.format(source, target), copy_cmd)
+
+
 def mkdir(dir):
     """ Create a directory if it doesn't exist
     :param dir: dir to create
@@ -0,0 +1,115 @@
+"""
+Critical-path priorities for pipeline jobs.
+
+The priority of a job is the expected time from starting the job until the last job
+depending on it has finished, i.e. the length of the longest path through the job graph
+starting at the job, with jobs weighted by their runtimes predicted from previous runs.
+Pipelines submit their jobs to the runner with the ready jobs of the highest priority first,
+see dispatch_order(), so that runners starting jobs in submission order, like the localq runner,
+do not hold up the jobs leading up to the final reports with short leaf jobs.
+"""
+import heapq
+
+from autoseq.util.cache import consumers_by_input, job_files
+
+
+def find_downstream_jobs(jobs):
+    """
+    :param jobs: List of pypedream Jobs, connected through their input and output files.
+    :return: Dictionary with jobs as keys and the set of jobs reading their outputs as values.
+    """
+    consumers = consumers_by_input(jobs)
+    return dict([(job, set([consumer for output in job_files(job, "output")
+                            for consumer in consumers.get(output, [])]))
+                 for job in jobs])
+
+
+def critical_path_priorities(jobs, model):
+    """
+    :param jobs: List of pypedream Jobs, connected through their input and output files.
+    :param model: A RuntimeModel.
+    :return: Dictionary with jobs as keys and the expected time from their start until all
+    their downstream jobs have finished as values.
+    """
+    downstream_jobs = find_downstream_jobs(jobs)
+
+    priorities = {}
+    for job in jobs:
+        # Iterative depth-first traversal, so that long job chains do not exceed the recursion limit:
+        stack = [job]
+        while stack:
+            curr_job = stack[-1]
+            if curr_job in priorities:
+                stack.pop()
+                continue
+            pending_jobs = [downstream_job for downstream_job in downstream_jobs[curr_job]
+                            if downstream_job not in priorities]
+            if pending_jobs:
+                stack.extend(pending_jobs)
+            else:
+                stack.pop()
+                priorities[curr_job] = model.predict_job(curr_job) + \
+                    max([priorities[downstream_job] for downstream_job in downstream_jobs[curr_job]] + [0])
+    return priorities
+
+
+def critical_path(jobs, model):
+    """
+    :param jobs: List of pypedream Jobs, connected through their input and output files.
+    :param model: A RuntimeModel.
+    :return: List of the jobs on the longest path through the job graph, from its first job.
+    """
+    priorities = critical_path_priorities(jobs, model)
+    downstream_jobs = find_downstream_jobs(jobs)
+    path = []
+    candidates = jobs
+    while candidates:
+        job = max(candidates, key=lambda candidate: priorities[candidate])
+        path.append(job)
+        candidates = list(downstream_jobs[job])
+    return path
+
+
+def assign_priorities(graph, model):
+    """
+    Set the priority attribute of every job in a pipeline graph to its critical-path priority.
+
+    :param graph: The pipeline's job graph.
+    :param model: A RuntimeModel.
+    """
+    jobs = list(graph.nodes())
+    for job, priority in critical_path_priorities(jobs, model).items():
+        job.priority = priority
+
+
+def dispatch_order(jobs):
+    """
+    Order jobs so that every job comes after the jobs producing its inputs, and jobs whose
+    inputs are ready are ordered by decreasing priority, as set by assign_priorities().
+
+    :param jobs: List of pypedream Jobs, in dependency order.
+    :return: List of the jobs in the order in which to submit them to the runner.
+    """
+    downstream_jobs = find_downstream_jobs(jobs)
+    num_pending_inputs = dict([(job, 0) for job in jobs])
+    for job in jobs:
+        for downstream_job in downstream_jobs[job]:
+            num_pending_inputs[downstream_job] += 1
+
+    # Jobs of equal priority keep their original order:
+    indices = dict([(job, idx) for idx, job in enumerate(jobs)])
+
+    def ready_entry(job):
+        return -(getattr(job, "priority", None) or 0), indices[job], job
+
+    ready = [ready_entry(job) for job in jobs if num_pending_inputs[job] == 0]
+    heapq.heapify(ready)
+    ordered_jobs = []
+    while ready:
+        _, _, job = heapq.heappop(ready)
+        ordered_jobs.append(job)
+        for downstream_job in downstream_jobs[job]:
+            num_pending_inputs[downstream_job] -= 1
+            if num_pending_inputs[downstream_job] == 0:
+                heapq.heappush(ready, ready_entry(downstream_job))
+    return ordered_jobs
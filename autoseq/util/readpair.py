@@ -20,13 +20,20 @@ class Readpair(object):
                           self.FQ2])
 
     @staticmethod
-    def fromDir(basedir):
-        """Get a list of read pairs from a dir"""
-        dirs = [d for d in os.listdir(basedir) if os.path.isdir(basedir+"/"+d)]
+    def fromDir(basedir, catalogue=None):
+        """Get a list of read pairs from a dir, or from a LibdirCatalogue of it if given"""
+        if catalogue is not None:
+            catalogue.update_libraries()
+            dirs = sorted(catalogue.library_names)
+        else:
+            dirs = [d for d in os.listdir(basedir) if os.path.isdir(basedir+"/"+d)]
         logging.debug("dirs to consider = {}".format(dirs))
         readpairs = []
         for d in dirs:
-            files = os.listdir(basedir+"/"+d)
+            if catalogue is not None:
+                files = [fn for fn, _, _, _, _ in catalogue.fastqs(d)]
+            else:
+                files = os.listdir(basedir+"/"+d)
             fq1 = [basedir+"/"+d+"/"+f for f in files if f.endswith("_1.fastq.gz")]
             fq2 = [basedir+"/"+d+"/"+f for f in files if f.endswith("_2.fastq.gz")]
             if fq1 is not []:
@@ -0,0 +1,189 @@
+"""
+Loading of the reference data JSON file.
+
+Relative paths in the reference data are converted to absolute paths relative to the folder of
+the JSON file, if the resulting path exists. Checking that takes a stat() call per value, which
+adds up on network filesystems, so the conversion is done lazily: the JSON file is only read when
+the reference data is first used, and each value is only converted when it is first read.
+
+If a cache folder is given, the fully converted reference data is pickled in it the first time
+the JSON file is loaded, and later loads read the pickle instead as long as the size and
+modification time of the JSON file are unchanged. The cached paths are not checked again, so the
+cache should not be used for reference data whose files are still being created.
+"""
+import collections
+import copy
+import hashlib
+import json
+import logging
+import os
+import uuid
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from autoseq.util.path import mkdir
+
+
+def convert_to_absolute_path(possible_relative_path, base_path):
+    """
+    Convert the input potential relative file path to an absolute path by
+    prepending the specified base_path, but only if the resulting absolute path points
+    to a pre-existing file or directory.
+
+    If the base_path cannot be prepended, then simply return the original input value.
+
+    :param possible_relative_path: A string potentially indicating a relative file/directory path.
+    :param base_path: The base path to prepend.
+    :return: Modified path string.
+    """
+
+    converted_value = possible_relative_path
+    try:
+        if not os.path.isabs(possible_relative_path):
+            joined_path = os.path.join(base_path, possible_relative_path)
+            if os.path.isfile(joined_path) or os.path.isdir(joined_path):
+                converted_value = joined_path
+
+    except Exception, e:
+        pass
+
+    return converted_value
+
+
+def make_paths_absolute(input_dict, base_path):
+    """Processes the input dictionary, converting relative file paths to absolute
+    file paths throughout the dictionary structure.
+
+    Specifically, for each value in the dictionary:
+    - If it is also a dictionary, then recursively apply this function,
+    replacing the initial dictionary.
+    - If it is a list, then convert each item as described below.
+    - Otherwise:
+    -- If the value is a non-null string that is not already an absolute path,
+    then try prepending the specified base_path and see if the resulting file name
+    exists, and in that case then replace the string with the resulting absolute path.
+    """
+
+    for curr_key, curr_value in input_dict.items():
+        if isinstance(curr_value, dict):
+            input_dict[curr_key] = make_paths_absolute(curr_value, base_path)
+        elif isinstance(curr_value, list):
+            input_dict[curr_key] = [convert_to_absolute_path(item, base_path) for item in curr_value]
+        else:
+            converted_value = convert_to_absolute_path(curr_value, base_path)
+            input_dict[curr_key] = converted_value
+
+    return input_dict
+
+
+class RefdataDict(collections.Mapping):
+    """
+    Read-only view of a reference data dictionary, converting each value in the same way as
+    make_paths_absolute() when it is first read. Nested dictionaries are returned as RefdataDict
+    views themselves.
+    """
+
+    def __init__(self, values, base_path):
+        self.raw_values = values
+        self.base_path = base_path
+        self.converted_values = {}
+
+    def __getitem__(self, key):
+        if key not in self.converted_values:
+            value = self.raw_values[key]
+            if isinstance(value, dict):
+                value = RefdataDict(value, self.base_path)
+            elif isinstance(value, list):
+                value = [convert_to_absolute_path(item, self.base_path) for item in value]
+            else:
+                value = convert_to_absolute_path(value, self.base_path)
+            self.converted_values[key] = value
+        return self.converted_values[key]
+
+    def __iter__(self):
+        return iter(self.raw_values)
+
+    def __len__(self):
+        return len(self.raw_values)
+
+    def to_dict(self):
+        """
+        :return: A dictionary with all values converted, see make_paths_absolute().
+        """
+        return make_paths_absolute(copy.deepcopy(self.raw_values), self.base_path)
+
+
+def refdata_signature(filename):
+    stat = os.stat(filename)
+    return "{} {} {}".format(os.path.abspath(filename), stat.st_size, stat.st_mtime)
+
+
+def load_refdata(filename, cache_dir=None):
+    """
+    Load a reference data JSON file, see the module documentation.
+
+    :param filename: The reference data JSON file.
+    :param cache_dir: Optional folder to cache the converted reference data in.
+    :return: RefdataDict of the reference data, or a dictionary of the fully converted reference
+    data if a cache folder is given.
+    """
+    if cache_dir:
+        signature = refdata_signature(filename)
+        cache_filename = os.path.join(cache_dir, "refdata-{}.pickle".format(
+            hashlib.sha1(os.path.abspath(filename)).hexdigest()))
+        if os.path.exists(cache_filename):
+            try:
+                with open(cache_filename, "rb") as cache_file:
+                    cached_signature, refdata = pickle.load(cache_file)
+                if cached_signature == signature:
+                    logging.debug("Read reference data from cache {}".format(cache_filename))
+                    return refdata
+            except Exception, e:
+                logging.warning("Ignoring unreadable reference data cache {}: {}".format(cache_filename, e))
+
+    logging.debug("Reading reference data from {}".format(filename))
+    with open(filename, "r") as fh:
+        refdata = RefdataDict(json.load(fh), os.path.dirname(filename))
+
+    if cache_dir:
+        refdata = refdata.to_dict()
+        mkdir(cache_dir)
+        tmp_cache_filename = "{}.{}".format(cache_filename, uuid.uuid4())
+        try:
+            with open(tmp_cache_filename, "wb") as cache_file:
+                pickle.dump((signature, refdata), cache_file, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_cache_filename, cache_filename)
+        except (IOError, OSError), e:
+            logging.warning("Could not write reference data cache {}: {}".format(cache_filename, e))
+
+    return refdata
+
+
+class Refdata(collections.Mapping):
+    """
+    Reference data of a JSON file, which is only loaded when a value is first read, see
+    load_refdata(). Commands that do not use the reference data never read the file.
+    """
+
+    def __init__(self, filename, cache_dir=None):
+        self.filename = filename
+        self.cache_dir = cache_dir
+        self.loaded_refdata = None
+
+    @property
+    def refdata(self):
+        if self.loaded_refdata is None:
+            self.loaded_refdata = load_refdata(self.filename, self.cache_dir)
+        return self.loaded_refdata
+
+    def __getitem__(self, key):
+        return self.refdata[key]
+
+    def __iter__(self):
+        return iter(self.refdata)
+
+    def __len__(self):
+        return len(self.refdata)
@@ -0,0 +1,69 @@
+"""
+Thread and memory requirements of pipeline jobs.
+
+Job classes declare the largest number of threads they can make use of in a max_threads
+attribute, and the memory they need in gigabytes in a memory attribute. pypedream runners
+schedule jobs by their number of threads only, so a memory budget is enforced by making
+each job reserve at least the same share of the cores as its share of the memory budget.
+Jobs running concurrently then stay within both budgets. The threads attribute of a job holds
+the number of cores reserved for it, which can exceed the number of threads its command can
+make use of, see command_threads().
+"""
+import logging
+import math
+
+# Memory in gigabytes assumed for jobs that do not declare their requirement:
+DEFAULT_MEMORY = 1
+
+
+def job_memory(job):
+    """
+    :param job: A pypedream Job.
+    :return: The memory requirement of the job in gigabytes.
+    """
+    return getattr(job, "memory", None) or DEFAULT_MEMORY
+
+
+def memory_threads(memory, maxcores, max_memory):
+    """
+    :param memory: Memory requirement of a job, in gigabytes.
+    :param maxcores: The core budget.
+    :param max_memory: The memory budget, in gigabytes.
+    :return: The number of cores a job needs to reserve to claim its share of the memory budget.
+    """
+    return int(math.ceil(memory * maxcores / float(max_memory)))
+
+
+def command_threads(job):
+    """
+    :param job: A pypedream Job.
+    :return: The number of threads the command of the job should run, which is limited to its
+    max_threads even if more cores are reserved for it to claim its share of the memory budget.
+    """
+    threads = getattr(job, "threads", None) or 1
+    max_threads = getattr(job, "max_threads", None)
+    if max_threads:
+        threads = min(threads, max_threads)
+    return threads
+
+
+def configure_job_resources(job, maxcores, max_memory=None):
+    """
+    Limit the threads of a job to the number it can make use of and to the core budget, then
+    increase them if needed for the job to reserve its share of the memory budget. Jobs needing
+    more memory than the budget reserve all cores, so that they run on their own.
+
+    :param job: A pypedream Job.
+    :param maxcores: The core budget.
+    :param max_memory: Optional memory budget, in gigabytes.
+    """
+    threads = min(command_threads(job), maxcores)
+
+    if max_memory:
+        memory = job_memory(job)
+        if memory > max_memory:
+            logging.warning("Job {} needs {} GB of memory, more than the budget of {} GB".format(
+                job.jobname, memory, max_memory))
+        threads = max(threads, min(memory_threads(memory, maxcores, max_memory), maxcores))
+
+    job.threads = threads
@@ -0,0 +1,261 @@
+"""
+Prediction of job runtimes from the job databases of previous runs.
+
+For each job type, and for each combination of job type and capture kit with enough
+history, the model fits the CPU time of a job as a linear function of the total size of
+its input files, and the parallel fraction of the job's work from the speedup observed
+with different thread counts (Amdahl's law). The wall time of a job is then predicted from
+its input size and number of threads. Jobs without recorded telemetry only contribute
+their wall time, as a fallback for job types without telemetry.
+
+Time limits are conservative rather than point estimates: the predicted wall time is scaled by
+the largest ratio of observed to predicted wall time among the past jobs, and is computed from
+the actual input sizes when the job starts.
+"""
+import collections
+import logging
+import os
+
+from autoseq.util.cache import job_files
+from autoseq.util.jobdb import job_type, job_runtime, load_jobs, median
+from autoseq.util.telemetry import input_bytes
+
+# Runtime in seconds assumed for job types without runtime history:
+DEFAULT_RUNTIME = 60.0
+
+# Number of past jobs needed to fit a separate model for a capture kit:
+MIN_CAPTURE_KIT_JOBS = 3
+
+# Number of past jobs of a job type needed to limit the wall time of its jobs:
+MIN_WALLTIME_JOBS = 5
+
+# Time limit in seconds of a job, base + per_gb * input size in GB but at least minimum:
+WalltimeLimit = collections.namedtuple("WalltimeLimit", ["base", "per_gb", "minimum"])
+
+
+def jobname_capture_kit(jobname):
+    """
+    Get the capture kit of the library capture or clinseq barcode that a job name refers to, e.g.
+    "TT" for "vardict/AL-P-NA12877-T-03098849-TD-TT-AL-P-NA12877-N-03098121-TD-TT".
+
+    :param jobname: A job name.
+    :return: Capture kit ID, "WGS" for whole genome data, or None if not found.
+    """
+    for part in jobname.split("/")[1:]:
+        fields = part.split("-")
+        if len(fields) >= 7 and fields[0] in ["AL", "LB", "OT"]:
+            return "WGS" if fields[6] == "WGS" else fields[6][:2]
+    return None
+
+
+def amdahl_factor(parallel_fraction, threads):
+    """
+    :return: The wall time of a job relative to its CPU time when run with the specified number of threads.
+    """
+    return (1 - parallel_fraction) + parallel_fraction / float(max(threads, 1))
+
+
+def fit_line(xs, ys):
+    """
+    Least-squares fit of y = intercept + slope * x. The slope is zero if all x values are equal.
+
+    :return: (intercept, slope) tuple.
+    """
+    mean_x = sum(xs) / float(len(xs))
+    mean_y = sum(ys) / float(len(ys))
+    variance = sum([(x - mean_x) ** 2 for x in xs])
+    if variance == 0:
+        return mean_y, 0.0
+    slope = sum([(x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)]) / variance
+    return mean_y - slope * mean_x, slope
+
+
+class JobTypeModel(object):
+    """
+    Runtime model for the jobs of a single job type, or job type and capture kit.
+    """
+
+    def __init__(self, records):
+        """
+        :param records: List of (input_bytes, threads, cpu_time, wall_time) tuples from past jobs.
+        """
+        input_gbs = [record[0] / 1024.0 ** 3 for record in records]
+        self.intercept, self.slope = fit_line(input_gbs, [record[2] for record in records])
+        self.typical_input_bytes = median([record[0] for record in records])
+
+        # Parallel fraction of the work, from the speedup of jobs run with several threads:
+        parallel_fractions = []
+        for _, threads, cpu_time, wall_time in records:
+            if threads > 1 and wall_time > 0 and cpu_time > 0:
+                speedup = min(max(cpu_time / wall_time, 1.0), threads)
+                parallel_fractions.append((1 - 1 / speedup) / (1 - 1.0 / threads))
+        self.parallel_fraction = median(parallel_fractions) if parallel_fractions else 0.0
+
+        # Largest ratio of the observed to the predicted wall time of the past jobs:
+        self.num_jobs = len(records)
+        self.max_ratio = max([wall_time / self.predict(record_input_bytes, threads)
+                              for record_input_bytes, threads, _, wall_time in records])
+
+    def predict(self, input_bytes=None, threads=1):
+        """
+        :param input_bytes: Total input size in bytes, or None to assume a typical input size.
+        :param threads: Number of threads of the job.
+        :return: Predicted wall time in seconds.
+        """
+        if input_bytes is None:
+            input_bytes = self.typical_input_bytes
+        cpu_time = max(self.intercept + self.slope * input_bytes / 1024.0 ** 3, 1.0)
+        return cpu_time * amdahl_factor(self.parallel_fraction, threads)
+
+
+class RuntimeModel(object):
+    """
+    Predicts job runtimes from the jobs of previous runs.
+    """
+
+    def __init__(self, jobs=()):
+        """
+        :param jobs: List of job dictionaries from job databases, see load_jobs().
+        """
+        records = {}
+        wall_times = {}
+        for job in jobs:
+            wall_time = job_runtime(job)
+            if wall_time is None:
+                continue
+            curr_job_type = job_type(job['jobname'])
+            wall_times.setdefault(curr_job_type, []).append(wall_time)
+
+            telemetry = job.get('telemetry')
+            if telemetry and telemetry.get('input_bytes') is not None:
+                record = (telemetry['input_bytes'], telemetry.get('threads') or 1,
+                          telemetry['cpu_user'] + telemetry['cpu_system'], wall_time)
+                records.setdefault((curr_job_type, None), []).append(record)
+                records.setdefault((curr_job_type, jobname_capture_kit(job['jobname'])), []).append(record)
+
+        self.models = dict([(key, JobTypeModel(key_records)) for key, key_records in records.items()
+                            if key[1] is None or len(key_records) >= MIN_CAPTURE_KIT_JOBS])
+        self.median_wall_times = dict([(curr_job_type, median(curr_wall_times))
+                                       for curr_job_type, curr_wall_times in wall_times.items()])
+        self.max_wall_times = dict([(curr_job_type, max(curr_wall_times))
+                                    for curr_job_type, curr_wall_times in wall_times.items()])
+        self.num_jobs = dict([(curr_job_type, len(curr_wall_times))
+                              for curr_job_type, curr_wall_times in wall_times.items()])
+
+    @classmethod
+    def from_jobdbs(cls, jobdb_filenames):
+        """
+        :param jobdb_filenames: List of job database JSON files from previous runs.
+        :return: A RuntimeModel fitted to the jobs in the job databases.
+        """
+        jobs = []
+        for jobdb_filename in jobdb_filenames:
+            logging.debug("Reading job runtimes from {}".format(jobdb_filename))
+            jobs.extend(load_jobs(jobdb_filename))
+        return cls(jobs)
+
+    def has_history(self, jobname):
+        """
+        :return: True if there are past jobs of the same type as the named job.
+        """
+        return job_type(jobname) in self.median_wall_times
+
+    def predict(self, jobname, input_bytes=None, threads=1):
+        """
+        :param jobname: Name of the job.
+        :param input_bytes: Total input size in bytes, or None if not known.
+        :param threads: Number of threads of the job.
+        :return: Predicted wall time in seconds.
+        """
+        curr_job_type = job_type(jobname)
+        capture_kit = jobname_capture_kit(jobname)
+        for key in [(curr_job_type, capture_kit), (curr_job_type, None)]:
+            if key in self.models:
+                return self.models[key].predict(input_bytes, threads)
+        return self.median_wall_times.get(curr_job_type, DEFAULT_RUNTIME)
+
+    def predict_job(self, job):
+        """
+        :param job: A pypedream Job. The sizes of inputs that do not exist yet are not known,
+        in which case a typical input size is assumed.
+        :return: Predicted wall time in seconds.
+        """
+        inputs = job_files(job, "input")
+        known_input_bytes = None
+        if inputs and all(os.path.isfile(filename) for filename in inputs):
+            known_input_bytes = input_bytes(inputs)
+        return self.predict(job.jobname, known_input_bytes, getattr(job, "threads", None) or 1)
+
+    def walltime_limit(self, jobname, threads=1, margin=2.0, minimum=600):
+        """
+        Get a conservative time limit for the named job: the prediction for its input size scaled
+        by the largest ratio of observed to predicted wall time of the past jobs, or the longest
+        past wall time for job types without telemetry, times the margin.
+
+        :param jobname: Name of the job.
+        :param threads: Number of threads of the job.
+        :param margin: Factor to multiply the time limit by.
+        :param minimum: Minimum time limit in seconds.
+        :return: A WalltimeLimit, or None if there are fewer than MIN_WALLTIME_JOBS past jobs of
+        the same type.
+        """
+        curr_job_type = job_type(jobname)
+        if self.num_jobs.get(curr_job_type, 0) < MIN_WALLTIME_JOBS:
+            return None
+        for key in [(curr_job_type, jobname_capture_kit(jobname)), (curr_job_type, None)]:
+            model = self.models.get(key)
+            if model and model.num_jobs >= MIN_WALLTIME_JOBS:
+                factor = margin * model.max_ratio * amdahl_factor(model.parallel_fraction, threads)
+                return WalltimeLimit(factor * model.intercept, factor * model.slope, minimum)
+        return WalltimeLimit(margin * self.max_wall_times[curr_job_type], 0.0, minimum)
+
+
+def walltime_cmd(limit, inputs):
+    """
+    :param limit: A WalltimeLimit.
+    :param inputs: The input files of the job.
+    :return: Command lowering the time limit of the slurm job it runs in to the limit for the size
+    of the inputs when it runs, in minutes, which does nothing outside slurm jobs. Users can lower,
+    but not raise, the time limits of their jobs.
+    """
+    sizes_cmd = "du -cbL {} 2>/dev/null".format(" ".join(inputs)) if inputs else "echo 0"
+    minutes_cmd = "{} | awk 'END {{ s = {:.3f} + {:.3f} * $1 / 1073741824 ; if (s < {}) s = {} ; " \
+                  "printf \"%d\", s / 60 + 1 }}'".format(sizes_cmd, limit.base, limit.per_gb,
+                                                       limit.minimum, limit.minimum)
+    return "if [ -n \"$SLURM_JOB_ID\" ]; then scontrol update JobId=\"$SLURM_JOB_ID\" TimeLimit=$({}) ; fi".format(
+        minutes_cmd)
+
+
+def enable_job_walltime(job):
+    """
+    Make a job apply its walltime attribute, a WalltimeLimit, as the time limit of the slurm job
+    running it, for the size of its inputs when it starts.
+
+    :param job: A pypedream Job.
+    """
+    original_command = job.command
+
+    def command():
+        return "{} ; {}".format(walltime_cmd(job.walltime, job_files(job, "input")), original_command())
+
+    job.command = command
+
+
+def assign_walltimes(graph, model, margin=2.0, minimum=600):
+    """
+    Set the walltime attribute of the jobs in a pipeline graph with enough runtime history, and
+    make these jobs apply it as the time limit of the slurm jobs running them, see
+    enable_job_walltime(). The runners are not given per-job submission options, so jobs are
+    submitted with the default time limit of the runner, and lower it once they start. Jobs
+    without enough runtime history keep the default time limit.
+
+    :param graph: The pipeline's job graph.
+    :param model: A RuntimeModel.
+    :param margin: Factor to multiply the time limits by.
+    :param minimum: Minimum time limit in seconds.
+    """
+    for job in graph.nodes():
+        limit = model.walltime_limit(job.jobname, getattr(job, "threads", None) or 1, margin, minimum)
+        if limit:
+            job.walltime = limit
+            enable_job_walltime(job)
@@ -0,0 +1,106 @@
+"""
+Composition of shell commands streaming data between tools without intermediate files.
+
+A writer command and one or more reader commands are connected by named pipes in a temporary
+folder. The tools never open the named pipes themselves: a tool that fails before opening its
+end of a named pipe would leave the tool at the other end blocked forever opening the other end.
+Instead, each named pipe is opened at both ends by a cat relay started by the shell, and each
+tool is connected to its relays by anonymous pipes, passed as file descriptors 3, 4, .... When a
+tool exits, successfully or not, the relays pass the end of file or the broken pipe on to the
+tools at the other end, so that no process is left blocked.
+"""
+
+# The file descriptors of the streams of a command, and the one holding the standard output
+# of the writer:
+FIRST_STREAM_FD = 3
+MAX_STREAMS = 6
+STDOUT_FD = 9
+
+
+def stream_fifos(tmpdir, num_streams):
+    """
+    :return: The named pipes connecting the streams in the temporary folder.
+    """
+    return ["{}/stream{}.fifo".format(tmpdir, idx) for idx in range(num_streams)]
+
+
+def failed_marker(tmpdir):
+    """
+    :return: The file in the temporary folder created when a command fails.
+    """
+    return "{}/failed".format(tmpdir)
+
+
+def close_stream_fds_cmd():
+    """
+    :return: Redirections closing all stream file descriptors, for the relays.
+    """
+    return " ".join(["{}>&-".format(fd) for fd in range(FIRST_STREAM_FD, FIRST_STREAM_FD + MAX_STREAMS)])
+
+
+def record_failure_cmd(cmd, tmpdir):
+    """
+    :return: Command running cmd and recording its failure in the temporary folder.
+    """
+    return "{{ {} || touch {} ; }}".format(cmd, failed_marker(tmpdir))
+
+
+def writer_pipeline_cmd(writer_cmd, fifos, tmpdir):
+    """
+    :return: Pipeline running the writer with its streams connected to relays writing to the fifos.
+    """
+    cmd = "{} >&{}".format(record_failure_cmd(writer_cmd, tmpdir), STDOUT_FD)
+    for fd, fifo in enumerate(fifos, FIRST_STREAM_FD):
+        cmd = "{{ {} ; }} {}>&1 | cat > {} {}".format(cmd, fd, fifo, close_stream_fds_cmd())
+    return cmd
+
+
+def reader_pipeline_cmd(reader_cmd, fifos, tmpdir):
+    """
+    :return: Pipeline running a reader with its streams connected to relays reading from the fifos.
+    """
+    cmd = record_failure_cmd(reader_cmd, tmpdir)
+    for fd, fifo in reversed(list(enumerate(fifos, FIRST_STREAM_FD))):
+        cmd = "cat < {} {} | {{ exec {}<&0 ; {} ; }}".format(fifo, close_stream_fds_cmd(), fd, cmd)
+    return cmd
+
+
+def fifo_stream_cmd(tmpdir, writer_cmd, num_streams, reader_cmds):
+    """
+    Compose a shell command running one writer command and several reader commands connected
+    by streams, which fails if any of the commands fails. The temporary folder, which must exist,
+    holds the named pipes and is left for the caller to remove.
+
+    :param tmpdir: Temporary folder.
+    :param writer_cmd: Command writing stream i to /dev/fd/3+i, for example by linking files
+    it writes to these paths.
+    :param num_streams: The number of streams written by the writer.
+    :param reader_cmds: List of (command, streams) tuples. Each command reads the streams with
+    the indices in its list from /dev/fd/3, /dev/fd/4, .... Each stream must be read by exactly
+    one reader. The streams only end when the writer exits, and the pipes only buffer a limited
+    amount of data, so a reader of several streams must read them concurrently.
+    :return: Command string.
+    """
+    if num_streams > MAX_STREAMS:
+        raise ValueError("Too many streams: {}".format(num_streams))
+
+    fifos = stream_fifos(tmpdir, num_streams)
+    start_readers_cmd = "".join(["{} & ".format(reader_pipeline_cmd(reader_cmd, [fifos[idx] for idx in streams],
+                                                                    tmpdir))
+                                 for reader_cmd, streams in reader_cmds])
+    return "mkfifo {} && (exec {}>&1 ; {}{} ; wait) && [ ! -e {} ]".format(
+        " ".join(fifos), STDOUT_FD, start_readers_cmd, writer_pipeline_cmd(writer_cmd, fifos, tmpdir),
+        failed_marker(tmpdir))
+
+
+def tmpdir_cmd(tmpdir, cmd):
+    """
+    Compose a shell command running a command in a newly created temporary folder, which is
+    removed afterwards whether or not the command succeeds.
+
+    :param tmpdir: The temporary folder.
+    :param cmd: The command using the temporary folder.
+    :return: Command string, with the exit status of cmd.
+    """
+    return "mkdir -p {} && {{ {} ; tmpdir_status=$? ; rm -r {} ; [ $tmpdir_status -eq 0 ] ; }}".format(
+        tmpdir, cmd, tmpdir)
@@ -0,0 +1,230 @@
+"""
+Per-job resource usage telemetry.
+
+Job command lines are run by autoseq-telemetry-run, which waits for the command with
+wait4() to obtain its resource usage, including that of all processes the command
+waited for. The CPU time, peak resident set size, bytes read from and written to disk,
+peak scratch usage and wall time of each job are written to a JSON file per job, together
+with the total size of its input files, and merged into the job database after the run.
+"""
+import json
+import logging
+import os
+import pipes
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+
+from autoseq.util.cache import job_files
+from autoseq.util.jobdb import job_type
+
+# Size in bytes of the blocks counted by ru_inblock and ru_oublock:
+RUSAGE_BLOCK_SIZE = 512
+
+
+def filesystem_used(path):
+    """
+    :return: The number of bytes used on the filesystem holding the specified path.
+    """
+    stat = os.statvfs(path)
+    return (stat.f_blocks - stat.f_bfree) * stat.f_frsize
+
+
+class ScratchMonitor(threading.Thread):
+    """
+    Samples the usage of the scratch filesystem while a job runs, to estimate the peak scratch
+    usage of the job. Concurrent jobs using the same filesystem are included in the estimate.
+    """
+
+    def __init__(self, scratch, interval=5):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.scratch = scratch
+        self.interval = interval
+        self.initial_used = filesystem_used(scratch)
+        self.peak_used = self.initial_used
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak_used = max(self.peak_used, filesystem_used(self.scratch))
+
+    def stop(self):
+        """
+        :return: The peak scratch usage in bytes, relative to the usage when the job started.
+        """
+        self.stopped.set()
+        self.peak_used = max(self.peak_used, filesystem_used(self.scratch))
+        return self.peak_used - self.initial_used
+
+
+def input_bytes(inputs):
+    """
+    :return: The total size in bytes of the existing files among the specified inputs.
+    """
+    return sum([os.path.getsize(filename) for filename in inputs if os.path.isfile(filename)])
+
+
+def run_with_telemetry(command, output, jobname="", scratch=None, threads=None, memory=None, inputs=()):
+    """
+    Run a command line and write its resource usage to a JSON file.
+
+    :param command: Command line string.
+    :param output: The JSON file to write.
+    :param jobname: Name of the job running the command.
+    :param scratch: Optional scratch folder of the job, to monitor the usage of.
+    :param threads: Number of threads assigned to the job.
+    :param memory: Memory in gigabytes declared by the job.
+    :param inputs: Input files of the job.
+    :return: The exit code of the command.
+    """
+    total_input_bytes = input_bytes(inputs)
+    scratch_monitor = None
+    if scratch and os.path.isdir(scratch):
+        scratch_monitor = ScratchMonitor(scratch)
+        scratch_monitor.start()
+
+    start = time.time()
+    process = subprocess.Popen(command, shell=True)
+    _, status, rusage = os.wait4(process.pid, 0)
+    wall_time = time.time() - start
+    exitcode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else 128 + os.WTERMSIG(status)
+
+    telemetry = {"jobname": jobname,
+                 "exitcode": exitcode,
+                 "wall_time": wall_time,
+                 "cpu_user": rusage.ru_utime,
+                 "cpu_system": rusage.ru_stime,
+                 # ru_maxrss is in kilobytes on Linux:
+                 "max_rss": rusage.ru_maxrss * 1024,
+                 "bytes_read": rusage.ru_inblock * RUSAGE_BLOCK_SIZE,
+                 "bytes_written": rusage.ru_oublock * RUSAGE_BLOCK_SIZE,
+                 "scratch_used": scratch_monitor.stop() if scratch_monitor else None,
+                 "input_bytes": total_input_bytes,
+                 "threads": threads,
+                 "memory": memory}
+
+    tmp_output = "{}.{}".format(output, uuid.uuid4())
+    with open(tmp_output, "w") as output_file:
+        json.dump(telemetry, output_file, indent=4, sort_keys=True)
+    os.rename(tmp_output, output)
+    return exitcode
+
+
+def telemetry_command(command, output, jobname, scratch, threads, memory, inputs=()):
+    """
+    Wrap a command line so that it is run through autoseq-telemetry-run.
+
+    :return: Command line string.
+    """
+    return "autoseq-telemetry-run " + \
+           "--output {} ".format(pipes.quote(output)) + \
+           "--jobname {} ".format(pipes.quote(jobname)) + \
+           ("--scratch {} ".format(pipes.quote(scratch)) if scratch else "") + \
+           ("--threads {} ".format(threads) if threads else "") + \
+           ("--memory {} ".format(memory) if memory else "") + \
+           "".join(["-i {} ".format(pipes.quote(filename)) for filename in inputs]) + \
+           pipes.quote(command)
+
+
+def enable_job_telemetry(job, telemetry_dir, scratch=None):
+    """
+    Make a job record its resource usage in the telemetry folder.
+
+    :param job: A pypedream Job.
+    :param telemetry_dir: Folder to write a telemetry JSON file per job to.
+    :param scratch: Optional scratch folder, unless set for the job.
+    """
+    original_command = job.command
+    output = os.path.join(telemetry_dir, "{}.json".format(uuid.uuid4().hex))
+
+    def command():
+        return "mkdir -p {} && ".format(pipes.quote(telemetry_dir)) + \
+               telemetry_command(original_command(), output, job.jobname, getattr(job, "scratch", None) or scratch,
+                                 getattr(job, "threads", None), getattr(job, "memory", None), job_files(job, "input"))
+
+    job.command = command
+
+
+def jobdb_telemetry_dir(jobdb_filename):
+    """
+    :return: The telemetry folder to use for a run writing the specified job database.
+    """
+    return os.path.splitext(jobdb_filename)[0] + "-telemetry"
+
+
+def start_telemetry_dir(telemetry_dir):
+    """
+    Create an empty telemetry folder, removing the telemetry of any previous run.
+    """
+    if os.path.isdir(telemetry_dir):
+        shutil.rmtree(telemetry_dir)
+    os.makedirs(telemetry_dir)
+
+
+def load_telemetry(telemetry_dir):
+    """
+    :return: List of the telemetry dictionaries in the telemetry folder.
+    """
+    if not os.path.isdir(telemetry_dir):
+        return []
+    telemetry = []
+    for filename in sorted(os.listdir(telemetry_dir)):
+        if filename.endswith(".json"):
+            with open(os.path.join(telemetry_dir, filename)) as telemetry_file:
+                telemetry.append(json.load(telemetry_file))
+    return telemetry
+
+
+def merge_telemetry(jobdb_filename, telemetry_dir):
+    """
+    Add the telemetry recorded for each job to its entry in the job database, as a
+    "telemetry" dictionary. Jobs are matched by name.
+
+    :param jobdb_filename: The job database JSON file written by the pipeline.
+    :param telemetry_dir: The telemetry folder of the run.
+    """
+    telemetry_by_jobname = dict([(telemetry["jobname"], telemetry) for telemetry in load_telemetry(telemetry_dir)])
+    with open(jobdb_filename) as jobdb_file:
+        jobdb = json.load(jobdb_file)
+
+    for job in jobdb['jobs']:
+        if job['jobname'] in telemetry_by_jobname:
+            job['telemetry'] = telemetry_by_jobname[job['jobname']]
+    logging.debug("Merged telemetry of {} jobs into {}".format(len(telemetry_by_jobname), jobdb_filename))
+
+    tmp_jobdb_filename = "{}.{}".format(jobdb_filename, uuid.uuid4())
+    with open(tmp_jobdb_filename, "w") as jobdb_file:
+        json.dump(jobdb, jobdb_file, indent=4)
+    os.rename(tmp_jobdb_filename, jobdb_filename)
+
+
+COST_COLUMNS = ["jobs", "cpu_hours", "wall_hours", "max_rss_gb", "memory_gb", "read_gb", "written_gb", "scratch_gb"]
+
+
+def job_costs(jobs):
+    """
+    Summarise the telemetry of the jobs in one or more job databases by job type.
+
+    :param jobs: List of job dictionaries from job databases.
+    :return: List of (job type, costs) tuples, with costs a dictionary with COST_COLUMNS as keys,
+    ordered by decreasing CPU time.
+    """
+    gigabyte = 1024.0 ** 3
+    costs = {}
+    for job in jobs:
+        telemetry = job.get('telemetry')
+        if not telemetry:
+            continue
+        cost = costs.setdefault(job_type(job['jobname']), dict([(column, 0) for column in COST_COLUMNS]))
+        cost["jobs"] += 1
+        cost["cpu_hours"] += (telemetry["cpu_user"] + telemetry["cpu_system"]) / 3600.0
+        cost["wall_hours"] += telemetry["wall_time"] / 3600.0
+        cost["max_rss_gb"] = max(cost["max_rss_gb"], telemetry["max_rss"] / gigabyte)
+        cost["memory_gb"] = max(cost["memory_gb"], telemetry.get("memory") or 0)
+        cost["read_gb"] += telemetry["bytes_read"] / gigabyte
+        cost["written_gb"] += telemetry["bytes_written"] / gigabyte
+        cost["scratch_gb"] = max(cost["scratch_gb"], (telemetry.get("scratch_used") or 0) / gigabyte)
+    return sorted(costs.items(), key=lambda item: item[1]["cpu_hours"], reverse=True)
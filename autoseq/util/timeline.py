@@ -0,0 +1,320 @@
+"""
+Timelines of the jobs in one or more job databases.
+
+The jobs are read in a single pass into NumPy arrays of start times, end times and codes
+for their job types, statuses and runs, so that layouts and summaries are computed with
+array operations. Jobs are laid out either with a row per job, or packed into lanes with
+one row per concurrently running job, optionally grouped by job type. Timelines are
+exported as columnar JSON, or as a self-contained HTML page drawing the jobs on a canvas,
+which stays responsive with tens of thousands of jobs.
+"""
+import heapq
+import json
+import os
+
+import numpy as np
+
+from autoseq.util.jobdb import datetime_to_timestamp, deserialize_date, job_type, load_jobs
+
+STATUS_COLORS = {'FAILED': 'red',
+                 'CANCELLED': 'pink',
+                 'RUNNING': 'blue',
+                 'COMPLETED': '#00ff00',
+                 'PENDING': 'lightblue'}
+
+LAYOUTS = ["jobs", "lanes", "types"]
+
+
+class Timeline(object):
+    """
+    The started and finished jobs of one or more runs, as arrays with one element per job.
+    Times are in seconds since the start of the first job. For jobs with telemetry, the
+    number of threads and the wall time of the job command are included; other jobs are
+    assumed to use one thread, with an unknown command wall time.
+    """
+
+    def __init__(self, jobs, runs=None):
+        """
+        :param jobs: List of job dictionaries from job databases, see load_jobs().
+        :param runs: Optional list with the index of the run of each job.
+        """
+        self.types, self.statuses = [], []
+        type_codes, status_codes = {}, {}
+        names, types, statuses, job_runs, starts, ends = [], [], [], [], [], []
+        threads, wall_times = [], []
+        for idx, job in enumerate(jobs):
+            if not job.get('starttime') or not job.get('endtime'):
+                continue
+            curr_job_type = job_type(job['jobname'])
+            if curr_job_type not in type_codes:
+                type_codes[curr_job_type] = len(self.types)
+                self.types.append(curr_job_type)
+            if job['status'] not in status_codes:
+                status_codes[job['status']] = len(self.statuses)
+                self.statuses.append(job['status'])
+
+            names.append(job['jobname'])
+            types.append(type_codes[curr_job_type])
+            statuses.append(status_codes[job['status']])
+            job_runs.append(runs[idx] if runs else 0)
+            starts.append(datetime_to_timestamp(deserialize_date(job['starttime'])))
+            ends.append(datetime_to_timestamp(deserialize_date(job['endtime'])))
+            telemetry = job.get('telemetry') or {}
+            threads.append(telemetry.get('threads') or 1)
+            wall_times.append(telemetry.get('wall_time', np.nan))
+
+        self.names = names
+        self.type = np.array(types, dtype=np.int32)
+        self.status = np.array(statuses, dtype=np.int32)
+        self.run = np.array(job_runs, dtype=np.int32)
+        self.start = np.array(starts, dtype=np.float64)
+        self.end = np.array(ends, dtype=np.float64)
+        self.threads = np.array(threads, dtype=np.int32)
+        self.wall_time = np.array(wall_times, dtype=np.float64)
+        self.origin = self.start.min() if len(self.start) else 0.0
+        self.start -= self.origin
+        self.end -= self.origin
+        self.run_names = []
+
+    @classmethod
+    def from_jobdbs(cls, jobdb_filenames):
+        """
+        :param jobdb_filenames: List of job database JSON files, each holding the jobs of a run.
+        :return: A Timeline of the jobs of all runs.
+        """
+        jobs, runs = [], []
+        for run, jobdb_filename in enumerate(jobdb_filenames):
+            run_jobs = load_jobs(jobdb_filename)
+            jobs.extend(run_jobs)
+            runs.extend([run] * len(run_jobs))
+        timeline = cls(jobs, runs)
+        timeline.run_names = [os.path.basename(jobdb_filename) for jobdb_filename in jobdb_filenames]
+        return timeline
+
+    def __len__(self):
+        return len(self.names)
+
+    def duration(self):
+        """
+        :return: Array with the runtime of each job in seconds.
+        """
+        return self.end - self.start
+
+    def rows(self, layout="lanes"):
+        """
+        :param layout: "jobs" for a row per job, "lanes" for a row per concurrently running
+        job, or "types" for lanes packed separately for each job type.
+        :return: Array with the row of each job.
+        """
+        if layout == "jobs":
+            return np.arange(len(self), dtype=np.int32)
+        elif layout == "lanes":
+            return pack_lanes(self.start, self.end)
+        elif layout == "types":
+            rows = np.zeros(len(self), dtype=np.int32)
+            offset = 0
+            for type_code in range(len(self.types)):
+                indices = np.flatnonzero(self.type == type_code)
+                lanes = pack_lanes(self.start[indices], self.end[indices])
+                rows[indices] = offset + lanes
+                offset += lanes.max() + 1
+            return rows
+        raise ValueError("Invalid timeline layout: {}".format(layout))
+
+    def type_summary(self):
+        """
+        :return: List with a dictionary per job type, holding the number of jobs, number of
+        failed jobs, total and longest runtime in seconds and the first start and last end
+        of its jobs, ordered by decreasing total runtime.
+        """
+        num_types = len(self.types)
+        duration = self.duration()
+        jobs = np.bincount(self.type, minlength=num_types)
+        failed = np.bincount(self.type[self.status_mask("FAILED")], minlength=num_types)
+        total = np.bincount(self.type, weights=duration, minlength=num_types)
+        longest = np.zeros(num_types)
+        np.maximum.at(longest, self.type, duration)
+        first_start = np.full(num_types, np.inf)
+        np.minimum.at(first_start, self.type, self.start)
+        last_end = np.zeros(num_types)
+        np.maximum.at(last_end, self.type, self.end)
+
+        return [{"type": self.types[type_code],
+                 "jobs": int(jobs[type_code]),
+                 "failed": int(failed[type_code]),
+                 "total_seconds": float(total[type_code]),
+                 "longest_seconds": float(longest[type_code]),
+                 "first_start": float(first_start[type_code]),
+                 "last_end": float(last_end[type_code])}
+                for type_code in np.argsort(-total, kind="mergesort")]
+
+    def status_mask(self, status):
+        """
+        :return: Boolean array, true for the jobs with the specified status.
+        """
+        if status not in self.statuses:
+            return np.zeros(len(self), dtype=bool)
+        return self.status == self.statuses.index(status)
+
+    def to_dict(self, layout="lanes"):
+        """
+        :return: Columnar dictionary of the timeline, with the job types, statuses and runs of
+        the jobs given as indices into the "types", "statuses" and "runs" lists.
+        """
+        return {"origin": self.origin,
+                "layout": layout,
+                "types": self.types,
+                "statuses": self.statuses,
+                "colors": [STATUS_COLORS.get(status, "grey") for status in self.statuses],
+                "runs": self.run_names,
+                "summary": self.type_summary(),
+                "jobs": {"name": self.names,
+                         "type": self.type.tolist(),
+                         "status": self.status.tolist(),
+                         "run": self.run.tolist(),
+                         "start": np.round(self.start, 3).tolist(),
+                         "end": np.round(self.end, 3).tolist(),
+                         "row": self.rows(layout).tolist()}}
+
+
+def pack_lanes(start, end):
+    """
+    Assign jobs to lanes such that jobs in the same lane do not overlap in time, using the
+    smallest possible number of lanes.
+
+    :param start: Array of job start times.
+    :param end: Array of job end times.
+    :return: Array with the lane of each job.
+    """
+    lanes = np.zeros(len(start), dtype=np.int32)
+    # Heap of (end time of last job, lane) tuples:
+    busy_lanes = []
+    num_lanes = 0
+    for idx in np.argsort(start, kind="mergesort"):
+        if busy_lanes and busy_lanes[0][0] <= start[idx]:
+            _, lane = heapq.heappop(busy_lanes)
+        else:
+            lane = num_lanes
+            num_lanes += 1
+        lanes[idx] = lane
+        heapq.heappush(busy_lanes, (end[idx], lane))
+    return lanes
+
+
+def write_json(timeline, filename, layout="lanes"):
+    with open(filename, "w") as json_file:
+        json.dump(timeline.to_dict(layout), json_file, separators=(",", ":"))
+
+
+def write_html(timeline, filename, layout="lanes", title="Autoseq jobs"):
+    """
+    Write a self-contained HTML page drawing the timeline, with zooming by mouse wheel,
+    panning by dragging, and the name and runtime of the job under the mouse pointer.
+    """
+    # Escape "</" so that job names cannot end the script element:
+    data = json.dumps(timeline.to_dict(layout), separators=(",", ":")).replace("</", "<\\/")
+    with open(filename, "w") as html_file:
+        html_file.write(HTML_TEMPLATE.replace("@TITLE@", title).replace("@DATA@", data))
+
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>@TITLE@</title>
+<style>
+body { font-family: sans-serif; margin: 0; }
+#info { padding: 4px 8px; height: 1.2em; font-size: 13px; white-space: nowrap; }
+#timeline { display: block; width: 100%; cursor: crosshair; }
+table { border-collapse: collapse; margin: 8px; font-size: 13px; }
+td, th { padding: 2px 8px; text-align: right; }
+td:first-child, th:first-child { text-align: left; }
+</style>
+</head>
+<body>
+<div id="info"></div>
+<canvas id="timeline"></canvas>
+<table id="summary"></table>
+<script>
+var data = @DATA@;
+var jobs = data.jobs, n = jobs.name.length;
+var canvas = document.getElementById("timeline"), ctx = canvas.getContext("2d");
+var info = document.getElementById("info");
+var numRows = 0, tmax = 0, byRow = [];
+for (var i = 0; i < n; i++) {
+  numRows = Math.max(numRows, jobs.row[i] + 1);
+  tmax = Math.max(tmax, jobs.end[i]);
+  (byRow[jobs.row[i]] = byRow[jobs.row[i]] || []).push(i);
+}
+var rowHeight = Math.max(2, Math.min(16, Math.floor(800 / Math.max(numRows, 1))));
+var t0 = 0, t1 = tmax || 1;
+
+function resize() {
+  canvas.width = window.innerWidth;
+  canvas.height = numRows * rowHeight;
+  draw();
+}
+
+function draw() {
+  var scale = canvas.width / (t1 - t0);
+  ctx.clearRect(0, 0, canvas.width, canvas.height);
+  for (var s = 0; s < data.statuses.length; s++) {
+    ctx.fillStyle = data.colors[s];
+    for (var i = 0; i < n; i++) {
+      if (jobs.status[i] !== s || jobs.end[i] < t0 || jobs.start[i] > t1) continue;
+      var x = (jobs.start[i] - t0) * scale;
+      ctx.fillRect(x, jobs.row[i] * rowHeight, Math.max((jobs.end[i] - jobs.start[i]) * scale, 1),
+                   Math.max(rowHeight - 1, 1));
+    }
+  }
+}
+
+function timeAt(x) { return t0 + x / canvas.width * (t1 - t0); }
+
+canvas.addEventListener("wheel", function (e) {
+  e.preventDefault();
+  var t = timeAt(e.offsetX), factor = e.deltaY < 0 ? 0.8 : 1.25;
+  t0 = t - (t - t0) * factor;
+  t1 = t + (t1 - t) * factor;
+  draw();
+});
+
+var dragX = null;
+canvas.addEventListener("mousedown", function (e) { dragX = e.offsetX; });
+window.addEventListener("mouseup", function () { dragX = null; });
+canvas.addEventListener("mousemove", function (e) {
+  if (dragX !== null) {
+    var dt = (dragX - e.offsetX) / canvas.width * (t1 - t0);
+    t0 += dt;
+    t1 += dt;
+    dragX = e.offsetX;
+    draw();
+    return;
+  }
+  var t = timeAt(e.offsetX), row = byRow[Math.floor(e.offsetY / rowHeight)] || [];
+  info.textContent = "";
+  for (var k = 0; k < row.length; k++) {
+    var i = row[k];
+    if (jobs.start[i] <= t && t <= jobs.end[i]) {
+      info.textContent = jobs.name[i] + " (" + data.statuses[jobs.status[i]] + ", " +
+        Math.round(jobs.end[i] - jobs.start[i]) + " s" +
+        (data.runs.length > 1 ? ", " + data.runs[jobs.run[i]] : "") + ")";
+      break;
+    }
+  }
+});
+
+var rows = ["<tr><th>Job type</th><th>Jobs</th><th>Failed</th><th>Total hours</th><th>Longest minutes</th></tr>"];
+data.summary.forEach(function (s) {
+  var name = s.type.replace(/&/g, "&amp;").replace(/</g, "&lt;");
+  rows.push("<tr><td>" + name + "</td><td>" + s.jobs + "</td><td>" + s.failed + "</td><td>" +
+            (s.total_seconds / 3600).toFixed(2) + "</td><td>" + (s.longest_seconds / 60).toFixed(1) + "</td></tr>");
+});
+document.getElementById("summary").innerHTML = rows.join("");
+
+window.addEventListener("resize", resize);
+resize();
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,150 @@
+"""
+In-process post-processing of VCF streams.
+
+Each record is parsed once, passed through a chain of stages and serialised once, rather
+than being re-parsed by a separate process for every filtering step. Every stage mirrors
+one step of the shell pipeline previously used for VarDict output:
+
+bcftools filter -e 'STATUS !~ ".*Somatic"'  -> SomaticStatusFilter
+depth_freq_filter_input_stream              -> DepthFreqFilter
+sed (somatic header fixes)                  -> VarDictHeaderFix
+autoseq-somatic-filter                      -> SomaticFilter
+fix_ambiguous_cl()                          -> AmbiguousRefMask
+remove_dup_cl()                             -> RefAltDuplicateFilter
+"""
+import re
+import sys
+
+from autoseq.util.bcbio import depth_freq_filter, depth_freq_filter_record, call_somatic, call_somatic_record
+
+
+class VcfStage(object):
+    """
+    A single step in a VCF post-processing chain. Subclasses override process_header
+    and/or process_record.
+    """
+
+    def process_header(self, line):
+        """
+        :param line: A header line, including the trailing newline.
+        :return: List of header lines to emit in place of the input line.
+        """
+        return [line]
+
+    def process_record(self, parts):
+        """
+        :param parts: List of the tab-delimited fields of a record, without the trailing newline.
+        :return: The (possibly updated) list of fields, or None if the record should be dropped.
+        """
+        return parts
+
+
+class SomaticStatusFilter(VcfStage):
+    """Drops records whose STATUS INFO field does not indicate a somatic call."""
+
+    def process_record(self, parts):
+        for info_field in parts[7].split(";"):
+            if info_field.startswith("STATUS="):
+                if "Somatic" in info_field[len("STATUS="):]:
+                    return parts
+                return None
+        return None
+
+
+class DepthFreqFilter(VcfStage):
+    """Applies the bcbio depth and frequency filters."""
+
+    def __init__(self, tumor_index=0, aligner="bwa"):
+        self.tumor_index = tumor_index
+        self.aligner = aligner
+
+    def process_header(self, line):
+        return depth_freq_filter(line, self.tumor_index, self.aligner).splitlines(True)
+
+    def process_record(self, parts):
+        return depth_freq_filter_record(parts, self.tumor_index, self.aligner)
+
+
+class VarDictHeaderFix(VcfStage):
+    """Rewrites the somatic status and REJECT filter descriptions in the VarDict header."""
+
+    somatic_regex = re.compile(r'\.*Somatic"')
+    reject_regex = re.compile(r'REJECT,Description=".*">')
+
+    def process_header(self, line):
+        line = self.somatic_regex.sub("Somatic", line, count=1)
+        line = self.reject_regex.sub('REJECT,Description="Not Somatic via VarDict">', line, count=1)
+        return [line]
+
+
+class SomaticFilter(VcfStage):
+    """Flags somatic records and rejects the rest, as done by autoseq-somatic-filter."""
+
+    def process_header(self, line):
+        return call_somatic(line).splitlines(True)
+
+    def process_record(self, parts):
+        return call_somatic_record(parts)
+
+
+class AmbiguousRefMask(VcfStage):
+    """Replaces non-N ambiguous bases in the REF field with N."""
+
+    ambiguous_regex = re.compile("[KMRYSWBVHDX]")
+
+    def process_record(self, parts):
+        parts[3] = self.ambiguous_regex.sub("N", parts[3])
+        return parts
+
+
+class RefAltDuplicateFilter(VcfStage):
+    """Drops records where REF and ALT are identical."""
+
+    def process_record(self, parts):
+        if parts[3] == parts[4]:
+            return None
+        return parts
+
+
+def vardict_postprocessing_stages(tumor_index=0, aligner="bwa"):
+    """
+    Produce the chain of stages applied to paired VarDict output.
+
+    :param tumor_index: Index of the tumor sample among the VCF sample columns.
+    :param aligner: Name of the aligner used to produce the alignments.
+    :return: List of VcfStage objects.
+    """
+    return [SomaticStatusFilter(),
+            DepthFreqFilter(tumor_index, aligner),
+            VarDictHeaderFix(),
+            SomaticFilter(),
+            AmbiguousRefMask(),
+            RefAltDuplicateFilter()]
+
+
+def process_vcf_stream(stages, input_stream, output_stream=None):
+    """
+    Pass each line of a VCF stream through the specified stages, writing each record as
+    soon as it has been processed.
+
+    :param stages: List of VcfStage objects, applied in order.
+    :param input_stream: File-like object to read VCF lines from.
+    :param output_stream: File-like object to write to. Defaults to sys.stdout.
+    """
+    if output_stream is None:
+        output_stream = sys.stdout
+    for line in iter(input_stream.readline, ""):
+        if line.startswith("#"):
+            header_lines = [line]
+            for stage in stages:
+                header_lines = [processed for header_line in header_lines
+                                for processed in stage.process_header(header_line)]
+            output_stream.write("".join(header_lines))
+        else:
+            parts = line.rstrip("\n").split("\t")
+            for stage in stages:
+                parts = stage.process_record(parts)
+                if parts is None:
+                    break
+            else:
+                output_stream.write("\t".join(parts) + "\n")
@@ -16,7 +16,14 @@ setup(name='autoseq',
               'autoseq = autoseq.cli.cli:cli',
               'report2json = autoseq.report2json:main',
               'generate-ref = autoseq.generate_ref:main',
-              'jobs2gantt = autoseq.cli.jobs2gantt:cli'
+              'jobs2gantt = autoseq.cli.jobs2gantt:cli',
+              'autoseq-somatic-filter = autoseq.cli.somatic_filter:cli',
+              'autoseq-vardict-postprocess = autoseq.cli.vardict_postprocess:cli',
+              'autoseq-split-targets = autoseq.cli.split_targets:cli',
+              'autoseq-cache-run = autoseq.cli.cache_run:cli',
+              'autoseq-telemetry-run = autoseq.cli.telemetry_run:cli',
+              'jobcosts = autoseq.cli.jobcosts:cli',
+              'jobstats = autoseq.cli.jobstats:cli'
           ]
       }
       )
@@ -1,3 +1,7 @@
+import os
+import shutil
+import subprocess
+import tempfile
 import unittest
 
 from mock import patch
@@ -95,7 +99,7 @@ class TestAlignment(unittest.TestCase):
         skewer.input2 = "in_2.fq.gz"
         skewer.output1 = "out_1.fq.gz"
         skewer.output2 = "out_2.fq.gz"
-        skewer.stats = "stats.txt"
+        skewer.output_stats = "stats.txt"
         skewer.scratch = "/scratch"
         cmd = skewer.command()
 
@@ -105,7 +109,7 @@ class TestAlignment(unittest.TestCase):
     def test_skewer_pe_uses_both_fqs(self, mock_uuid):
         """
         test that both input1 and input2 are used in the command line
-        and that both output1 and output2 are copied back
+        and that both output1 and output2 are moved back
         """
         mock_uuid.return_value = "foo"
 
@@ -114,12 +118,12 @@ class TestAlignment(unittest.TestCase):
         skewer.input2 = "in_2.fq.gz"
         skewer.output1 = "/path/to/out_1.fq.gz"
         skewer.output2 = "/path/to/out_2.fq.gz"
-        skewer.stats = "stats.txt"
+        skewer.output_stats = "stats.txt"
         skewer.scratch = "/scratch"
         cmd = skewer.command()
         self.assertIn("in_1.fq.gz  in_2.fq.gz", cmd)
-        self.assertIn("cp /scratch/skewer-foo/skewer-trimmed-pair1.fastq.gz /path/to/out_1.fq.gz", cmd)
-        self.assertIn("cp /scratch/skewer-foo/skewer-trimmed-pair2.fastq.gz /path/to/out_2.fq.gz", cmd)
+        self.assertIn("mv -f /scratch/skewer-foo/skewer-trimmed-pair1.fastq.gz /path/to/out_1.fq.gz", cmd)
+        self.assertIn("mv -f /scratch/skewer-foo/skewer-trimmed-pair2.fastq.gz /path/to/out_2.fq.gz", cmd)
 
     @patch('uuid.uuid4')
     def test_skewer_se_only_uses_input1(self, mock_uuid):
@@ -131,12 +135,12 @@ class TestAlignment(unittest.TestCase):
         skewer.input1 = "in_1.fq.gz"
         skewer.input2 = None
         skewer.output1 = "/path/to/out_1.fq.gz"
-        skewer.output2 = "/path/to/out_2.fq.gz"
-        skewer.stats = "stats.txt"
+        skewer.output_stats = "stats.txt"
         skewer.scratch = "/scratch"
         cmd = skewer.command()
 
-        self.assertNotIn("/path/to/out_2.fq.gz", cmd)
+        self.assertIn("mv -f /scratch/skewer-foo/skewer-trimmed.fastq.gz /path/to/out_1.fq.gz", cmd)
+        self.assertNotIn("pair2", cmd)
 
     def test_skewer_raises_valuerror_if_output_not_gzipped(self):
         """
@@ -147,7 +151,7 @@ class TestAlignment(unittest.TestCase):
         skewer.input2 = None
         skewer.output1 = "/path/to/out_1.fq"
         skewer.output2 = "/path/to/out_2.fq.gz"
-        skewer.stats = "stats.txt"
+        skewer.output_stats = "stats.txt"
         skewer.scratch = "/scratch"
         with self.assertRaises(ValueError):
             skewer.command()
@@ -185,3 +189,126 @@ class TestAlignment(unittest.TestCase):
                               "dummy_output_dir", 1)
         self.assertEquals(len(self.test_clinseq_pipeline.graph.nodes()), 4)
         self.assertEquals(bwa_output.split(".")[-1], "bam")
+
+    @patch('uuid.uuid4')
+    def test_bwa_merge_mark_duplicates(self, mock_uuid):
+        mock_uuid.return_value = "foo"
+        bwa = BwaMergeMarkDuplicates()
+        bwa.input_fastq1s = ["a_1.fq.gz", "b_1.fq.gz"]
+        bwa.input_fastq2s = ["a_2.fq.gz", "b_2.fq.gz"]
+        bwa.readgroups = ["rg_a", "rg_b"]
+        bwa.input_reference_sequence = "ref.fasta"
+        bwa.output = "out.bam"
+        bwa.output_metrics = "metrics.txt"
+        bwa.scratch = "/scratch"
+        cmd = bwa.command()
+        self.assertEquals(cmd.count("bwa mem"), 2)
+        # The first alignment writes the read groups of both barcodes to the header:
+        self.assertEquals(cmd.count("-H rg_b"), 1)
+        self.assertNotIn("-H rg_a", cmd)
+        self.assertIn("grep -v '^@'", cmd)
+        # The barcodes are sorted together and duplicates are marked once, without scratch bams:
+        self.assertEquals(cmd.count("samtools sort"), 1)
+        self.assertEquals(cmd.count("samtools markdup"), 1)
+        self.assertNotIn("samblaster", cmd)
+        self.assertNotIn("MarkDuplicates", cmd)
+        self.assertNotIn("samtools merge", cmd)
+        self.assertNotIn(".bam /scratch", cmd)
+        self.assertIn("-f metrics.txt", cmd)
+
+    def test_align_capture(self):
+        bam = align_capture(self.test_clinseq_pipeline,
+                            [("AL-P-NA12877-T-03098849-TD1-TT1", ["test1.fq.gz"], ["test2.fq.gz"]),
+                             ("AL-P-NA12877-T-03098849-TD2-TT1", ["test3.fq.gz"], ["test4.fq.gz"])],
+                            "dummy_reference.fasta", "dummy_output_dir", "dummy_output_dir/out.bam",
+                            "dummy_metrics.txt")
+        # One skewer and two cat jobs per barcode, and a single alignment job:
+        self.assertEquals(len(self.test_clinseq_pipeline.graph.nodes()), 7)
+        self.assertEquals(bam, "dummy_output_dir/out.bam")
+
+    @patch('uuid.uuid4')
+    def test_skewer_bwa(self, mock_uuid):
+        """
+        test that all fastq pairs are trimmed into streams read by a single bwa command
+        """
+        mock_uuid.return_value = "foo"
+        skewer_bwa = SkewerBwa()
+        skewer_bwa.input_fastq1s = ["a_1.fq.gz", "b_1.fq.gz"]
+        skewer_bwa.input_fastq2s = ["a_2.fq.gz", "b_2.fq.gz"]
+        skewer_bwa.output_stats = ["stats_a.log", "stats_b.log"]
+        skewer_bwa.input_reference_sequence = "ref.fasta"
+        skewer_bwa.readgroup = "rg"
+        skewer_bwa.output = "out.bam"
+        skewer_bwa.scratch = "/scratch"
+        cmd = skewer_bwa.command()
+        self.assertIn("mkfifo", cmd)
+        self.assertEquals(cmd.count("skewer "), 2)
+        self.assertEquals(cmd.count("bwa mem"), 1)
+        self.assertNotIn("skewer -z", cmd)
+        self.assertIn("ln -s /dev/fd/4 /scratch/skewer-bwa-foo/1-trimmed-pair2.fastq", cmd)
+        self.assertIn("/dev/fd/3  /dev/fd/4", cmd)
+        self.assertIn("mv -f /scratch/skewer-bwa-foo/1-trimmed.log stats_b.log", cmd)
+
+    def test_skewer_bwa_failing_trimmer(self):
+        """
+        test that the job fails instead of blocking when skewer fails, and removes its scratch folder
+        """
+        tmpdir = tempfile.mkdtemp()
+        try:
+            bindir = os.path.join(tmpdir, "bin")
+            os.mkdir(bindir)
+            fake_tools = {"skewer": "exit 1",
+                          # Read the streams concurrently, as bwa reads both reads of each pair:
+                          "bwa": "for arg; do case $arg in /dev/fd/*) cat $arg > /dev/null & ;; esac; done; wait",
+                          "samblaster": "cat",
+                          "samtools": "cat > /dev/null"}
+            for tool, script in fake_tools.items():
+                with open(os.path.join(bindir, tool), "w") as tool_file:
+                    tool_file.write("#!/bin/sh\n" + script + "\n")
+                os.chmod(os.path.join(bindir, tool), 0o755)
+
+            skewer_bwa = SkewerBwa()
+            skewer_bwa.input_fastq1s = ["a_1.fq.gz", "b_1.fq.gz"]
+            skewer_bwa.input_fastq2s = ["a_2.fq.gz", "b_2.fq.gz"]
+            skewer_bwa.output_stats = [os.path.join(tmpdir, "stats_a.log"), os.path.join(tmpdir, "stats_b.log")]
+            skewer_bwa.input_reference_sequence = "ref.fasta"
+            skewer_bwa.readgroup = "rg"
+            skewer_bwa.output = os.path.join(tmpdir, "out.bam")
+            skewer_bwa.scratch = os.path.join(tmpdir, "scratch")
+            env = dict(os.environ, PATH=bindir + os.pathsep + os.environ["PATH"])
+            status = subprocess.call(["timeout", "60", "sh", "-c", skewer_bwa.command()], env=env)
+            self.assertNotIn(status, [0, 124])
+            self.assertEquals(os.listdir(skewer_bwa.scratch), [])
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_align_library_streamed(self):
+        bwa_output = align_library(self.test_clinseq_pipeline, ["test1.fq.gz"], ["test2.fq.gz"],
+                                   "AL-P-NA12877-T-03098849-TD1-TT1", "dummy_reference.fasta",
+                                   "dummy_output_dir", streamed=True)
+        self.assertEquals(len(self.test_clinseq_pipeline.graph.nodes()), 1)
+        self.assertEquals(bwa_output, "dummy_output_dir/AL-P-NA12877-T-03098849-TD1-TT1.bam")
+
+    def test_split_fastq(self):
+        split_fastq = SplitFastq()
+        split_fastq.input = "in.fq.gz"
+        split_fastq.output_chunks = ["chunk0.fq.gz", "chunk1.fq.gz"]
+        cmd = split_fastq.command()
+        self.assertIn("in.fq.gz", cmd)
+        self.assertIn("chunk0.fq.gz chunk1.fq.gz", cmd)
+
+    def test_align_chunked_per_lane(self):
+        bwa_output = align_library(self.test_clinseq_pipeline, ["lane1_1.fq.gz", "lane2_1.fq.gz"],
+                                   ["lane1_2.fq.gz", "lane2_2.fq.gz"], "AL-P-NA12877-T-03098849-TD1-TT1",
+                                   "dummy_reference.fasta", "dummy_output_dir", per_lane=True)
+        # Two skewer jobs, two bwa jobs and the merging job:
+        self.assertEquals(len(self.test_clinseq_pipeline.graph.nodes()), 5)
+        self.assertEquals(bwa_output, "dummy_output_dir/AL-P-NA12877-T-03098849-TD1-TT1.bam")
+
+    def test_align_chunked_num_chunks(self):
+        bwa_output = align_library(self.test_clinseq_pipeline, ["test1.fq.gz"], ["test2.fq.gz"],
+                                   "AL-P-NA12877-T-03098849-TD1-TT1", "dummy_reference.fasta",
+                                   "dummy_output_dir", num_chunks=3)
+        # One skewer job, two cat jobs, two splitting jobs, three bwa jobs and the merging job:
+        self.assertEquals(len(self.test_clinseq_pipeline.graph.nodes()), 9)
+        self.assertEquals(bwa_output, "dummy_output_dir/AL-P-NA12877-T-03098849-TD1-TT1.bam")
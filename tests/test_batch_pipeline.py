@@ -0,0 +1,94 @@
+import unittest
+from mock import patch
+from autoseq.pipeline.batch import *
+from autoseq.pipeline.liqbio import LiqBioPipeline
+from autoseq.tools.alignment import Skewer
+from autoseq.tools.intervals import SplitTargets
+
+
+class TestBatchPipeline(unittest.TestCase):
+    def setUp(self):
+        self.sample_data_1 = {
+            "sdid": "P-NA12877",
+            "N": ["AL-P-NA12877-N-03098121-TD1-TT1"],
+            "CFDNA": ["LB-P-NA12877-CFDNA-03098850-TD1-TT1"],
+            "T": []
+        }
+        self.sample_data_2 = {
+            "sdid": "P-NA12878",
+            "N": ["AL-P-NA12878-N-03098122-TD1-TT1"],
+            "CFDNA": ["LB-P-NA12878-CFDNA-03098851-TD1-TT1"],
+            "T": []
+        }
+
+        self.ref_data = {
+            "bwaIndex": "bwa/test-genome-masked.fasta",
+            "chrsizes": "genome/test-genome-masked.chrsizes.txt",
+            "clinvar": "variants/clinvar_20160203.vcf.gz",
+            "cosmic": "variants/CosmicCodingMuts_v71.vcf.gz",
+            "dbSNP": "variants/dbsnp142-germline-only.vcf.gz",
+            "exac": "variants/ExAC.r0.3.1.sites.vep.vcf.gz",
+            "icgc": "variants/icgc_release_20_simple_somatic_mutation.aggregated.vcf.gz",
+            "reference_dict": "genome/test-genome-masked.dict",
+            "reference_genome": "genome/test-genome-masked.fasta",
+            "swegene_common": "variants/swegen_common.vcf.gz",
+            "targets": {
+                "test-regions": {
+                    "cnvkit-ref": None,
+                    "msisites": "intervals/targets/test-regions.msisites.tsv",
+                    "targets-bed-slopped20": "intervals/targets/test-regions-GRCh37.slopped20.bed",
+                    "targets-interval_list": "intervals/targets/test-regions-GRCh37.slopped20.interval_list",
+                    "targets-interval_list-slopped20": "intervals/targets/test-regions-GRCh37.slopped20.interval_list"
+                }
+            },
+            "contest_vcfs": {
+                "test-regions": "test_contest.vcf"
+            },
+            "vep_dir": "dummy_vep_dir"
+        }
+
+    @patch('autoseq.pipeline.clinseq.data_available_for_clinseq_barcode')
+    @patch('autoseq.pipeline.clinseq.find_fastqs')
+    def test_shared_jobs(self, mock_find_fastqs, mock_data_available_for_clinseq_barcode):
+        mock_find_fastqs.return_value = ["test1.fq.gz", "test2.fq.gz"]
+        mock_data_available_for_clinseq_barcode.return_value = True
+        pipelines = [LiqBioPipeline(sample_data, self.ref_data, {"vardict-shards": 2},
+                                    "/tmp/batch/" + sample_data["sdid"], "/nfs/LIQBIO/INBOX/exomes",
+                                    shared_outdir="/tmp/batch")
+                     for sample_data in [self.sample_data_1, self.sample_data_2]]
+        batch_pipeline = BatchPipeline(pipelines, "/tmp/batch")
+
+        # The target splitting job is only run once for both samples:
+        split_jobs = [job for job in batch_pipeline.graph.nodes() if isinstance(job, SplitTargets)]
+        self.assertEquals(len(split_jobs), 1)
+        self.assertEquals(len(batch_pipeline.graph.nodes()),
+                          sum([len(pipeline.graph.nodes()) for pipeline in pipelines]) - 1)
+
+    def test_conflicting_outputs(self):
+        batch_pipeline = BatchPipeline([], "/tmp/batch")
+        split_targets_1 = SplitTargets()
+        split_targets_1.input = "targets-1.bed"
+        split_targets_1.output_shards = ["shard-0.bed", "shard-1.bed"]
+        split_targets_2 = SplitTargets()
+        split_targets_2.input = "targets-2.bed"
+        split_targets_2.output_shards = ["shard-0.bed", "shard-1.bed"]
+        batch_pipeline.add(split_targets_1)
+        with self.assertRaises(ValueError):
+            batch_pipeline.add(split_targets_2)
+
+    def test_shared_job_with_scratch_uuids(self):
+        batch_pipeline = BatchPipeline([], "/tmp/batch")
+        skewers = []
+        for _ in range(2):
+            skewer = Skewer()
+            skewer.input1 = "in_1.fq.gz"
+            skewer.output1 = "/tmp/batch/out_1.fq.gz"
+            skewer.output_stats = "/tmp/batch/stats.txt"
+            skewer.scratch = "/scratch"
+            skewers.append(skewer)
+            batch_pipeline.add(skewer)
+        self.assertEquals(list(batch_pipeline.graph.nodes()), [skewers[0]])
+
+    def test_no_completion_pipe_before_start(self):
+        batch_pipeline = BatchPipeline([], "/tmp/batch")
+        self.assertIsNone(batch_pipeline.completion)
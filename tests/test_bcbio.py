@@ -0,0 +1,82 @@
+import unittest
+from StringIO import StringIO
+
+from autoseq.util.bcbio import *
+from autoseq.util.bcbio import _get_format_indices
+
+
+class TestBcbio(unittest.TestCase):
+    def setUp(self):
+        self.header = "##fileformat=VCFv4.1\n" + \
+                      "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tTUMOR\tNORMAL\n"
+        self.low_depth_record = "1\t100\t.\tA\tT\t30\tPASS\tSSF=0.01\tDP:AF\t8:0.5\t20:0\n"
+        self.good_record = "1\t200\t.\tC\tG\t100\tPASS\tSSF=0.01\tDP:AF\t100:0.5\t100:0\n"
+
+    def test_depth_freq_filter_header(self):
+        processed = depth_freq_filter(self.header.splitlines(True)[1], 0, "bwa")
+        self.assertIn("##FILTER=<ID=LowAlleleDepth", processed)
+        self.assertTrue(processed.endswith("#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tTUMOR\tNORMAL\n"))
+
+    def test_depth_freq_filter_low_depth(self):
+        processed = depth_freq_filter(self.low_depth_record, 0, "bwa")
+        self.assertEquals(processed.split("\t")[6], "LowAlleleDepth")
+
+    def test_depth_freq_filter_pass(self):
+        self.assertEquals(depth_freq_filter(self.good_record, 0, "bwa"), self.good_record)
+
+    def test_depth_freq_filter_input_stream(self):
+        """
+        test that the stream version writes the same output as filtering each line separately
+        """
+        input_lines = self.header + self.low_depth_record + self.good_record
+        output_stream = StringIO()
+        depth_freq_filter_input_stream(StringIO(input_lines), 0, "bwa", output_stream)
+        expected = "".join([depth_freq_filter(line, 0, "bwa") for line in input_lines.splitlines(True)])
+        self.assertEquals(output_stream.getvalue(), expected)
+
+    def test_depth_freq_filter_input_stream_empty(self):
+        output_stream = StringIO()
+        depth_freq_filter_input_stream(StringIO(""), 0, "bwa", output_stream)
+        self.assertEquals(output_stream.getvalue(), "")
+
+    def test_call_somatic_header(self):
+        processed = call_somatic(self.header.splitlines(True)[1])
+        self.assertIn("##INFO=<ID=SOMATIC", processed)
+        self.assertIn("##FILTER=<ID=REJECT", processed)
+
+    def test_call_somatic_vardict(self):
+        """
+        test that a record with the variant only in the tumor is flagged as somatic
+        """
+        processed = call_somatic(self.good_record)
+        self.assertIn("SOMATIC", processed.split("\t")[7])
+        self.assertEquals(processed.split("\t")[6], "PASS")
+
+    def test_call_somatic_reject(self):
+        """
+        test that a record with similar frequencies in tumor and normal is rejected
+        """
+        record = "1\t300\t.\tG\tA\t100\tPASS\tSSF=0.01\tDP:AF\t100:0.5\t100:0.4\n"
+        self.assertEquals(call_somatic(record).split("\t")[6], "REJECT")
+
+    def test_call_somatic_freebayes_gl(self):
+        record = "1\t400\t.\tG\tA\t100\t.\t.\tGT:GL:AO:RO\t0/1:-20,0,-20:20:20\t0/0:0,-10,-20:0:40\n"
+        processed = call_somatic(record)
+        self.assertIn("SOMATIC", processed.split("\t")[7])
+
+    def test_call_somatic_input_stream(self):
+        """
+        test that all records of a multi-record stream are processed
+        """
+        reject_record = "1\t300\t.\tG\tA\t100\tPASS\tSSF=0.01\tDP:AF\t100:0.5\t100:0.4\n"
+        input_lines = self.header + self.good_record + reject_record
+        output_stream = StringIO()
+        call_somatic_input_stream(StringIO(input_lines), output_stream)
+        output_lines = output_stream.getvalue().splitlines(True)
+        self.assertEquals(output_lines[-2], call_somatic(self.good_record))
+        self.assertEquals(output_lines[-1].split("\t")[6], "REJECT")
+
+    def test_get_format_indices(self):
+        indices = _get_format_indices("GT:GL:AO:RO")
+        self.assertEquals(indices, {"GL": 1, "AO": 2, "RO": 3, "AF": None})
+        self.assertIs(_get_format_indices("GT:GL:AO:RO"), indices)
@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from autoseq.tools.alignment import Skewer
+from autoseq.util.cache import *
+
+
+class DummyJob(object):
+    def __init__(self):
+        self.input_bam = "/data/input.bam"
+        self.input_beds = ["/data/a.bed", "/data/b.bed"]
+        self.output = "/out/output.txt"
+        self.output_metrics = None
+        self.reference = "/ref/genome.fasta"
+
+    def command(self):
+        return "tool {} {} > {}".format(self.input_bam, self.reference, self.output)
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmpdir, "cache")
+        self.input = os.path.join(self.tmpdir, "input.txt")
+        self.counter = os.path.join(self.tmpdir, "counter.txt")
+        with open(self.input, "w") as input_file:
+            input_file.write("some input\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def run_count_command(self, output):
+        """
+        Run a command copying the input to the output through the cache, recording each
+        actual execution in the counter file.
+        """
+        command = "echo run >> {} && cat {} > {} && echo index > {}.bai".format(
+            self.counter, self.input, output, output)
+        return run_cached(command, [self.input], [output], self.cache_dir, "/scratch")
+
+    def count_runs(self):
+        if not os.path.exists(self.counter):
+            return 0
+        with open(self.counter) as counter_file:
+            return len(counter_file.readlines())
+
+    def test_job_files(self):
+        job = DummyJob()
+        self.assertEquals(job_files(job, "input"), ["/data/a.bed", "/data/b.bed", "/data/input.bam"])
+        self.assertEquals(job_files(job, "output"), ["/out/output.txt"])
+
+    def test_job_files_skewer_stats(self):
+        skewer = Skewer()
+        skewer.input1 = "/data/in.fq.gz"
+        skewer.output1 = "/out/in.fq.gz"
+        skewer.output_stats = "/out/skewer-stats.log"
+        self.assertEquals(job_files(skewer, "output"), ["/out/in.fq.gz", "/out/skewer-stats.log"])
+
+    def test_command_tools(self):
+        command = "mkdir -p /tmp/x && (exec 9>&1 ; bwa mem ref.fa a.fq | samtools sort -o out.bam -) " + \
+                  "&& {{ TMPDIR=/tmp sort x.txt || true ; }}"
+        self.assertEquals(command_tools(command), ["bwa", "mkdir", "samtools", "sort", "true"])
+
+    def test_tool_version_in_key(self):
+        bindir = os.path.join(self.tmpdir, "bin")
+        os.makedirs(bindir)
+        tool = os.path.join(bindir, "autoseq-test-tool")
+        original_path = os.environ["PATH"]
+        os.environ["PATH"] = bindir + os.pathsep + original_path
+        try:
+            keys = []
+            for version in ["1.0", "1.0.1"]:
+                with open(tool, "w") as tool_file:
+                    tool_file.write("#!/bin/sh\necho {}\n".format(version))
+                os.chmod(tool, 0o755)
+                keys.append(cache_key("autoseq-test-tool " + self.input, [self.input], [], "/scratch",
+                                      self.cache_dir))
+        finally:
+            os.environ["PATH"] = original_path
+        self.assertNotEquals(keys[0], keys[1])
+
+    def test_normalize_command(self):
+        command = "tool -i /data/in.bam -o /out/res.txt -T /scratch/tmp/1b4e28ba-2fa1-11d2-883f-0016d3cca427"
+        self.assertEquals(normalize_command(command, ["/data/in.bam"], ["/out/res.txt"], "/scratch/tmp"),
+                          "tool -i <input0> -o <output0> -T <scratch>/<uuid>")
+
+    def test_run_cached_across_outdirs(self):
+        first_output = os.path.join(self.tmpdir, "outdir1", "output.txt")
+        second_output = os.path.join(self.tmpdir, "outdir2", "output.txt")
+        os.makedirs(os.path.dirname(first_output))
+
+        self.assertEquals(self.run_count_command(first_output), 0)
+        self.assertEquals(self.run_count_command(second_output), 0)
+
+        self.assertEquals(self.count_runs(), 1)
+        with open(second_output) as output_file:
+            self.assertEquals(output_file.read(), "some input\n")
+        self.assertTrue(os.path.exists(second_output + ".bai"))
+
+    def test_run_cached_changed_input(self):
+        output = os.path.join(self.tmpdir, "output.txt")
+        self.run_count_command(output)
+        with open(self.input, "w") as input_file:
+            input_file.write("some other, longer input\n")
+        self.run_count_command(output)
+
+        self.assertEquals(self.count_runs(), 2)
+        with open(output) as output_file:
+            self.assertEquals(output_file.read(), "some other, longer input\n")
+
+    def test_run_cached_failure_not_cached(self):
+        output = os.path.join(self.tmpdir, "output.txt")
+        self.assertNotEquals(run_cached("false", [self.input], [output], self.cache_dir, "/scratch"), 0)
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, "objects")))
+
+    def test_enable_job_cache(self):
+        job = DummyJob()
+        enable_job_cache(job, "/cache", "/scratch")
+        job.output = "/out/changed.txt"
+        cmd = job.command()
+        self.assertTrue(cmd.startswith("autoseq-cache-run --cache-dir /cache"))
+        self.assertIn("-o /out/changed.txt", cmd)
+        self.assertIn("-i /data/input.bam", cmd)
+        self.assertIn("'tool /data/input.bam /ref/genome.fasta > /out/changed.txt'", cmd)
@@ -1,6 +1,7 @@
 import unittest
-from mock import patch, mock_open
+from mock import Mock, patch, mock_open
 from autoseq.cli.cli import *
+from autoseq.cli.run import run_pipeline
 
 
 class TestCLI(unittest.TestCase):
@@ -63,6 +64,13 @@ class TestCLI(unittest.TestCase):
         self.assertEquals(output_dict["some_key3"], "/dummy/base/dir/a_terminal_filename")
         self.assertEquals(output_dict["nested_dict"]["some_key4"], "/dummy/base/dir/filename2")
 
+    @patch('autoseq.cli.cli.os.path.isfile')
+    def test_make_paths_absolute_list(self, mock_isfile):
+        mock_isfile.return_value = True
+        input_dict = {"some_list": ["shard-0.bed", "shard-1.bed"]}
+        output_dict = make_paths_absolute(input_dict, "/dummy/base/dir")
+        self.assertEquals(output_dict["some_list"], ["/dummy/base/dir/shard-0.bed", "/dummy/base/dir/shard-1.bed"])
+
     @patch('autoseq.cli.cli.os.path.isfile')
     def test_make_paths_absolute(self, mock_isfile):
         mock_isfile.return_value = False
@@ -86,3 +94,16 @@ class TestCLI(unittest.TestCase):
         with patch('autoseq.cli.cli.open', mocked_open, create=True):
             loaded_ref = load_ref("/dummy/base/dir/dummy_file.json")
             self.assertEquals(loaded_ref["some_key"], "/dummy/base/dir/a_terminal_filename")
+
+    @patch('autoseq.cli.run.wait_for_pipeline')
+    def test_run_pipeline(self, mock_wait_for_pipeline):
+        ctx = Mock()
+        ctx.obj = {'outdir': "/dummy/outdir", 'jobdb': None, 'runtime_history': [], 'incremental': False}
+        pipeline = Mock()
+        pipeline.graph.nodes.return_value = []
+        pipeline.events_filename = None
+        pipeline.telemetry_dir = None
+        pipeline.exitcode = 3
+        self.assertEquals(run_pipeline(ctx, pipeline), 3)
+        self.assertTrue(pipeline.start.called)
+        mock_wait_for_pipeline.assert_called_with(pipeline, None)
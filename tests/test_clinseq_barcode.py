@@ -25,6 +25,39 @@ class TestClinseqBarcode(unittest.TestCase):
     def test_extract_unique_capture_invalid(self):
         self.assertRaises(ValueError, lambda: extract_unique_capture("an_invalid_barcode"))
 
+    def test_parse_clinseq_barcode(self):
+        parsed = parse_clinseq_barcode("LB-P-00000001-CFDNA-01234567-TP201701011540-CM2017001022000")
+        self.assertEquals(parsed.project, "LB")
+        self.assertEquals(parsed.sdid, "P-00000001")
+        self.assertEquals(parsed.sample_type, "CFDNA")
+        self.assertEquals(parsed.sample_id, "01234567")
+        self.assertEquals(parsed.prep_id, "TP201701011540")
+        self.assertEquals(parsed.capture_id, "CM2017001022000")
+        self.assertEquals(parsed.unique_capture, self.test_capture1)
+
+    def test_parse_clinseq_barcode_cached(self):
+        self.assertIs(parse_clinseq_barcode("LB-P-00000001-CFDNA-01234567-TP1-WGS"),
+                      parse_clinseq_barcode("LB-P-00000001-CFDNA-01234567-TP1-WGS"))
+
+    def test_parse_clinseq_barcode_invalid(self):
+        self.assertRaises(ValueError, lambda: parse_clinseq_barcode("LB-P-00000001-CFDNA-01234567-TP1-WG"))
+        self.assertRaises(ValueError, lambda: parse_clinseq_barcode("LB-P-00000001-X-CFDNA-01234567-TP1-WGS"))
+
+    def test_unique_capture_index(self):
+        index = UniqueCaptureIndex(["LB-P-00000001-CFDNA-01234567-TP1-CM1",
+                                    "LB-P-00000001-CFDNA-01234567-TP1-CM2",
+                                    "LB-P-00000001-CFDNA-01234567-TP1-WGS",
+                                    "LB-P-00000001-N-01234568-TP1-CM1",
+                                    "LB-P-00000002-N-01234569-TP1-CM1",
+                                    "LB-P-00000001-CFDNA-01234567-TP1-CM1"])
+        self.assertEquals(index.capture_to_barcodes.keys(),
+                          [self.test_capture1, self.test_capture2,
+                           UniqueCapture("LB", "P-00000001", "N", "01234568", "TP", "CM"),
+                           UniqueCapture("LB", "P-00000002", "N", "01234569", "TP", "CM")])
+        # Barcodes that have already been added are not added again:
+        self.assertEquals(index.capture_to_barcodes[self.test_capture1],
+                          ["LB-P-00000001-CFDNA-01234567-TP1-CM1", "LB-P-00000001-CFDNA-01234567-TP1-CM2"])
+
     def test_clinseq_barcode_is_valid_valid1(self):
         self.assertTrue(clinseq_barcode_is_valid("LB-P-00000001-CFDNA-01234567-TP201701011540-CM2017001022000"))
 
@@ -2,6 +2,7 @@ import unittest
 import itertools
 from mock import patch
 from autoseq.pipeline.clinseq import *
+from autoseq.tools.alignment import Bwa
 from autoseq.util.clinseq_barcode import UniqueCapture
 
 
@@ -63,6 +64,25 @@ class TestClinseq(unittest.TestCase):
     def test_get_job_param_default(self):
         self.assertEquals(self.test_clinseq_pipeline.get_job_param("cov-high-thresh-fold-cov"), 100)
 
+    def test_add_output_placement(self):
+        cnvkit = CNVkit("test.bam", "test.cns", "test.cnr")
+        self.test_clinseq_pipeline.job_params['output-placement'] = "reflink"
+        self.test_clinseq_pipeline.add(cnvkit)
+        self.assertEquals(cnvkit.placement, "reflink")
+
+    @patch('autoseq.pipeline.clinseq.PypedreamPipeline.get_ordered_jobs_to_run', create=True)
+    def test_get_ordered_jobs_to_run(self, mock_get_ordered_jobs_to_run):
+        fastqc = FastQC()
+        fastqc.input = "test.fq.gz"
+        fastqc.output = "test_fastqc.zip"
+        fastqc.priority = 300
+        bwa = Bwa()
+        bwa.input_fastq1 = "test.fq.gz"
+        bwa.output = "test.bam"
+        bwa.priority = 900
+        mock_get_ordered_jobs_to_run.return_value = [fastqc, bwa]
+        self.assertEquals(self.test_clinseq_pipeline.get_ordered_jobs_to_run(), [bwa, fastqc])
+
     def test_set_germline_vcf(self):
         self.test_clinseq_pipeline.set_germline_vcf(self.test_cancer_capture, "test.vcf")
         self.assertEquals(self.test_clinseq_pipeline.normal_capture_to_vcf[self.test_cancer_capture], "test.vcf")
@@ -132,6 +152,22 @@ class TestClinseq(unittest.TestCase):
     def test_get_all_unique_capture(self):
         self.assertEquals(self.test_clinseq_pipeline.get_mapped_captures_all(), [])
 
+    def test_capture_to_results_index(self):
+        self.test_clinseq_pipeline.capture_to_results[self.test_wg_capture].merged_bamfile = "wg.bam"
+        self.test_clinseq_pipeline.set_capture_bam(self.test_normal_capture, "normal.bam")
+        self.test_clinseq_pipeline.set_capture_bam(self.test_cancer_capture, "cancer.bam")
+        self.assertEquals(self.test_clinseq_pipeline.get_mapped_captures_all(),
+                          [self.test_wg_capture, self.test_normal_capture, self.test_cancer_capture])
+        self.assertEquals(self.test_clinseq_pipeline.get_mapped_captures_only_wgs(), [self.test_wg_capture])
+        self.assertEquals(self.test_clinseq_pipeline.get_mapped_captures_no_wgs(),
+                          [self.test_normal_capture, self.test_cancer_capture])
+        self.assertEquals(self.test_clinseq_pipeline.get_mapped_captures_normal(), [self.test_normal_capture])
+        self.assertEquals(self.test_clinseq_pipeline.get_mapped_captures_cancer(), [self.test_cancer_capture])
+
+        del self.test_clinseq_pipeline.capture_to_results[self.test_cancer_capture]
+        self.assertEquals(self.test_clinseq_pipeline.get_mapped_captures_cancer(), [])
+        self.assertEquals(self.test_clinseq_pipeline.get_capture_bam(self.test_cancer_capture), None)
+
     def test_get_unique_captures_no_wgs(self):
         self.test_clinseq_pipeline.capture_to_results = {self.test_cancer_capture: 1}
         self.assertEquals(self.test_clinseq_pipeline.get_mapped_captures_no_wgs(), [self.test_cancer_capture])
@@ -200,6 +236,18 @@ class TestClinseq(unittest.TestCase):
         self.assertEquals(len(self.test_clinseq_pipeline.qc_files),
                           len(self.test_clinseq_pipeline.get_unique_capture_to_clinseq_barcodes()))
 
+    @patch('autoseq.pipeline.clinseq.align_capture')
+    @patch('autoseq.pipeline.clinseq.find_fastqs')
+    def test_configure_align_and_merge_fused(self, mock_find_fastqs, mock_align_capture):
+        mock_align_capture.return_value = "dummy_nodups.bam"
+        mock_find_fastqs.return_value = (["dummy_1.fastq.gz"], ["dummy_2.fastq.gz"])
+        self.test_clinseq_pipeline.job_params['fused-align-markdups'] = True
+        self.test_clinseq_pipeline.configure_align_and_merge()
+        self.assertTrue(mock_align_capture.called)
+        self.assertEquals(len(self.test_clinseq_pipeline.graph.nodes()), 0)
+        self.assertEquals(len(self.test_clinseq_pipeline.qc_files),
+                          len(self.test_clinseq_pipeline.get_unique_capture_to_clinseq_barcodes()))
+
     def test_call_germline_variants(self):
         self.test_clinseq_pipeline.call_germline_variants(self.test_normal_capture, "test.bam")
         self.assertEquals(len(self.test_clinseq_pipeline.graph.nodes()), 1)
@@ -405,3 +453,11 @@ class TestClinseq(unittest.TestCase):
         qc_files = self.test_clinseq_pipeline.configure_panel_qc(self.test_cancer_capture)
         self.assertEquals(len(self.test_clinseq_pipeline.graph.nodes()), 6)
         self.assertEquals(len(qc_files), 6)
+
+    def test_configure_panel_qc_single_pass(self):
+        self.test_clinseq_pipeline.job_params['single-pass-panel-qc'] = True
+        qc_files = self.test_clinseq_pipeline.configure_panel_qc(self.test_cancer_capture)
+        # The Picard collectors and the coverage histogram run as one job, sambamba depth and the
+        # coverage caveat as separate jobs:
+        self.assertEquals(len(self.test_clinseq_pipeline.graph.nodes()), 3)
+        self.assertEquals(len(qc_files), 6)
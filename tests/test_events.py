@@ -0,0 +1,115 @@
+import os
+import shutil
+import multiprocessing
+import subprocess
+import tempfile
+import time
+import unittest
+
+import networkx
+
+from autoseq.util.events import *
+
+
+class DummyJob(object):
+    def __init__(self, jobname, output, cmd):
+        self.jobname = jobname
+        self.output = output
+        self.cmd = cmd
+
+    def command(self):
+        return self.cmd
+
+
+class DummyPipeline(multiprocessing.Process):
+    def __init__(self, jobs, notify=True):
+        multiprocessing.Process.__init__(self)
+        self.graph = networkx.DiGraph()
+        self.graph.add_nodes_from(jobs)
+        self.notify = notify
+        self.completion = None
+
+    def start(self):
+        self.completion = CompletionPipe()
+        multiprocessing.Process.start(self)
+        self.completion.close_writer()
+
+    def run(self):
+        for job in self.graph.nodes():
+            subprocess.call(job.command(), shell=True)
+        if self.notify:
+            self.completion.notify()
+
+
+class TestEvents(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.events_filename = os.path.join(self.tmpdir, EVENTS_FILENAME)
+        start_events_file(self.events_filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_completion_pipe(self):
+        completion = CompletionPipe()
+        self.assertFalse(completion.wait(0))
+        completion.notify()
+        self.assertTrue(completion.wait(0))
+
+    def test_job_events(self):
+        job = DummyJob("failing/job", None, "echo running && exit 3")
+        enable_job_events(job, self.events_filename)
+        self.assertEquals(subprocess.call(job.command(), shell=True), 3)
+
+        with open(self.events_filename) as events_file:
+            events = [parse_event(line) for line in events_file]
+        self.assertEquals([event[1] for event in events], [STARTED, FINISHED])
+        self.assertEquals(events[0][2], events[1][2])
+        self.assertEquals(events[1][3], "failing/job")
+        self.assertEquals(events[0][4], None)
+        self.assertEquals(events[1][4], 3)
+
+    def test_wait_for_pipeline(self):
+        output = os.path.join(self.tmpdir, "output.txt")
+        jobs = [DummyJob("touch", output, "touch {}".format(output)),
+                DummyJob("fail", None, "false")]
+        for job in jobs:
+            enable_job_events(job, self.events_filename)
+        pipeline = DummyPipeline(jobs)
+        pipeline.start()
+        wait_for_pipeline(pipeline, self.events_filename, interval=0.1)
+        self.assertFalse(pipeline.is_alive())
+        self.assertTrue(os.path.exists(output))
+
+    def test_wait_for_pipeline_exiting_without_notification(self):
+        output = os.path.join(self.tmpdir, "output.txt")
+        job = DummyJob("touch", output, "touch {}".format(output))
+        enable_job_events(job, self.events_filename)
+        for events_filename in [None, self.events_filename]:
+            pipeline = DummyPipeline([job], notify=False)
+            pipeline.start()
+            wait_for_pipeline(pipeline, events_filename, interval=0.1)
+            self.assertFalse(pipeline.is_alive())
+
+    def test_wait_for_pipeline_with_running_job_process(self):
+        # A process left running by a job does not keep the completion pipe open:
+        job = DummyJob("sleep", None, "sleep 30 > /dev/null 2>&1 &")
+        pipeline = DummyPipeline([job], notify=False)
+        pipeline.start()
+        start = time.time()
+        wait_for_pipeline(pipeline)
+        self.assertLess(time.time() - start, 20)
+        self.assertFalse(pipeline.is_alive())
+
+    def test_job_progress(self):
+        output = os.path.join(self.tmpdir, "output.txt")
+        graph = networkx.DiGraph()
+        graph.add_nodes_from([DummyJob("a", output, ""), DummyJob("b", None, ""), DummyJob("c", None, "")])
+        progress = JobProgress(graph)
+        self.assertEquals(progress.summary(), "0 running, 3 queued, 0 done, 0 failed")
+        progress.update("1\tstarted\tjob1\tb\t\n")
+        progress.update("1\tstarted\tjob2\tc\t\n")
+        self.assertEquals(progress.summary(), "2 running, 1 queued, 0 done, 0 failed")
+        progress.update("2\tfinished\tjob1\tb\t0\n")
+        progress.update("2\tfinished\tjob2\tc\t1\n")
+        self.assertEquals(progress.summary(), "0 running, 1 queued, 1 done, 1 failed")
@@ -11,6 +11,18 @@ class TestIntervals(unittest.TestCase):
         self.assertIn('test_input', cmd)
         self.assertIn('test_output', cmd)
 
+    def test_split_targets(self):
+        split_targets = SplitTargets()
+        split_targets.input = "test_input.bed"
+        split_targets.output_shards = ["test_shard_0.bed", "test_shard_1.bed"]
+        cmd = split_targets.command()
+        self.assertIn('test_input.bed', cmd)
+        self.assertIn('test_shard_0.bed', cmd)
+        self.assertIn('test_shard_1.bed', cmd)
+        self.assertNotIn('--depth-profile', cmd)
+        split_targets.input_depth_profile = "test_depth.bed"
+        self.assertIn('--depth-profile test_depth.bed', split_targets.command())
+
     def test_interval_list_to_bed(self):
         interval_list_to_bed = IntervalListToBed()
         interval_list_to_bed.input = "test_input"
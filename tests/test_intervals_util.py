@@ -0,0 +1,116 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from autoseq.util.intervals import *
+
+
+class TestIntervalsUtil(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.bed_lines = ["track name=test\n",
+                          "1\t100\t200\tA\n",
+                          "1\t300\t1300\tB\n",
+                          "2\t100\t150\tC\n",
+                          "2\t500\t1500\tD\n",
+                          "3\t0\t50\tE\n"]
+        self.bed_filename = os.path.join(self.tmpdir, "targets.bed")
+        with open(self.bed_filename, "w") as bed_file:
+            bed_file.writelines(self.bed_lines)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_read_intervals_bed(self):
+        header_lines, interval_lines = read_intervals(self.bed_filename)
+        self.assertEquals(header_lines, self.bed_lines[:1])
+        self.assertEquals(interval_lines, self.bed_lines[1:])
+
+    def test_bed_line_length(self):
+        self.assertEquals(bed_line_length("1\t100\t200\tA\n"), 100)
+
+    def test_split_contiguous(self):
+        self.assertEquals(split_contiguous([1, 1, 1, 1], 2), [[0, 1], [2, 3]])
+        self.assertEquals(split_contiguous([10, 1, 1, 10], 2), [[0, 1], [2, 3]])
+
+    def test_split_contiguous_more_shards_than_items(self):
+        shards = split_contiguous([5, 5], 4)
+        self.assertEquals(len(shards), 4)
+        self.assertEquals(sum(shards, []), [0, 1])
+
+    def test_split_contiguous_zero_weights(self):
+        self.assertEquals(split_contiguous([0, 0, 0, 0], 2), [[0, 1], [2, 3]])
+
+    def test_split_contiguous_invalid(self):
+        self.assertRaises(ValueError, split_contiguous, [1, 2], 0)
+
+    def test_split_bed(self):
+        """
+        test that concatenating the shards gives back the original intervals in order
+        """
+        output_filenames = [os.path.join(self.tmpdir, "shard-{}.bed".format(idx)) for idx in range(3)]
+        split_intervals(self.bed_filename, output_filenames)
+        concatenated_intervals = []
+        for output_filename in output_filenames:
+            header_lines, interval_lines = read_intervals(output_filename)
+            self.assertEquals(header_lines, self.bed_lines[:1])
+            concatenated_intervals.extend(interval_lines)
+        self.assertEquals(concatenated_intervals, self.bed_lines[1:])
+
+    def test_read_intervals_interval_list(self):
+        interval_list_filename = os.path.join(self.tmpdir, "targets.interval_list")
+        with open(interval_list_filename, "w") as interval_list_file:
+            interval_list_file.write("@HD\tVN:1.0\n1\t101\t200\t+\tA\n")
+        header_lines, interval_lines = read_intervals(interval_list_filename)
+        self.assertEquals(header_lines, ["@HD\tVN:1.0\n"])
+        self.assertEquals(interval_coords(interval_lines[0], interval_list=True), ("1", 100, 200))
+
+    def test_interval_weights_depth_profile(self):
+        depth_profile = index_depth_profile({"1": [(300, 1300, 2.0), (100, 200, 10.0)]})
+        weights = interval_weights(self.bed_lines[1:4], depth_profile=depth_profile)
+        # The last interval is missing from the profile and is assigned the mean depth:
+        self.assertEquals(weights, [1000.0, 2000.0, 300.0])
+
+    def test_interval_weights_slopped_targets(self):
+        depth_profile = index_depth_profile({"1": [(300, 1300, 2.0), (100, 200, 10.0)]})
+        # Targets slopped by 20 bases, and a slopped interval merging two targets:
+        slopped_lines = ["1\t80\t220\tA\n", "1\t280\t1320\tB\n", "1\t150\t400\tAB\n"]
+        weights = interval_weights(slopped_lines, depth_profile=depth_profile)
+        self.assertEquals(weights, [140 * 10.0, 1040 * 2.0, 250 * (50 * 10.0 + 100 * 2.0) / 150])
+
+    def test_read_depth_profile(self):
+        depth_profile_filename = os.path.join(self.tmpdir, "depth.bed")
+        with open(depth_profile_filename, "w") as depth_profile_file:
+            depth_profile_file.write("track name=depth\n1\t300\t1300\tB\t2\n1\t100\t200\tA\t10\n")
+        self.assertEquals(read_depth_profile(depth_profile_filename),
+                          {"1": ([(100, 200, 10.0), (300, 1300, 2.0)], [200, 1300])})
+
+    def test_split_intervals_depth_profile(self):
+        depth_profile_filename = os.path.join(self.tmpdir, "depth.bed")
+        with open(depth_profile_filename, "w") as depth_profile_file:
+            depth_profile_file.write("1\t100\t200\tA\t1000\n")
+            for line in self.bed_lines[2:]:
+                depth_profile_file.write(line.rstrip("\n") + "\t1\n")
+        output_filenames = [os.path.join(self.tmpdir, "shard-{}.bed".format(idx)) for idx in range(2)]
+        split_intervals(self.bed_filename, output_filenames, depth_profile_filename)
+        # The first, deeply covered target should end up in a shard on its own:
+        _, interval_lines = read_intervals(output_filenames[0])
+        self.assertEquals(interval_lines, self.bed_lines[1:2])
+
+    def test_split_slopped_intervals_depth_profile(self):
+        # The depth profile has the unslopped target coordinates:
+        depth_profile_filename = os.path.join(self.tmpdir, "depth.bed")
+        with open(depth_profile_filename, "w") as depth_profile_file:
+            depth_profile_file.write("1\t100\t200\tA\t1000\n")
+            for line in self.bed_lines[2:]:
+                depth_profile_file.write(line.rstrip("\n") + "\t1\n")
+        slopped_filename = os.path.join(self.tmpdir, "targets.slopped20.bed")
+        with open(slopped_filename, "w") as slopped_file:
+            for line in self.bed_lines[1:]:
+                chrom, start, end, name = line.rstrip("\n").split("\t")
+                slopped_file.write("{}\t{}\t{}\t{}\n".format(chrom, max(int(start) - 20, 0), int(end) + 20, name))
+        output_filenames = [os.path.join(self.tmpdir, "shard-{}.bed".format(idx)) for idx in range(2)]
+        split_intervals(slopped_filename, output_filenames, depth_profile_filename)
+        _, interval_lines = read_intervals(output_filenames[0])
+        self.assertEquals(interval_lines, ["1\t80\t220\tA\n"])
@@ -0,0 +1,41 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from autoseq.util.jobdb import *
+
+
+class TestJobdb(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.jobdb = os.path.join(self.tmpdir, "jobdb.json")
+        jobs = [{"jobname": "bwa/LB-P-00000001-CFDNA-03098850-TD1-TT1", "status": "COMPLETED",
+                 "starttime": "2017-03-01T10:00:00", "endtime": "2017-03-01T10:10:00"},
+                {"jobname": "bwa/LB-P-00000001-N-03098121-TD1-TT1", "status": "COMPLETED",
+                 "starttime": "2017-03-01T10:00:00.500000", "endtime": "2017-03-01T10:20:00.500000"},
+                {"jobname": "vep", "status": "FAILED",
+                 "starttime": "2017-03-01T11:00:00", "endtime": "2017-03-01T11:01:00"},
+                {"jobname": "multiqc", "status": "PENDING", "starttime": None, "endtime": None}]
+        with open(self.jobdb, "w") as jobdb_file:
+            json.dump({"jobs": jobs}, jobdb_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_job_type(self):
+        self.assertEquals(job_type("vardict-shard/AL-P-NA12877-T-03098849-TD-TT/3"), "vardict-shard")
+        self.assertEquals(job_type("multiqc"), "multiqc")
+
+    def test_median(self):
+        self.assertEquals(median([3, 1, 2]), 2)
+        self.assertEquals(median([4, 1, 2, 3]), 2.5)
+
+    def test_job_runtime(self):
+        jobs = load_jobs(self.jobdb)
+        self.assertEquals(job_runtime(jobs[0]), 600.0)
+        self.assertEquals(job_runtime(jobs[1]), 1200.0)
+        # Only completed jobs have a runtime:
+        self.assertIsNone(job_runtime(jobs[2]))
+        self.assertIsNone(job_runtime(jobs[3]))
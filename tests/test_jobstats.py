@@ -0,0 +1,70 @@
+import unittest
+
+from autoseq.util.jobstats import *
+from autoseq.util.timeline import Timeline
+
+
+def make_job(jobname, start, end, threads=None, wall_time=None):
+    job = {"jobname": jobname, "status": "COMPLETED",
+           "starttime": "2017-03-01T10:{:02d}:00".format(start),
+           "endtime": "2017-03-01T10:{:02d}:00".format(end)}
+    if threads is not None:
+        job["telemetry"] = {"threads": threads, "wall_time": wall_time}
+    return job
+
+
+class TestJobstats(unittest.TestCase):
+    def setUp(self):
+        # bwa and fastqc run in parallel, then vardict after bwa, then multiqc after an idle gap:
+        self.timeline = Timeline([make_job("bwa/sample", 0, 10, threads=4, wall_time=480),
+                                  make_job("fastqc/sample", 0, 5),
+                                  make_job("vardict/sample", 10, 20, threads=2, wall_time=600),
+                                  make_job("multiqc", 30, 31)])
+
+    def test_occupancy(self):
+        times, cores, jobs = occupancy(self.timeline)
+        self.assertEquals(times.tolist(), [0, 0, 300, 600, 600, 1200, 1800, 1860])
+        self.assertEquals(cores.tolist(), [4, 5, 4, 0, 2, 0, 1, 0])
+        self.assertEquals(jobs.tolist(), [1, 2, 1, 0, 1, 0, 1, 0])
+
+    def test_time_weighted_mean(self):
+        times, cores, jobs = occupancy(self.timeline)
+        self.assertAlmostEquals(time_weighted_mean(times, jobs), (600 + 300 + 600 + 60) / 1860.0)
+        self.assertEquals(time_at_least(times, cores, 4), 600)
+
+    def test_idle_gaps(self):
+        self.assertEquals(idle_gaps(self.timeline), [(1200.0, 1800.0)])
+
+    def test_queue_wait(self):
+        wait = queue_wait(self.timeline)
+        self.assertEquals(wait[0], 120)
+        self.assertEquals(wait[2], 0)
+        self.assertTrue(np.isnan(wait[1]))
+
+    def test_critical_path(self):
+        self.assertEquals(critical_path(self.timeline).tolist(), [0, 2, 3])
+        self.assertEquals(critical_path(Timeline([])).tolist(), [])
+
+    def test_critical_path_zero_duration(self):
+        timeline = Timeline([make_job("a", 0, 0), make_job("b", 0, 0)])
+        self.assertEquals(len(critical_path(timeline)), 2)
+
+    def test_type_stats(self):
+        stats = type_stats(self.timeline, critical_path(self.timeline))
+        self.assertEquals([s["type"] for s in stats], ["bwa", "vardict", "multiqc", "fastqc"])
+        self.assertEquals(stats[0], {"type": "bwa", "jobs": 1, "total_seconds": 600.0,
+                                     "critical_path_seconds": 600.0, "mean_queue_wait": 120.0})
+        self.assertEquals(stats[3]["critical_path_seconds"], 0)
+        self.assertIsNone(stats[3]["mean_queue_wait"])
+
+    def test_run_stats(self):
+        stats = run_stats(self.timeline, cores=4)
+        self.assertEquals(stats["jobs"], 4)
+        self.assertAlmostEquals(stats["makespan_hours"], 1860 / 3600.0)
+        self.assertEquals(stats["peak_cores_in_use"], 5)
+        self.assertEquals(stats["critical_path_jobs"], 3)
+        self.assertAlmostEquals(stats["idle_hours"], 600 / 3600.0)
+        self.assertEquals(stats["mean_queue_wait"], 60)
+        self.assertAlmostEquals(stats["utilisation"], (2400 + 300 + 1200 + 60) / (4 * 1860.0))
+        self.assertAlmostEquals(stats["saturated_fraction"], 600 / 1860.0)
+        self.assertNotIn("cores", run_stats(self.timeline))
@@ -1,7 +1,12 @@
 import os
+import shutil
+import tempfile
 import unittest
 
-from autoseq.util.library import find_fastqs
+from mock import patch
+
+from autoseq.util.library import LibdirCatalogue, LibdirScanner, find_fastqs, list_dir
+from autoseq.util.readpair import Readpair
 
 
 class TestLibrary(unittest.TestCase):
@@ -51,3 +56,103 @@ class TestLibrary(unittest.TestCase):
         files = find_fastqs(library='NA12877-N-03098121-TD1-TT1', libdir='tests/libraries')
         self.assertIn(self.libdir, files[0][0])
         self.assertIn(self.library, files[0][0])
+
+
+class TestLibdirScanner(unittest.TestCase):
+    library = 'NA12877-N-03098121-TD1-TT1'
+    libdir = 'tests/libraries'
+
+    def test_has_library(self):
+        scanner = LibdirScanner(self.libdir)
+        self.assertTrue(scanner.has_library(self.library))
+        self.assertFalse(scanner.has_library('NA12877-N-03098121-TD1-TT2'))
+
+    def test_find_fastqs(self):
+        scanner = LibdirScanner(self.libdir)
+        self.assertEqual(scanner.find_fastqs(self.library), find_fastqs(self.library, self.libdir))
+        self.assertEqual(find_fastqs(self.library, self.libdir, scanner), find_fastqs(self.library, self.libdir))
+
+    def test_find_fastqs_cached(self):
+        scanner = LibdirScanner(self.libdir)
+        fastqs = scanner.find_fastqs(self.library)
+        with patch('autoseq.util.library.list_dir') as mock_list_dir:
+            self.assertEqual(scanner.find_fastqs(self.library), fastqs)
+            self.assertFalse(mock_list_dir.called)
+        # Changes to the returned lists do not affect the cached results:
+        scanner.find_fastqs(self.library)[0].append("other_1.fastq.gz")
+        self.assertEqual(scanner.find_fastqs(self.library), fastqs)
+
+    def test_list_dir_without_scandir(self):
+        with patch('autoseq.util.library.scandir', None):
+            self.assertEqual(list_dir(self.libdir, dirs_only=True), [self.library])
+        self.assertEqual(list_dir(self.libdir, dirs_only=True), [self.library])
+
+
+class TestLibdirCatalogue(unittest.TestCase):
+    library = 'NA12877-N-03098121-TD1-TT1'
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.libdir = os.path.join(self.tmpdir, 'libraries')
+        shutil.copytree('tests/libraries', self.libdir)
+        self.catalogue_filename = os.path.join(self.tmpdir, 'catalogue.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def touch(self, library, filename):
+        open(os.path.join(self.libdir, library, filename), 'w').close()
+        # Make sure the folder modification time changes on filesystems with a coarse resolution:
+        os.utime(os.path.join(self.libdir, library), (0, 0))
+
+    def test_find_fastqs(self):
+        catalogue = LibdirCatalogue(self.libdir, self.catalogue_filename)
+        self.assertTrue(catalogue.has_library(self.library))
+        self.assertFalse(catalogue.has_library('NA12877-N-03098121-TD1-TT2'))
+        self.assertEqual(catalogue.find_fastqs(self.library), find_fastqs(self.library, self.libdir))
+        self.assertEqual(find_fastqs(self.library, self.libdir, catalogue), find_fastqs(self.library, self.libdir))
+
+    def test_catalogue_persists(self):
+        LibdirCatalogue(self.libdir, self.catalogue_filename).update()
+        catalogue = LibdirCatalogue(self.libdir, self.catalogue_filename)
+        with patch('autoseq.util.library.list_dir') as mock_list_dir:
+            self.assertTrue(catalogue.has_library(self.library))
+            self.assertEqual(catalogue.find_fastqs(self.library), find_fastqs(self.library, self.libdir))
+            self.assertFalse(mock_list_dir.called)
+
+    def test_changed_library_is_rescanned(self):
+        LibdirCatalogue(self.libdir, self.catalogue_filename).update()
+        self.touch(self.library, 'qux_1.fastq.gz')
+        catalogue = LibdirCatalogue(self.libdir, self.catalogue_filename)
+        self.assertIn(os.path.join(self.libdir, self.library, 'qux_1.fastq.gz'),
+                      catalogue.find_fastqs(self.library)[0])
+
+    def test_new_and_removed_libraries(self):
+        LibdirCatalogue(self.libdir, self.catalogue_filename).update()
+        os.mkdir(os.path.join(self.libdir, 'NA12877-N-03098121-TD1-TT2'))
+        self.touch('NA12877-N-03098121-TD1-TT2', 'foo_1.fastq.gz')
+        shutil.rmtree(os.path.join(self.libdir, self.library))
+        os.utime(self.libdir, (0, 0))
+        catalogue = LibdirCatalogue(self.libdir, self.catalogue_filename)
+        self.assertFalse(catalogue.has_library(self.library))
+        self.assertTrue(catalogue.has_library('NA12877-N-03098121-TD1-TT2'))
+        self.assertEqual(catalogue.find_fastqs('NA12877-N-03098121-TD1-TT2'),
+                         ([os.path.join(self.libdir, 'NA12877-N-03098121-TD1-TT2', 'foo_1.fastq.gz')], []))
+
+    def test_read_pairs(self):
+        self.touch(self.library, 'qux_1.fastq.gz')
+        catalogue = LibdirCatalogue(self.libdir, self.catalogue_filename)
+        pairs = [tuple(os.path.basename(f) if f else None for f in pair) for pair in catalogue.read_pairs(self.library)]
+        self.assertEqual(pairs, [('bar_1.fq.gz', 'bar_2.fq.gz'),
+                                 ('baz_R1_001.fastq.gz', 'baz_R2_001.fastq.gz'),
+                                 ('baz_R1_999.fastq.gz', 'baz_R2_999.fastq.gz'),
+                                 ('foo_1.fastq.gz', 'foo_2.fastq.gz'),
+                                 ('qux_1.fastq.gz', None)])
+        self.assertEqual([size for _, _, _, size, _ in catalogue.fastqs(self.library)], [0] * 9)
+
+    def test_readpair_from_catalogue(self):
+        catalogue = LibdirCatalogue(self.libdir, self.catalogue_filename)
+        readpairs = Readpair.fromDir(self.libdir, catalogue)
+        expected = Readpair.fromDir(self.libdir)
+        self.assertEqual([(rp.LIBRARY, sorted(rp.FQ1), sorted(rp.FQ2)) for rp in readpairs],
+                         [(rp.LIBRARY, sorted(rp.FQ1), sorted(rp.FQ2)) for rp in expected])
@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import networkx
+
+from autoseq.util.manifest import *
+
+
+class DummyJob(object):
+    def __init__(self, input, output, min_alt_frac=0.1):
+        self.input = input
+        self.output = output
+        self.min_alt_frac = min_alt_frac
+        self.threads = 1
+        self.is_intermediate = False
+
+    def run(self):
+        with open(self.input) as input_file, open(self.output, "w") as output_file:
+            output_file.write(input_file.read())
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.manifest_filename = os.path.join(self.tmpdir, MANIFEST_FILENAME)
+        self.fastq = os.path.join(self.tmpdir, "reads.fq")
+        with open(self.fastq, "w") as fastq_file:
+            fastq_file.write("@read\nACGT\n+\nIIII\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def make_graph(self, min_alt_frac=0.1):
+        """
+        Set up a chain of three jobs, with the parameter of the middle job as specified.
+        """
+        self.align = DummyJob(self.fastq, os.path.join(self.tmpdir, "aligned.txt"))
+        self.call = DummyJob(self.align.output, os.path.join(self.tmpdir, "called.txt"), min_alt_frac)
+        self.report = DummyJob(self.call.output, os.path.join(self.tmpdir, "report.txt"))
+        graph = networkx.DiGraph()
+        graph.add_nodes_from([self.align, self.call, self.report])
+        return graph
+
+    def run_jobs(self, graph):
+        records = invalidate_stale_jobs(graph, self.manifest_filename)
+        for job in [self.align, self.call, self.report]:
+            if not os.path.exists(job.output):
+                job.run()
+        write_manifest(graph, self.manifest_filename, records)
+
+    def test_job_parameters(self):
+        job = DummyJob("in.txt", "out.txt", 0.05)
+        self.assertEquals(job_parameters(job), {"min_alt_frac": "0.05"})
+
+    def test_file_changed(self):
+        self.assertFalse(file_changed([10, 1.0, "abc"], [10, 2.0, "abc"]))
+        self.assertTrue(file_changed([10, 1.0, "abc"], [10, 1.0, "def"]))
+        self.assertTrue(file_changed([10, 1.0, None], [10, 2.0, None]))
+        self.assertFalse(file_changed([10, 1.0, None], None))
+
+    def test_unchanged_rerun(self):
+        self.run_jobs(self.make_graph())
+        graph = self.make_graph()
+        invalidate_stale_jobs(graph, self.manifest_filename)
+        self.assertTrue(all(os.path.exists(job.output) for job in graph.nodes()))
+
+    def test_changed_parameter_invalidates_downstream(self):
+        self.run_jobs(self.make_graph())
+        graph = self.make_graph(min_alt_frac=0.02)
+        invalidate_stale_jobs(graph, self.manifest_filename)
+        self.assertTrue(os.path.exists(self.align.output))
+        self.assertFalse(os.path.exists(self.call.output))
+        self.assertFalse(os.path.exists(self.report.output))
+
+    def test_changed_input_invalidates_downstream(self):
+        self.run_jobs(self.make_graph())
+        with open(self.fastq, "w") as fastq_file:
+            fastq_file.write("@read\nACGA\n+\nIIII\n")
+        graph = self.make_graph()
+        invalidate_stale_jobs(graph, self.manifest_filename)
+        self.assertFalse(any(os.path.exists(job.output) for job in graph.nodes()))
@@ -0,0 +1,46 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from autoseq.util.path import *
+
+
+class TestPath(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.source = os.path.join(self.tmpdir, "scratch", "output.txt")
+        self.target = os.path.join(self.tmpdir, "outdir", "output.txt")
+        mkdir(os.path.dirname(self.source))
+        mkdir(os.path.dirname(self.target))
+        with open(self.source, "w") as source_file:
+            source_file.write("some output\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def run_and_check_target(self, mode):
+        subprocess.check_call(place_output_cmd(self.source, self.target, mode), shell=True)
+        with open(self.target) as target_file:
+            self.assertEquals(target_file.read(), "some output\n")
+        self.assertFalse(os.path.exists(self.target + ".partial"))
+
+    def test_stripsuffix(self):
+        self.assertEquals(stripsuffix("file.bam", ".bam"), "file")
+        self.assertEquals(stripsuffix("file.bam", ".txt"), "file.bam")
+
+    def test_place_output_move(self):
+        self.run_and_check_target("move")
+        self.assertFalse(os.path.exists(self.source))
+
+    def test_place_output_hardlink(self):
+        self.run_and_check_target("hardlink")
+        self.assertEquals(os.stat(self.source).st_ino, os.stat(self.target).st_ino)
+
+    def test_place_output_reflink(self):
+        self.run_and_check_target("reflink")
+        self.assertTrue(os.path.exists(self.source))
+
+    def test_place_output_invalid_mode(self):
+        self.assertRaises(ValueError, place_output_cmd, self.source, self.target, "symlink")
@@ -25,6 +25,15 @@ class TestPicard(unittest.TestCase):
         self.assertIn('test_output_summary', cmd)
         self.assertIn('test_stop_after_value', cmd)
 
+    def test_picard_heap_size(self):
+        test_job = PicardCollectGcBiasMetrics()
+        test_job.input = "test_input"
+        test_job.reference_sequence = "dummy_reference"
+        test_job.output_metrics = "test_output_metrics"
+        test_job.output_summary = "test_output_summary"
+        test_job.memory = 7
+        self.assertIn('-Xmx7g', test_job.command())
+
     def test_picard_collect_oxo_g_metrics(self):
         test_job = PicardCollectOxoGMetrics()
         test_job.input = "test_input"
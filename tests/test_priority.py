@@ -0,0 +1,50 @@
+import unittest
+
+from autoseq.util.priority import *
+from autoseq.util.runtime_model import DEFAULT_RUNTIME, RuntimeModel
+
+
+class DummyJob(object):
+    def __init__(self, jobname, input, output):
+        self.jobname = jobname
+        self.input = input
+        self.output = output
+
+
+class TestPriority(unittest.TestCase):
+    def setUp(self):
+        self.bwa = DummyJob("bwa/sample", "reads.fq", "sample.bam")
+        self.fastqc = DummyJob("fastqc/sample", "reads.fq", "reads_fastqc.zip")
+        self.vardict = DummyJob("vardict/sample", "sample.bam", "sample.vcf")
+        self.report = DummyJob("report", "sample.vcf", "report.pdf")
+        self.oxog = DummyJob("picard-oxog/sample", "sample.bam", "sample.oxog.txt")
+        self.jobs = [self.fastqc, self.oxog, self.report, self.vardict, self.bwa]
+
+        runtimes = {"bwa": 600, "fastqc": 300, "vardict": 200, "report": 100, "picard-oxog": 250}
+        self.model = RuntimeModel()
+        self.model.median_wall_times = runtimes
+
+    def test_critical_path_priorities(self):
+        priorities = critical_path_priorities(self.jobs, self.model)
+        self.assertEquals(priorities[self.report], 100)
+        self.assertEquals(priorities[self.vardict], 300)
+        self.assertEquals(priorities[self.oxog], 250)
+        self.assertEquals(priorities[self.bwa], 900)
+        self.assertEquals(priorities[self.fastqc], 300)
+
+    def test_default_runtime(self):
+        priorities = critical_path_priorities(self.jobs, RuntimeModel())
+        self.assertEquals(priorities[self.bwa], 3 * DEFAULT_RUNTIME)
+        self.assertEquals(priorities[self.fastqc], DEFAULT_RUNTIME)
+
+    def test_critical_path(self):
+        self.assertEquals(critical_path(self.jobs, self.model), [self.bwa, self.vardict, self.report])
+        self.assertEquals(critical_path([], self.model), [])
+
+    def test_dispatch_order(self):
+        for job, priority in critical_path_priorities(self.jobs, self.model).items():
+            job.priority = priority
+        self.assertEquals(dispatch_order(self.jobs), [self.bwa, self.fastqc, self.vardict, self.oxog, self.report])
+
+    def test_dispatch_order_without_priorities(self):
+        self.assertEquals(dispatch_order(self.jobs), [self.fastqc, self.bwa, self.oxog, self.vardict, self.report])
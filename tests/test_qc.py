@@ -77,3 +77,24 @@ class TestQC(unittest.TestCase):
         cmd = test_job.command()
         self.assertIn('dummy_input', cmd)
         self.assertIn('test_output', cmd)
+
+    def test_panel_qc(self):
+        test_job = PanelQC()
+        test_job.input_bam = "input.bam"
+        test_job.reference_sequence = "reference.fasta"
+        test_job.target_interval_list = "targets.interval_list"
+        test_job.output_isize = "isize.txt"
+        test_job.output_oxog = "oxog.txt"
+        test_job.coverage_bed = "coverage.bed"
+        test_job.output_hsmetrics = "hsmetrics.txt"
+        test_job.output_coverage_histogram = "coverage-histogram.txt"
+        cmd = test_job.command()
+        # The collectors and the coverage histogram read the input once through tee:
+        self.assertIn('tee ', cmd)
+        self.assertEquals(cmd.count('input.bam'), 1)
+        self.assertEquals(cmd.count('I=/dev/fd/3'), 3)
+        self.assertIn('samtools depth -a', cmd)
+        self.assertIn('/dev/fd/6', cmd)
+        for expected in ['CollectInsertSizeMetrics', 'CollectOxoGMetrics', 'CollectHsMetrics',
+                         'isize.txt', 'oxog.txt', 'hsmetrics.txt', 'coverage.bed', 'coverage-histogram.txt']:
+            self.assertIn(expected, cmd)
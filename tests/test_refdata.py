@@ -0,0 +1,65 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from autoseq.util.refdata import Refdata, RefdataDict, load_refdata
+
+
+class TestRefdata(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmpdir, "cache")
+        open(os.path.join(self.tmpdir, "genome.fasta"), "w").close()
+        self.ref = os.path.join(self.tmpdir, "autoseq-genome.json")
+        self.write_ref({"reference_genome": "genome.fasta",
+                        "targets": {"TT": {"targets-bed-slopped20": "genome.fasta", "cnvkit-ref": None}},
+                        "shards": ["genome.fasta", "missing.bed"]})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_ref(self, refjson):
+        with open(self.ref, "w") as ref_file:
+            json.dump(refjson, ref_file)
+
+    def test_refdata_dict(self):
+        refdata = load_refdata(self.ref)
+        self.assertIsInstance(refdata, RefdataDict)
+        self.assertEquals(refdata["reference_genome"], os.path.join(self.tmpdir, "genome.fasta"))
+        self.assertEquals(refdata["targets"]["TT"]["targets-bed-slopped20"], os.path.join(self.tmpdir, "genome.fasta"))
+        self.assertIsNone(refdata["targets"]["TT"]["cnvkit-ref"])
+        self.assertEquals(refdata["shards"], [os.path.join(self.tmpdir, "genome.fasta"), "missing.bed"])
+        self.assertIn("targets", refdata)
+        self.assertEquals(refdata.to_dict()["targets"]["TT"]["targets-bed-slopped20"],
+                          os.path.join(self.tmpdir, "genome.fasta"))
+
+    def test_values_converted_once(self):
+        refdata = load_refdata(self.ref)
+        refdata["reference_genome"]
+        with patch('autoseq.util.refdata.os.path.isfile') as mock_isfile:
+            refdata["reference_genome"]
+            self.assertFalse(mock_isfile.called)
+
+    def test_lazy_loading(self):
+        refdata = Refdata(os.path.join(self.tmpdir, "missing.json"))
+        self.assertRaises(IOError, refdata.__getitem__, "reference_genome")
+        refdata = Refdata(self.ref)
+        self.assertEquals(refdata["reference_genome"], os.path.join(self.tmpdir, "genome.fasta"))
+
+    def test_cache(self):
+        refdata = load_refdata(self.ref, self.cache_dir)
+        self.assertEquals(refdata["targets"]["TT"]["targets-bed-slopped20"], os.path.join(self.tmpdir, "genome.fasta"))
+        with patch('autoseq.util.refdata.os.path.isfile') as mock_isfile:
+            self.assertEquals(load_refdata(self.ref, self.cache_dir), refdata)
+            self.assertFalse(mock_isfile.called)
+
+    def test_cache_invalidated(self):
+        load_refdata(self.ref, self.cache_dir)
+        self.write_ref({"reference_genome": "genome.fasta", "bwaIndex": "genome.fasta"})
+        os.utime(self.ref, (0, 0))
+        refdata = load_refdata(self.ref, self.cache_dir)
+        self.assertEquals(refdata["bwaIndex"], os.path.join(self.tmpdir, "genome.fasta"))
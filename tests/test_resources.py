@@ -0,0 +1,96 @@
+import inspect
+import pkgutil
+import unittest
+
+from pypedream.job import Job
+
+import autoseq.tools
+from autoseq.tools.variantcalling import VEP
+from autoseq.util.resources import *
+
+
+class DummyJob(object):
+    def __init__(self, threads=1, max_threads=None, memory=None):
+        self.threads = threads
+        self.max_threads = max_threads
+        self.memory = memory
+        self.jobname = "dummy"
+
+
+def tool_job_classes():
+    for _, name, _ in pkgutil.iter_modules(autoseq.tools.__path__):
+        __import__("autoseq.tools." + name)
+    classes = set()
+    pending = list(Job.__subclasses__())
+    while pending:
+        cls = pending.pop()
+        pending.extend(cls.__subclasses__())
+        if cls.__module__.startswith("autoseq.tools."):
+            classes.add(cls)
+    return classes
+
+
+class TestResources(unittest.TestCase):
+    def test_tool_jobs_declare_resources(self):
+        classes = tool_job_classes()
+        self.assertGreater(len(classes), 0)
+        for cls in classes:
+            args, _, _, defaults = inspect.getargspec(cls.__init__)
+            num_required = len(args) - 1 - len(defaults or ())
+            job = cls(*["dummy"] * num_required)
+            for attr in ["memory", "max_threads"]:
+                value = getattr(job, attr, None)
+                self.assertTrue(isinstance(value, int) and value > 0,
+                                "{} does not declare {}".format(cls.__name__, attr))
+
+    def test_job_memory(self):
+        self.assertEquals(job_memory(DummyJob(memory=5)), 5)
+        self.assertEquals(job_memory(DummyJob()), DEFAULT_MEMORY)
+
+    def test_memory_threads(self):
+        self.assertEquals(memory_threads(15, 16, 64), 4)
+        self.assertEquals(memory_threads(1, 16, 64), 1)
+
+    def test_max_threads(self):
+        job = DummyJob(threads=16, max_threads=4)
+        configure_job_resources(job, 16)
+        self.assertEquals(job.threads, 4)
+
+    def test_core_budget(self):
+        job = DummyJob(threads=32)
+        configure_job_resources(job, 16)
+        self.assertEquals(job.threads, 16)
+
+    def test_memory_budget(self):
+        # A single-threaded 15 GB job reserves a quarter of the cores with a 64 GB budget:
+        job = DummyJob(threads=1, max_threads=1, memory=15)
+        configure_job_resources(job, 16, 64)
+        self.assertEquals(job.threads, 4)
+
+    def test_memory_budget_exceeded(self):
+        job = DummyJob(threads=1, max_threads=1, memory=15)
+        configure_job_resources(job, 16, 8)
+        self.assertEquals(job.threads, 16)
+
+    def test_threads_within_memory_share(self):
+        job = DummyJob(threads=8, memory=6)
+        configure_job_resources(job, 16, 64)
+        self.assertEquals(job.threads, 8)
+
+    def test_command_threads(self):
+        # A 4-thread job reserving 8 cores for its share of the memory budget still runs 4 threads:
+        job = DummyJob(threads=16, max_threads=4, memory=32)
+        configure_job_resources(job, 16, 64)
+        self.assertEquals(job.threads, 8)
+        self.assertEquals(command_threads(job), 4)
+
+    def test_multithreaded_job_memory_budget(self):
+        vep = VEP()
+        vep.input_vcf = "input.vcf"
+        vep.output_vcf = "output.vcf"
+        vep.reference_sequence = "dummy.fasta"
+        vep.vep_dir = "dummy_dir"
+        vep.threads = 16
+        configure_job_resources(vep, 16, 16)
+        self.assertEquals(vep.threads, 8)
+        self.assertIn("--fork 4 ", vep.command())
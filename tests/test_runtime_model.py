@@ -0,0 +1,169 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+import networkx as nx
+
+from autoseq.util.runtime_model import *
+
+
+def make_job(jobname, seconds, input_bytes=None, threads=1, cpu_time=None):
+    job = {"jobname": jobname, "status": "COMPLETED",
+           "starttime": "2017-03-01T10:00:00",
+           "endtime": "2017-03-01T{:02d}:{:02d}:{:02d}".format(10 + seconds / 3600, seconds % 3600 / 60, seconds % 60)}
+    if input_bytes is not None:
+        job["telemetry"] = {"input_bytes": input_bytes, "threads": threads,
+                            "cpu_user": cpu_time if cpu_time is not None else seconds, "cpu_system": 0}
+    return job
+
+
+class DummyJob(object):
+    def __init__(self, jobname, input, threads=1):
+        self.jobname = jobname
+        self.input = input
+        self.threads = threads
+
+    def command(self):
+        return "echo {}".format(self.jobname)
+
+
+class TestRuntimeModel(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        gigabyte = 1024 ** 3
+        # Single-threaded bwa jobs taking 100 seconds plus 600 seconds per GB of input:
+        self.jobs = [make_job("bwa/LB-P-00000001-CFDNA-03098850-TD1-TT1", 700, gigabyte),
+                     make_job("bwa/LB-P-00000002-CFDNA-03098851-TD1-TT1", 1300, 2 * gigabyte),
+                     # Runtime history without telemetry:
+                     make_job("multiqc", 100),
+                     make_job("multiqc", 300)]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_jobname_capture_kit(self):
+        self.assertEquals(jobname_capture_kit("vardict/AL-P-NA12877-T-03098849-TD-TT-AL-P-NA12877-N-03098121-TD-TT"),
+                          "TT")
+        self.assertEquals(jobname_capture_kit("bwa/LB-P-00000001-CFDNA-03098850-TD1-CS1"), "CS")
+        self.assertEquals(jobname_capture_kit("qdnaseq/LB-P-00000001-CFDNA-03098850-TD1-WGS"), "WGS")
+        self.assertIsNone(jobname_capture_kit("multiqc"))
+
+    def test_fit_line(self):
+        self.assertEquals(fit_line([1, 2, 3], [3, 5, 7]), (1.0, 2.0))
+        self.assertEquals(fit_line([1, 1], [3, 5]), (4.0, 0.0))
+
+    def test_amdahl_factor(self):
+        self.assertEquals(amdahl_factor(0.0, 4), 1.0)
+        self.assertEquals(amdahl_factor(1.0, 4), 0.25)
+        self.assertEquals(amdahl_factor(0.5, 2), 0.75)
+
+    def test_predict_from_input_size(self):
+        model = RuntimeModel(self.jobs)
+        self.assertAlmostEquals(model.predict("bwa/LB-P-00000003-CFDNA-03098852-TD1-TT1", 3 * 1024 ** 3), 1900)
+        # A typical input size is assumed if the input size is not known:
+        self.assertAlmostEquals(model.predict("bwa/LB-P-00000003-CFDNA-03098852-TD1-TT1"), 1000)
+
+    def test_predict_threads(self):
+        # Jobs with all their work parallelised over 4 threads:
+        jobs = [make_job("vardict/AL-P-{}-T-03098849-TD-TT".format(i), 250, 1024 ** 3, threads=4, cpu_time=1000)
+                for i in range(3)]
+        model = RuntimeModel(jobs)
+        self.assertAlmostEquals(model.predict("vardict/AL-P-X-T-03098849-TD-TT", 1024 ** 3, threads=4), 250)
+        self.assertAlmostEquals(model.predict("vardict/AL-P-X-T-03098849-TD-TT", 1024 ** 3, threads=2), 500)
+
+    def test_predict_capture_kit(self):
+        jobs = [make_job("vardict/AL-P-{}-T-03098849-TD-TT".format(i), 1000, 1024 ** 3) for i in range(3)] + \
+               [make_job("vardict/AL-P-{}-T-03098849-TD-CS".format(i), 100, 1024 ** 3) for i in range(2)]
+        model = RuntimeModel(jobs)
+        self.assertAlmostEquals(model.predict("vardict/AL-P-X-T-03098849-TD-TT", 1024 ** 3), 1000)
+        # Too few CS jobs for a separate model, so the model of all vardict jobs is used:
+        self.assertAlmostEquals(model.predict("vardict/AL-P-X-T-03098849-TD-CS", 1024 ** 3), 640)
+
+    def test_predict_without_telemetry(self):
+        model = RuntimeModel(self.jobs)
+        self.assertEquals(model.predict("multiqc"), 200)
+        self.assertEquals(model.predict("vep"), DEFAULT_RUNTIME)
+        self.assertTrue(model.has_history("multiqc"))
+        self.assertFalse(model.has_history("vep"))
+
+    def test_predict_job(self):
+        model = RuntimeModel(self.jobs)
+        fastq = os.path.join(self.tmpdir, "reads.fq")
+        with open(fastq, "w") as fastq_file:
+            fastq_file.write("@read\n")
+        job = DummyJob("bwa/LB-P-00000003-CFDNA-03098852-TD1-TT1", fastq)
+        # Existing inputs are sized, so that the prediction is close to the intercept:
+        self.assertAlmostEquals(model.predict_job(job), 100, places=3)
+        job.input = os.path.join(self.tmpdir, "missing.fq")
+        self.assertAlmostEquals(model.predict_job(job), 1000)
+
+    def test_walltime_limit(self):
+        # Bwa jobs with the same input size, one of them twice as slow as the others:
+        jobs = [make_job("bwa/LB-P-0000000{}-CFDNA-03098850-TD1-TT1".format(i), 100, 1024 ** 3) for i in range(4)] + \
+               [make_job("bwa/LB-P-00000005-CFDNA-03098850-TD1-TT1", 200, 1024 ** 3)] + \
+               [make_job("multiqc", 100 * (i + 1)) for i in range(5)]
+        model = RuntimeModel(jobs)
+        # The limit covers the slowest past job rather than the predicted 120 seconds:
+        limit = model.walltime_limit("bwa/LB-P-00000006-CFDNA-03098850-TD1-TT1", margin=2.0, minimum=60)
+        self.assertAlmostEquals(limit.base, 400)
+        self.assertEquals(limit.per_gb, 0)
+        self.assertEquals(limit.minimum, 60)
+        # Without telemetry, the longest past wall time is used:
+        self.assertEquals(model.walltime_limit("multiqc", margin=2.0), WalltimeLimit(1000.0, 0.0, 600))
+        # Too few past jobs to limit the wall time:
+        self.assertIsNone(RuntimeModel(self.jobs).walltime_limit("multiqc"))
+        self.assertIsNone(model.walltime_limit("vep"))
+
+    def test_assign_walltimes(self):
+        model = RuntimeModel([make_job("multiqc", 100 * (i + 1)) for i in range(5)])
+        multiqc = DummyJob("multiqc", None)
+        vep = DummyJob("vep", None)
+        graph = nx.DiGraph()
+        graph.add_nodes_from([multiqc, vep])
+        assign_walltimes(graph, model, margin=4.0, minimum=60)
+        self.assertEquals(multiqc.walltime, WalltimeLimit(2000.0, 0.0, 60))
+        self.assertIn("TimeLimit=$(echo 0 | awk", multiqc.command())
+        # Jobs without runtime history keep the default time limit of the runner:
+        self.assertFalse(hasattr(vep, "walltime"))
+        self.assertEquals(vep.command(), "echo vep")
+
+    def test_enable_job_walltime(self):
+        bindir = os.path.join(self.tmpdir, "bin")
+        os.makedirs(bindir)
+        scontrol_args = os.path.join(self.tmpdir, "scontrol-args.txt")
+        with open(os.path.join(bindir, "scontrol"), "w") as scontrol_file:
+            scontrol_file.write("#!/bin/sh\necho \"$@\" > {}\n".format(scontrol_args))
+        os.chmod(os.path.join(bindir, "scontrol"), 0o755)
+        fastq = os.path.join(self.tmpdir, "reads.fq")
+
+        # 60 seconds plus 600 seconds per megabyte of input, and at least two minutes:
+        job = DummyJob("bwa", fastq)
+        job.walltime = WalltimeLimit(60.0, 600.0 * 1024, 120)
+        enable_job_walltime(job)
+        env = dict(os.environ, PATH=bindir + os.pathsep + os.environ["PATH"])
+
+        # Outside slurm jobs, the time limit is not set:
+        env.pop("SLURM_JOB_ID", None)
+        self.assertEquals(subprocess.check_output(job.command(), shell=True, env=env), "bwa\n")
+        self.assertFalse(os.path.exists(scontrol_args))
+
+        # The time limit is computed from the input size when the job starts, in minutes:
+        env["SLURM_JOB_ID"] = "1234"
+        self.assertEquals(subprocess.check_output(job.command(), shell=True, env=env), "bwa\n")
+        with open(scontrol_args) as scontrol_args_file:
+            self.assertEquals(scontrol_args_file.read(), "update JobId=1234 TimeLimit=3\n")
+        with open(fastq, "w") as fastq_file:
+            fastq_file.write("@" * 1024 ** 2)
+        self.assertEquals(subprocess.check_output(job.command(), shell=True, env=env), "bwa\n")
+        with open(scontrol_args) as scontrol_args_file:
+            self.assertEquals(scontrol_args_file.read(), "update JobId=1234 TimeLimit=12\n")
+
+    def test_from_jobdbs(self):
+        jobdb = os.path.join(self.tmpdir, "jobdb.json")
+        with open(jobdb, "w") as jobdb_file:
+            json.dump({"jobs": self.jobs}, jobdb_file)
+        model = RuntimeModel.from_jobdbs([jobdb])
+        self.assertEquals(model.predict("multiqc"), 200)
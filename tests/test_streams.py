@@ -0,0 +1,71 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from autoseq.util.streams import *
+
+
+class TestStreams(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.input = os.path.join(self.tmpdir, "input.txt")
+        with open(self.input, "w") as input_file:
+            input_file.writelines(["line {}\n".format(idx) for idx in range(100000)])
+        self.stream_tmpdir = os.path.join(self.tmpdir, "streams")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def output(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def run_streams(self, writer_cmd, num_streams, reader_cmds):
+        cmd = tmpdir_cmd(self.stream_tmpdir, fifo_stream_cmd(self.stream_tmpdir, writer_cmd, num_streams,
+                                                             reader_cmds))
+        # A command blocking forever on a pipe is killed by the timeout and makes the test fail:
+        status = subprocess.call(["timeout", "60", "sh", "-c", cmd])
+        self.assertNotEquals(status, 124)
+        self.assertFalse(os.path.exists(self.stream_tmpdir))
+        return status
+
+    def tee_cmd(self, input_filename):
+        return "tee /dev/fd/3 /dev/fd/4 < {} > /dev/null".format(input_filename)
+
+    def test_fan_out(self):
+        status = self.run_streams(self.tee_cmd(self.input), 2, [
+            ("cat /dev/fd/3 > {}".format(self.output("a.txt")), [0]),
+            ("cat /dev/fd/3 > {}".format(self.output("b.txt")), [1])])
+        self.assertEquals(status, 0)
+        for name in ["a.txt", "b.txt"]:
+            self.assertEquals(open(self.output(name)).read(), open(self.input).read())
+
+    def test_two_streams_into_one_reader(self):
+        writer_cmd = "ln -s /dev/fd/3 {0}/out1 && ln -s /dev/fd/4 {0}/out2 && " \
+                     "cat {1} > {0}/out1 && cat {1} > {0}/out2".format(self.stream_tmpdir, self.input)
+        reader_cmd = "cat /dev/fd/3 > {} & cat /dev/fd/4 > {} ; wait".format(self.output("a.txt"), self.output("b.txt"))
+        self.assertEquals(self.run_streams(writer_cmd, 2, [(reader_cmd, [0, 1])]), 0)
+        for name in ["a.txt", "b.txt"]:
+            self.assertEquals(open(self.output(name)).read(), open(self.input).read())
+
+    def test_missing_input(self):
+        status = self.run_streams(self.tee_cmd(self.output("missing.txt")), 2, [("cat /dev/fd/3", [0]),
+                                                                               ("cat /dev/fd/3", [1])])
+        self.assertNotEquals(status, 0)
+
+    def test_reader_failing_before_reading(self):
+        status = self.run_streams(self.tee_cmd(self.input), 2, [("false", [0]), ("cat /dev/fd/3", [1])])
+        self.assertNotEquals(status, 0)
+
+    def test_reader_failing_while_reading(self):
+        status = self.run_streams(self.tee_cmd(self.input), 2, [("head -n 1 /dev/fd/3 && false", [0]),
+                                                               ("cat /dev/fd/3", [1])])
+        self.assertNotEquals(status, 0)
+
+    def test_writer_failing(self):
+        status = self.run_streams("false", 2, [("cat /dev/fd/3", [0]), ("cat /dev/fd/3", [1])])
+        self.assertNotEquals(status, 0)
+
+    def test_too_many_streams(self):
+        self.assertRaises(ValueError, fifo_stream_cmd, self.stream_tmpdir, "true", MAX_STREAMS + 1, [])
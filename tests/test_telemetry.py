@@ -0,0 +1,67 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from autoseq.util.telemetry import *
+
+
+class TestTelemetry(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.telemetry_dir = os.path.join(self.tmpdir, "jobdb-telemetry")
+        start_telemetry_dir(self.telemetry_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_jobdb_telemetry_dir(self):
+        self.assertEquals(jobdb_telemetry_dir("/out/jobdb.json"), "/out/jobdb-telemetry")
+
+    def test_run_with_telemetry(self):
+        output = os.path.join(self.telemetry_dir, "job.json")
+        command = "python -c 'x = \"a\" * 50 * 1024 * 1024' && exit 2"
+        exitcode = run_with_telemetry(command, output, "test-job", self.tmpdir, threads=2, memory=1)
+        self.assertEquals(exitcode, 2)
+
+        with open(output) as telemetry_file:
+            telemetry = json.load(telemetry_file)
+        self.assertEquals(telemetry["jobname"], "test-job")
+        self.assertEquals(telemetry["exitcode"], 2)
+        self.assertEquals(telemetry["threads"], 2)
+        # The memory used by the python process started by the shell is included:
+        self.assertGreater(telemetry["max_rss"], 50 * 1024 * 1024)
+        self.assertIsNotNone(telemetry["scratch_used"])
+
+    def test_telemetry_command(self):
+        cmd = telemetry_command("tool in.txt > 'out file.txt'", "/out/job.json", "tool/sample", None, 4, None)
+        self.assertIn("--threads 4", cmd)
+        self.assertNotIn("--scratch", cmd)
+        self.assertNotIn("--memory", cmd)
+        self.assertTrue(cmd.endswith("'tool in.txt > '\"'\"'out file.txt'\"'\"''"))
+
+    def test_merge_telemetry_and_job_costs(self):
+        for jobname, cpu_time in [("bwa/sample-1", 3600), ("bwa/sample-2", 1800), ("fastqc/sample-1", 60)]:
+            telemetry = {"jobname": jobname, "exitcode": 0, "wall_time": cpu_time, "cpu_user": cpu_time,
+                         "cpu_system": 0, "max_rss": 1024 ** 3, "bytes_read": 0, "bytes_written": 0,
+                         "scratch_used": None, "threads": 1, "memory": 6}
+            with open(os.path.join(self.telemetry_dir, jobname.replace("/", "_") + ".json"), "w") as telemetry_file:
+                json.dump(telemetry, telemetry_file)
+
+        jobdb_filename = os.path.join(self.tmpdir, "jobdb.json")
+        with open(jobdb_filename, "w") as jobdb_file:
+            json.dump({"jobs": [{"jobname": "bwa/sample-1"}, {"jobname": "bwa/sample-2"},
+                                {"jobname": "fastqc/sample-1"}, {"jobname": "multiqc"}]}, jobdb_file)
+        merge_telemetry(jobdb_filename, self.telemetry_dir)
+
+        with open(jobdb_filename) as jobdb_file:
+            jobs = json.load(jobdb_file)['jobs']
+        self.assertNotIn('telemetry', jobs[3])
+
+        costs = job_costs(jobs)
+        self.assertEquals([curr_job_type for curr_job_type, _ in costs], ["bwa", "fastqc"])
+        self.assertEquals(costs[0][1]["jobs"], 2)
+        self.assertAlmostEquals(costs[0][1]["cpu_hours"], 1.5)
+        self.assertAlmostEquals(costs[0][1]["max_rss_gb"], 1.0)
+        self.assertEquals(costs[0][1]["memory_gb"], 6)
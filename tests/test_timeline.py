@@ -0,0 +1,88 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from autoseq.util.timeline import *
+
+
+def make_job(jobname, start, end, status="COMPLETED"):
+    return {"jobname": jobname, "status": status,
+            "starttime": "2017-03-01T10:{:02d}:00".format(start) if start is not None else None,
+            "endtime": "2017-03-01T10:{:02d}:00".format(end) if end is not None else None}
+
+
+class TestTimeline(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.jobs = [make_job("bwa/sample1", 0, 10),
+                     make_job("bwa/sample2", 1, 5),
+                     make_job("fastqc/sample1", 5, 8, "FAILED"),
+                     make_job("vardict/sample1", 10, 20),
+                     make_job("multiqc", None, None, "PENDING")]
+        self.timeline = Timeline(self.jobs)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_timeline(self):
+        # Jobs that have not run are not included:
+        self.assertEquals(len(self.timeline), 4)
+        self.assertEquals(self.timeline.types, ["bwa", "fastqc", "vardict"])
+        self.assertEquals(self.timeline.start.tolist(), [0, 60, 300, 600])
+        self.assertEquals(self.timeline.duration().tolist(), [600, 240, 180, 600])
+
+    def test_pack_lanes(self):
+        self.assertEquals(pack_lanes(np.array([0, 1, 5, 10]), np.array([10, 5, 8, 20])).tolist(), [0, 1, 1, 1])
+        self.assertEquals(pack_lanes(np.array([]), np.array([])).tolist(), [])
+
+    def test_rows(self):
+        self.assertEquals(self.timeline.rows("jobs").tolist(), [0, 1, 2, 3])
+        self.assertEquals(self.timeline.rows("lanes").tolist(), [0, 1, 1, 1])
+        self.assertEquals(self.timeline.rows("types").tolist(), [0, 1, 2, 3])
+        self.assertRaises(ValueError, self.timeline.rows, "gantt")
+
+    def test_type_summary(self):
+        summary = self.timeline.type_summary()
+        self.assertEquals([s["type"] for s in summary], ["bwa", "vardict", "fastqc"])
+        self.assertEquals(summary[0], {"type": "bwa", "jobs": 2, "failed": 0, "total_seconds": 840.0,
+                                       "longest_seconds": 600.0, "first_start": 0.0, "last_end": 600.0})
+        self.assertEquals(summary[2]["failed"], 1)
+
+    def test_from_jobdbs(self):
+        jobdbs = []
+        for run in range(2):
+            jobdb = os.path.join(self.tmpdir, "run{}.json".format(run))
+            with open(jobdb, "w") as jobdb_file:
+                json.dump({"jobs": self.jobs}, jobdb_file)
+            jobdbs.append(jobdb)
+        timeline = Timeline.from_jobdbs(jobdbs)
+        self.assertEquals(len(timeline), 8)
+        self.assertEquals(timeline.run.tolist(), [0] * 4 + [1] * 4)
+        self.assertEquals(timeline.run_names, ["run0.json", "run1.json"])
+        # Identical runs are drawn in parallel lanes:
+        self.assertEquals(timeline.rows("lanes").max(), 3)
+
+    def test_write_json(self):
+        filename = os.path.join(self.tmpdir, "timeline.json")
+        write_json(self.timeline, filename)
+        data = json.load(open(filename))
+        self.assertEquals(data["jobs"]["row"], [0, 1, 1, 1])
+        self.assertEquals(data["statuses"], ["COMPLETED", "FAILED"])
+        self.assertEquals(data["colors"], ["#00ff00", "red"])
+
+    def test_write_html(self):
+        timeline = Timeline([make_job("</script><script>alert(1)", 0, 1)])
+        filename = os.path.join(self.tmpdir, "timeline.html")
+        write_html(timeline, filename)
+        html = open(filename).read()
+        self.assertEquals(html.count("</script>"), 1)
+        self.assertIn("<\\/script>", html)
+
+    def test_empty_timeline(self):
+        timeline = Timeline([])
+        self.assertEquals(timeline.rows("types").tolist(), [])
+        self.assertEquals(timeline.type_summary(), [])
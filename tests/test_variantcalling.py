@@ -53,6 +53,16 @@ class TestVariantCalling(unittest.TestCase):
         self.assertIn('dummy_targets.bed', cmd)
         self.assertIn('output.txt', cmd)
 
+    def test_freebayes_somatic_filter(self):
+        freebayes = Freebayes()
+        freebayes.input_bams = ["tumor.bam", "normal.bam"]
+        freebayes.reference_sequence = "dummy.fasta"
+        freebayes.target_bed = "dummy_targets.bed"
+        freebayes.output = "output.txt"
+        self.assertNotIn('autoseq-somatic-filter', freebayes.command())
+        freebayes.somatic_only = True
+        self.assertIn('autoseq-somatic-filter', freebayes.command())
+
     def test_vardict(self):
         vardict = VarDict()
         vardict.input_tumor = "input_tumor.bam"
@@ -72,6 +82,36 @@ class TestVariantCalling(unittest.TestCase):
         self.assertIn('dummy_targets.bed', cmd)
         self.assertIn('output.txt', cmd)
 
+    def test_vardict_fused_postprocessing(self):
+        vardict = VarDict(input_tumor="input_tumor.bam", input_normal="input_normal.bam", tumorid="tumor_id",
+                          normalid="normal_id", reference_sequence="dummy.fasta", reference_dict="dummy.dict",
+                          target_bed="dummy_targets.bed", output="output.txt", fused_postprocessing=True)
+        cmd = vardict.command()
+        self.assertIn('autoseq-vardict-postprocess', cmd)
+        self.assertNotIn('autoseq-somatic-filter', cmd)
+        self.assertNotIn('awk', cmd)
+
+    def test_vardict_shard(self):
+        vardict_shard = VarDictShard(input_tumor="input_tumor.bam", input_normal="input_normal.bam",
+                                     tumorid="tumor_id", reference_sequence="dummy.fasta",
+                                     input_target_bed="dummy_shard.bed", output="output.txt")
+        cmd = vardict_shard.command()
+        self.assertIn('vardict-java', cmd)
+        self.assertIn('dummy_shard.bed', cmd)
+        self.assertIn('output.txt', cmd)
+        self.assertNotIn('var2vcf_paired.pl', cmd)
+
+    def test_vardict_input_shards(self):
+        vardict = VarDict(input_tumor="input_tumor.bam", input_normal="input_normal.bam", tumorid="tumor_id",
+                          normalid="normal_id", reference_sequence="dummy.fasta", reference_dict="dummy.dict",
+                          target_bed="dummy_targets.bed", output="output.txt")
+        vardict.input_shards = ["shard_0.txt", "shard_1.txt"]
+        cmd = vardict.command()
+        self.assertNotIn('vardict-java', cmd)
+        self.assertIn('shard_0.txt', cmd)
+        self.assertIn('shard_1.txt', cmd)
+        self.assertIn('var2vcf_paired.pl', cmd)
+
     def test_vep(self):
         vep = VEP()
         vep.input_vcf = "input.vcf"
@@ -160,3 +200,35 @@ class TestVariantCalling(unittest.TestCase):
         self.assertEquals(output_dict.keys(), ["vardict", "freebayes"])
         num_jobs_after_call = len(self.test_clinseq_pipeline.graph.nodes())
         self.assertEquals(num_jobs_after_call, num_jobs_before_call + 2)
+
+    def test_call_somatic_variants_sharded(self):
+        num_jobs_before_call = len(self.test_clinseq_pipeline.graph.nodes())
+        output_dict = call_somatic_variants(self.test_clinseq_pipeline, "test_cancer.bam", "test_normal.bam",
+                                            self.test_cancer_capture, self.test_normal_capture, "test-regions",
+                                            "test_outdir", callers=['vardict'], vardict_shards=3)
+        self.assertEquals(output_dict.keys(), ["vardict"])
+        num_jobs_after_call = len(self.test_clinseq_pipeline.graph.nodes())
+        # One target splitting job, three shard calling jobs and the merging VarDict job:
+        self.assertEquals(num_jobs_after_call, num_jobs_before_call + 5)
+
+    def test_call_somatic_variants_sharded_shares_split(self):
+        other_cancer_capture = UniqueCapture("AL", "P-NA12877", "T", "03098849", "TD", "TT")
+        num_jobs_before_call = len(self.test_clinseq_pipeline.graph.nodes())
+        for cancer_capture in [self.test_cancer_capture, other_cancer_capture]:
+            call_somatic_variants(self.test_clinseq_pipeline, "test_cancer.bam", "test_normal.bam",
+                                  cancer_capture, self.test_normal_capture, "test-regions",
+                                  "test_outdir", callers=['vardict'], vardict_shards=3)
+        num_jobs_after_call = len(self.test_clinseq_pipeline.graph.nodes())
+        # The target splitting job is shared by both cancer captures:
+        self.assertEquals(num_jobs_after_call, num_jobs_before_call + 9)
+
+    def test_call_somatic_variants_precomputed_shards(self):
+        self.test_clinseq_pipeline.refdata['targets']['test-regions']['targets-bed-slopped20-shards'] = \
+            ["shard-0.bed", "shard-1.bed", "shard-2.bed"]
+        num_jobs_before_call = len(self.test_clinseq_pipeline.graph.nodes())
+        call_somatic_variants(self.test_clinseq_pipeline, "test_cancer.bam", "test_normal.bam",
+                              self.test_cancer_capture, self.test_normal_capture, "test-regions",
+                              "test_outdir", callers=['vardict'], vardict_shards=3)
+        num_jobs_after_call = len(self.test_clinseq_pipeline.graph.nodes())
+        # No target splitting job is needed:
+        self.assertEquals(num_jobs_after_call, num_jobs_before_call + 4)
@@ -0,0 +1,66 @@
+import unittest
+from StringIO import StringIO
+
+from autoseq.util.vcfstream import *
+
+
+class TestVcfStream(unittest.TestCase):
+    def setUp(self):
+        self.header = "##fileformat=VCFv4.1\n" + \
+                      "##INFO=<ID=STATUS,Number=1,Type=String,Description=\"Somatic or germline status\">\n" + \
+                      "##FILTER=<ID=REJECT,Description=\"Some description\">\n" + \
+                      "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tTUMOR\tNORMAL\n"
+        self.somatic_record = "1\t100\t.\tA\tT\t100\tPASS\tSTATUS=StrongSomatic;SSF=0.01\tDP:AF\t100:0.5\t100:0\n"
+        self.germline_record = "1\t200\t.\tA\tT\t100\tPASS\tSTATUS=Germline;SSF=0.01\tDP:AF\t100:0.5\t100:0.5\n"
+        self.ambiguous_record = "1\t300\t.\tR\tT\t100\tPASS\tSTATUS=StrongSomatic;SSF=0.01\tDP:AF\t100:0.5\t100:0\n"
+        self.dup_record = "1\t400\t.\tN\tR\t100\tPASS\tSTATUS=StrongSomatic;SSF=0.01\tDP:AF\t100:0.5\t100:0\n"
+
+    def process(self, stages, input_lines):
+        output_stream = StringIO()
+        process_vcf_stream(stages, StringIO(input_lines), output_stream)
+        return output_stream.getvalue()
+
+    def test_no_stages(self):
+        input_lines = self.header + self.somatic_record
+        self.assertEquals(self.process([], input_lines), input_lines)
+
+    def test_somatic_status_filter(self):
+        output = self.process([SomaticStatusFilter()], self.header + self.somatic_record + self.germline_record)
+        self.assertIn(self.somatic_record, output)
+        self.assertNotIn(self.germline_record, output)
+
+    def test_ambiguous_ref_mask(self):
+        output = self.process([AmbiguousRefMask()], self.ambiguous_record)
+        self.assertEquals(output.split("\t")[3], "N")
+
+    def test_ref_alt_duplicate_filter(self):
+        """
+        test that a record is dropped if REF equals ALT after masking ambiguous bases
+        """
+        output = self.process([AmbiguousRefMask(), RefAltDuplicateFilter()], self.dup_record.replace("\tN\tR\t", "\tR\tN\t"))
+        self.assertEquals(output, "")
+
+    def test_vardict_header_fix(self):
+        output = self.process([VarDictHeaderFix()], self.header)
+        self.assertIn('##FILTER=<ID=REJECT,Description="Not Somatic via VarDict">', output)
+
+    def test_vardict_postprocessing_headers(self):
+        output = self.process(vardict_postprocessing_stages(), self.header)
+        lines = output.splitlines()
+        self.assertEquals(lines[-1], self.header.splitlines()[-1])
+        self.assertIn('##FILTER=<ID=LowAlleleDepth', output)
+        self.assertIn('##INFO=<ID=SOMATIC', output)
+
+    def test_vardict_postprocessing_records(self):
+        """
+        test that the fused stages give the same records as applying the filters one after the other
+        """
+        records = [self.somatic_record, self.germline_record, self.ambiguous_record]
+        output = self.process(vardict_postprocessing_stages(), self.header + "".join(records))
+        output_records = [line for line in output.splitlines(True) if not line.startswith("#")]
+
+        from autoseq.util.bcbio import depth_freq_filter, call_somatic
+        expected = [call_somatic(depth_freq_filter(record, 0, "bwa")) for record in records
+                    if "Somatic" in record.split("\t")[7]]
+        expected = [record.replace("\tR\tT\t", "\tN\tT\t") for record in expected]
+        self.assertEquals(output_records, expected)